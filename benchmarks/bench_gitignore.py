@@ -0,0 +1,93 @@
+"""
+Сравнение обхода с иерархическим .gitignore (scan_project + GitIgnore)
+и старой схемы: os.walk + один корневой PathSpec.match_file на каждый файл.
+
+    python benchmarks/bench_gitignore.py --files 20000 --ignored 50000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pathspec
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.codebase_collector.gitignore import GitIgnore
+from app.codebase_collector.module_discovery import scan_project
+
+TARGET_EXTS = {".py", ".md", ".txt"}
+IGNORE_PATTERNS = ["venv", ".git", "__pycache__", "dist"]
+
+
+def make_tree(root, files, ignored, per_dir=50):
+    """Исходники в src/, мусор в node_modules/ и data/ (закрыты через .gitignore)."""
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("node_modules/\ndata/\n*.log\n")
+    for i in range(files):
+        d = os.path.join(root, "src", f"pkg{i // (per_dir * 10)}", f"mod{i // per_dir}")
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"f{i}.py" if i % 10 else f"f{i}.log"), "w") as f:
+            f.write(f"x = {i}\n")
+    for i in range(ignored):
+        top = "node_modules" if i % 2 else "data"
+        d = os.path.join(root, top, f"lib{i // (per_dir * 10)}", f"d{i // per_dir}")
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"f{i}.txt"), "w") as f:
+            f.write("junk\n")
+
+
+def old_walk(root):
+    # Как было до иерархического .gitignore: только корневой файл, проверка каждого файла
+    with open(os.path.join(root, ".gitignore")) as f:
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", f)
+    kept = 0
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in IGNORE_PATTERNS]
+        rel_dir = os.path.relpath(dirpath, root)
+        for name in files:
+            rel = os.path.join(rel_dir, name).replace("\\", "/")
+            if spec.match_file(rel):
+                continue
+            os.path.getsize(os.path.join(dirpath, name))
+            kept += 1
+    return kept
+
+
+def new_walk(root):
+    scan = scan_project(root, TARGET_EXTS, IGNORE_PATTERNS, GitIgnore(root))
+    return sum(len(files) for files in scan.modules_files.values())
+
+
+def best_of(fn, root, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(root)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10000, help="файлов в исходниках")
+    parser.add_argument("--ignored", type=int, default=30000, help="файлов в игнорируемых папках")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_gitignore_")
+    try:
+        make_tree(root, args.files, args.ignored)
+        old_t, old_n = best_of(old_walk, root, args.repeat)
+        new_t, new_n = best_of(new_walk, root, args.repeat)
+        print(f"old (os.walk + match_file): {old_t * 1000:8.1f} ms, files: {old_n}")
+        print(f"new (scandir + pruning):    {new_t * 1000:8.1f} ms, files: {new_n}")
+        print(f"speedup: x{old_t / new_t:.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
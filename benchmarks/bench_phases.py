@@ -0,0 +1,166 @@
+"""
+Бенчмарк этапов сборки на синтетическом репозитории (см. synthetic_repo.py).
+Каждый этап меряется отдельно (лучшее из --repeat запусков):
+
+    discovery  - обход проекта (scan_project + .gitignore) и индекс импортов
+    read       - чтение экспортируемых файлов
+    tokenize   - подсчет токенов (tiktoken, если доступен, иначе эвристика)
+    parse      - AST-анализ .py: скелет, импорты, символы
+    export     - запись code/ и signatures/ через ModuleWriter
+    end_to_end - collect_codebase целиком, без кэша
+
+Результаты можно сохранить и сравнить с прошлой версией:
+
+    python benchmarks/bench_phases.py --files 5000 --save before.json
+    git checkout feature && python benchmarks/bench_phases.py --files 5000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+
+from app.codebase_collector.code_parser import analyze_python, render_skeleton
+from app.codebase_collector.collector import collect_codebase, get_module_name_from_path
+from app.codebase_collector.gitignore import GitIgnore
+from app.codebase_collector.import_index import ImportIndex
+from app.codebase_collector.module_discovery import scan_project
+from app.codebase_collector.module_writer import ModuleWriter
+from app.codebase_collector.project_manager import ProjectManager
+from app.codebase_collector.tokenizer import count_tokens_batch, get_encoder, tokenizer_name
+from synthetic_repo import add_arguments, generate_from_args
+
+TARGET_EXTS = {".py", ".md", ".txt", ".js", ".json"}
+PHASES = ["discovery", "read", "tokenize", "parse", "export", "end_to_end"]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_phases(root, out_dir, workers):
+    """Один прогон всех этапов. Возвращает {этап: секунды} и счетчики."""
+    times = {}
+    ignore = list(ProjectManager.DEFAULT_IGNORE_PATTERNS)
+
+    start = time.perf_counter()
+    scan = scan_project(root, TARGET_EXTS, ignore, GitIgnore(root))
+    ImportIndex(scan.all_files)
+    times["discovery"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    contents = {}
+    for files in scan.modules_files.values():
+        for _, file_abs, rel_file, _, _ in files:
+            with open(file_abs, "r", encoding="utf-8", errors="ignore") as f:
+                contents[rel_file] = f.read()
+    times["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens = dict(zip(contents, count_tokens_batch(list(contents.values()))))
+    times["tokenize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    skeletons = {rel: render_skeleton(analyze_python(text, rel).outline, rel)
+                 for rel, text in contents.items() if rel.endswith(".py")}
+    times["parse"] = time.perf_counter() - start
+
+    export_dir = os.path.join(out_dir, "phases")
+    dir_code, dir_skel = os.path.join(export_dir, "code"), os.path.join(export_dir, "signatures")
+    os.makedirs(dir_code, exist_ok=True)
+    os.makedirs(dir_skel, exist_ok=True)
+    start = time.perf_counter()
+    for owner, files in scan.modules_files.items():
+        writer = ModuleWriter(dir_code, dir_skel, get_module_name_from_path(root, owner), "bench", (), [])
+        total = 0
+        for _, _, rel_file, _, _ in files:
+            writer.add_file(rel_file, tokens[rel_file], contents[rel_file], skeletons.get(rel_file))
+            total += tokens[rel_file]
+        writer.close(f"# TOTAL TOKENS: {total}")
+    times["export"] = time.perf_counter() - start
+
+    config = {"path": root, "extensions": sorted(TARGET_EXTS), "ignore_patterns": ignore}
+    start = time.perf_counter()
+    result = collect_codebase("bench", os.path.join(out_dir, "full"), workers=workers, config=config)
+    times["end_to_end"] = time.perf_counter() - start
+
+    counts = {"files": len(contents), "py_files": len(skeletons), "modules": len(scan.modules_files),
+              "tokens": sum(tokens.values()), "exported": result["count"]}
+    return times, counts
+
+
+def print_table(results, baseline=None):
+    print(f"{'phase':<12}{'ms':>10}" + (f"{'base ms':>10}{'delta':>9}" if baseline else ""))
+    for phase in PHASES:
+        ms = results["phases"][phase] * 1000
+        line = f"{phase:<12}{ms:>10.1f}"
+        base = (baseline or {}).get("phases", {}).get(phase)
+        if base:
+            line += f"{base * 1000:>10.1f}{(ms / (base * 1000) - 1) * 100:>+8.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="процессов для end_to_end")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", help="сравнить с сохраненными результатами")
+    parser.add_argument("--keep", action="store_true", help="не удалять сгенерированный репозиторий")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_phases_")
+    try:
+        repo = os.path.join(tmp, "repo")
+        params = generate_from_args(repo, args)
+        # Загрузка кодировщика - разовая цена на процесс, в tokenize не входит
+        start = time.perf_counter()
+        get_encoder()
+        encoder_load = time.perf_counter() - start
+        best = {}
+        for _ in range(args.repeat):
+            out_dir = os.path.join(tmp, "out")
+            shutil.rmtree(out_dir, ignore_errors=True)
+            times, counts = run_phases(repo, out_dir, args.workers)
+            for phase, seconds in times.items():
+                best[phase] = min(best.get(phase, seconds), seconds)
+
+        results = {
+            "meta": {"revision": git_revision(), "python": platform.python_version(),
+                     "tokenizer": tokenizer_name(),
+                     "encoder_load": round(encoder_load, 3), "repeat": args.repeat, "workers": args.workers},
+            "repo": {k: v for k, v in params.items() if k != "root"},
+            "counts": counts,
+            "phases": {phase: round(best[phase], 5) for phase in PHASES},
+        }
+        baseline = None
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        print(f"repo: {results['repo']}")
+        print(f"counts: {counts}, tokenizer: {results['meta']['tokenizer']}, revision: {results['meta']['revision']}")
+        print_table(results, baseline)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        if args.keep:
+            print(f"repo kept at {repo}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
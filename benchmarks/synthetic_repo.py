@@ -0,0 +1,185 @@
+"""
+Генератор синтетических репозиториев для бенчмарков (без сети, детерминированно по seed).
+
+    python benchmarks/synthetic_repo.py /tmp/repo --files 5000 --depth 4 --module-density 0.5
+
+Структура: src/<pkg>/<sub>/... глубиной до depth, часть папок - корни модулей
+(__init__.py + README.md), остальные - обычные пакеты или папки. Файлы: Python (классы, функции,
+импорты соседних модулей) вперемешку с .md/.txt/.js/.json. Плюс мусор,
+закрытый .gitignore: build/, node_modules/, *.log и вложенные .gitignore.
+"""
+import argparse
+import os
+import random
+
+NON_PY_EXTS = [".md", ".txt", ".js", ".json"]
+
+PY_TEMPLATE = '''"""Synthetic module {name}."""
+{imports}
+
+CONSTANT_{idx} = {idx}
+
+
+class Model{idx}:
+    """Model number {idx}."""
+    limit: int = {idx}
+
+    def __init__(self, value: int = 0):
+        self.value = value
+        self.items = []
+
+    def process(self, data: list) -> dict:
+        """Process input data."""
+        result = {{}}
+        for i, item in enumerate(data):
+            if item is None:
+                continue
+            result[i] = self._transform(item)
+        return result
+
+    def _transform(self, item):
+        def scale(x):
+            return x * {idx}
+        return scale(item) + self.value
+
+    @property
+    def size(self) -> int:
+        return len(self.items)
+
+
+def helper_{idx}(a: int, b: int = 2, *args, **kwargs) -> int:
+    """Helper function."""
+    if a > b:
+        return a - b
+    return sum(args) + a * b
+
+
+async def fetch_{idx}(url: str) -> bytes:
+    return url.encode("utf-8")
+'''
+
+TEXT_TEMPLATES = {
+    ".md": "# Notes {idx}\n\nSome documentation for component {idx}.\n\n- item one\n- item two\n",
+    ".txt": "Plain text file {idx}.\n" * 8,
+    ".js": "export function handler{idx}(req, res) {{\n  const value = req.body.value * {idx};\n  return res.json({{ value }});\n}}\n",
+    ".json": '{{"id": {idx}, "name": "item-{idx}", "tags": ["a", "b", "c"], "enabled": true}}\n',
+}
+
+
+def _dirs(depth, fanout, rng):
+    """Список папок внутри src/ (относительные пути), в порядке обхода."""
+    dirs = [""]
+    frontier = [""]
+    for level in range(depth):
+        nxt = []
+        for parent in frontier:
+            for i in range(fanout):
+                name = f"pkg{i}" if level == 0 else f"{'sub' if rng.random() < 0.7 else 'part'}{i}"
+                path = f"{parent}/{name}" if parent else name
+                nxt.append(path)
+        dirs.extend(nxt)
+        frontier = nxt
+    return dirs
+
+
+def generate(root, files=1000, depth=3, module_density=0.5, py_ratio=0.7, ignored=None,
+             fanout=4, seed=0):
+    """
+    Создает репозиторий в root. Возвращает словарь с параметрами и статистикой.
+    files - число экспортируемых файлов (без README и __init__.py),
+    module_density - доля папок, которые становятся корнями модулей,
+    py_ratio - доля .py среди файлов, ignored - число файлов-мусора
+    (по умолчанию files // 2).
+    """
+    rng = random.Random(seed)
+    if ignored is None:
+        ignored = files // 2
+    os.makedirs(root, exist_ok=True)
+
+    def write(rel, text):
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    write(".gitignore", "build/\nnode_modules/\n*.log\n__pycache__/\n")
+    write("README.md", "# Synthetic repo\n")
+
+    dirs = [d for d in _dirs(depth, fanout, rng) if d]
+    module_dirs = set()  # папки-пакеты (с __init__.py), для относительных импортов
+    module_roots = 0
+    for d in dirs:
+        # Корень модуля для коллектора: пакет с __init__.py и README
+        if rng.random() < module_density:
+            module_dirs.add(d)
+            module_roots += 1
+            write(f"src/{d}/__init__.py", f'"""Package {d}."""\n')
+            write(f"src/{d}/README.md", f"# {d}\n\nModule description.\n")
+        elif rng.random() < 0.5:
+            module_dirs.add(d)
+            write(f"src/{d}/__init__.py", "")
+        if rng.random() < 0.1:
+            # Вложенный .gitignore со своими правилами
+            write(f"src/{d}/.gitignore", "*.tmp\ncache/\n")
+            write(f"src/{d}/scratch.tmp", "tmp\n")
+            write(f"src/{d}/cache/blob.py", "x = 1\n")
+
+    py_modules = []
+    dir_modules = {}
+    py_count = 0
+    for idx in range(files):
+        d = dirs[rng.randrange(len(dirs))]
+        if rng.random() < py_ratio:
+            name = f"mod{idx}"
+            imports = ["import os", "from typing import List"]
+            for target in rng.sample(py_modules, min(2, len(py_modules))):
+                imports.append(f"import {target}")
+            siblings = dir_modules.setdefault(d, [])
+            if siblings and d in module_dirs:
+                imports.append(f"from . import {rng.choice(siblings)}")
+            siblings.append(name)
+            write(f"src/{d}/{name}.py", PY_TEMPLATE.format(name=name, idx=idx, imports="\n".join(imports)))
+            py_modules.append(f"{d.replace('/', '.')}.{name}")
+            py_count += 1
+        else:
+            ext = NON_PY_EXTS[idx % len(NON_PY_EXTS)]
+            write(f"src/{d}/file{idx}{ext}", TEXT_TEMPLATES[ext].format(idx=idx))
+
+    for idx in range(ignored):
+        kind = idx % 3
+        if kind == 0:
+            write(f"build/lib{idx % 7}/gen{idx}.py", f"x = {idx}\n")
+        elif kind == 1:
+            write(f"node_modules/dep{idx % 11}/index{idx}.js", "module.exports = {};\n")
+        else:
+            write(f"src/{dirs[idx % len(dirs)]}/debug{idx}.log", "log line\n")
+
+    return {"root": root, "files": files, "py_files": py_count, "dirs": len(dirs),
+            "packages": len(module_dirs), "module_roots": module_roots, "ignored": ignored, "depth": depth, "seed": seed}
+
+
+def add_arguments(parser):
+    parser.add_argument("--files", type=int, default=2000, help="экспортируемых файлов")
+    parser.add_argument("--depth", type=int, default=3, help="глубина папок в src/")
+    parser.add_argument("--fanout", type=int, default=4, help="подпапок на папку")
+    parser.add_argument("--module-density", type=float, default=0.5, help="доля папок-модулей (0..1)")
+    parser.add_argument("--py-ratio", type=float, default=0.7, help="доля .py файлов (0..1)")
+    parser.add_argument("--ignored", type=int, help="файлов-мусора под .gitignore (по умолчанию files/2)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generate_from_args(root, args):
+    return generate(root, files=args.files, depth=args.depth, module_density=args.module_density,
+                    py_ratio=args.py_ratio, ignored=args.ignored, fanout=args.fanout, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="куда сгенерировать репозиторий")
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(generate_from_args(args.root, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # Добавляем папку src в пути поиска, чтобы Python видел пакет app
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -7,5 +8,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from app.ui.main_window import MainWindow
 
 if __name__ == "__main__":
+    # Нужно для пула процессов в собранном exe (PyInstaller)
+    multiprocessing.freeze_support()
     app = MainWindow()
     app.mainloop()
\ No newline at end of file
@@ -1,6 +1,9 @@
 # Импортируем функции и классы, которые будут использоваться для сбора данных
-from .collector import collect_codebase
+from .collector import collect_codebase, CollectCancelled
 from .project_manager import ProjectManager
 from .module_discovery import discover_modules
 from .output_formatter import format_output
-from .updater import update_project  # Если эта функция не существует, заменим или удалим
+from .updater import update_project, AnalysisCache
+from .archive import read_index, read_module
+from .sqlite_export import search, find_symbol
+from .slicer import make_slice
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import struct
+import zipfile
+
+from .slicer import SLICES_DIR
+from .stats import PROFILE_NAME, STATS_NAME
+
+ARCHIVE_SUFFIX = ".zip"
+INDEX_NAME = "index.json"
+
+# Локальный заголовок zip: сигнатура, версия, флаги, метод, время, дата, crc,
+# сжатый и исходный размер, длины имени и extra - всего 30 байт
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+def _export_members(export_dir):
+    # Файлы экспорта в стабильном порядке; недописанные .part, диагностика
+    # конкретного запуска (stats.json, профиль) и срезы в архив не входят
+    members = []
+    for dirpath, dirnames, filenames in os.walk(export_dir):
+        if dirpath == export_dir and SLICES_DIR in dirnames:
+            dirnames.remove(SLICES_DIR)
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(".part") or (dirpath == export_dir and name in (STATS_NAME, PROFILE_NAME)):
+                continue
+            path = os.path.join(dirpath, name)
+            members.append((os.path.relpath(path, export_dir).replace(os.sep, "/"), path))
+    return members
+
+
+def _fingerprint(members, module_tokens, sources):
+    # Не по содержимому экспорта (его чтение и хэш - как вторая сборка), а по
+    # тому, из чего он получен: отпечаткам модулей и параметрам сборки, которые
+    # коллектор уже посчитал. ALL_READMES.md, architecture.json и граф
+    # переписываются каждой сборкой, поэтому их mtime не смотрим; состав и
+    # размеры файлов - дешевый stat на случай правок экспорта в обход сборки
+    h = hashlib.sha1()
+    for arcname, path in members:
+        h.update(f"{arcname}\0{os.path.getsize(path)}\n".encode("utf-8"))
+    h.update(json.dumps({"modules": module_tokens, "sources": sources}, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _data_offsets(path, infos):
+    """
+    Смещение сжатых данных каждого файла: сразу за локальным заголовком,
+    длины имени и extra в котором могут отличаться от центрального каталога.
+    """
+    offsets = {}
+    with open(path, "rb") as f:
+        for info in infos:
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            offsets[info.filename] = info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1]
+    return offsets
+
+
+def write_archive(export_dir, archive_path, project_name, module_tokens, timestamp, sources=None):
+    """
+    Упаковывает папку экспорта в один zip: каждый файл сжат отдельно (deflate),
+    поэтому любой модуль извлекается без распаковки остальных.
+    В index.json: модуль -> его файлы и токены, файл -> смещение сжатых данных,
+    сжатый и исходный размер (можно читать и без zipfile: zlib с wbits=-15).
+    Архив пишется во временный .part и атомарно подменяет старый; если
+    экспорт не менялся с прошлой упаковки, архив не пересобирается.
+    module_tokens - {модуль: токены}. sources - то, из чего собран экспорт
+    (отпечатки состава модулей, параметры сборки; любой JSON): по нему и
+    составу файлов экспорта решается, менялся ли он. Возвращает индекс.
+    """
+    members = _export_members(export_dir)
+    fingerprint = _fingerprint(members, module_tokens, sources)
+    try:
+        old = read_index(archive_path)
+        if old.get("fingerprint") == fingerprint:
+            return old
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+
+    part = archive_path + ".part"
+    try:
+        with zipfile.ZipFile(part, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            for arcname, path in members:
+                zf.write(path, arcname)
+            infos = zf.infolist()
+
+        offsets = _data_offsets(part, infos)
+        files = {info.filename: {"offset": offsets[info.filename], "compressed_size": info.compress_size,
+                                 "size": info.file_size} for info in infos}
+        modules = {}
+        for module, tokens in sorted(module_tokens.items()):
+            code, skel = f"code/{module}.txt", f"signatures/{module}_API.txt"
+            modules[module] = {"tokens": tokens, "code": code if code in files else None,
+                               "signatures": skel if skel in files else None}
+        index = {"project": project_name, "date": timestamp, "fingerprint": fingerprint,
+                 "compression": "deflate", "modules": modules, "files": files}
+
+        # Индекс - последним файлом: смещения остальных к этому моменту известны
+        with zipfile.ZipFile(part, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(INDEX_NAME, json.dumps(index, indent=2, ensure_ascii=False))
+        os.replace(part, archive_path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return index
+
+
+def read_index(archive_path):
+    with zipfile.ZipFile(archive_path) as zf:
+        return json.loads(zf.read(INDEX_NAME))
+
+
+def read_module(archive_path, module, kind="code"):
+    """
+    Текст одного модуля из архива: kind - "code" или "signatures".
+    Распаковывается только этот файл. None - у модуля нет такого файла.
+    """
+    with zipfile.ZipFile(archive_path) as zf:
+        entry = json.loads(zf.read(INDEX_NAME))["modules"][module]
+        if entry[kind] is None:
+            return None
+        return zf.read(entry[kind]).decode("utf-8")
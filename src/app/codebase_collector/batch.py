@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .collector import collect_codebase
+from .project_manager import ProjectManager
+from .updater import AnalysisCache
+
+# Больше одновременных проектов не помогает: обход, слияние и запись
+# идут в основном процессе и упираются в GIL
+MAX_PARALLEL_PROJECTS = 4
+
+
+def collect_batch(names=None, base_export_dir=None, workers=None, parallel_projects=None,
+                  incremental=True, progress=None, **collect_kwargs):
+    """
+    Пакетная сборка нескольких проектов (по умолчанию - всех из ProjectManager).
+    Чтение и анализ файлов всех проектов идут на одном пуле из workers процессов:
+    пачки разных проектов попадают в общую очередь вперемешку, общий семафор
+    держит в работе не больше 2 пачек на процесс. Обход, слияние и запись
+    проектов идут в потоках (parallel_projects одновременно), пока пул занят
+    пачками соседей, поэтому ядра не простаивают между проектами.
+    progress(event) получает события сборок с ключом "project".
+    Ошибка одного проекта не останавливает остальные - она попадает в отчет.
+    """
+    projects = ProjectManager.load_projects()
+    names = sorted(projects) if names is None else list(names)
+    unknown = [name for name in names if name not in projects]
+    if unknown:
+        raise ValueError(f"Unknown projects: {', '.join(unknown)}")
+    if base_export_dir is None:
+        base_export_dir = ProjectManager.load_global_settings().get("default_export_dir")
+    if not base_export_dir:
+        raise ValueError("No export dir: pass base_export_dir or set default_export_dir")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if parallel_projects is None:
+        parallel_projects = min(MAX_PARALLEL_PROJECTS, max(1, workers))
+    parallel_projects = max(1, min(parallel_projects, len(names) or 1))
+
+    emit_lock = threading.Lock()
+
+    def emit(name, event):
+        if progress is not None:
+            with emit_lock:
+                progress({"event": event["event"], "project": name, **event})
+
+    def run(name, executor, slots):
+        entry = {"project": name}
+        start = time.perf_counter()
+        emit(name, {"event": "project_start"})
+        try:
+            cache = AnalysisCache(ProjectManager.get_cache_file(name)) if incremental else None
+            result = collect_codebase(name, base_export_dir, cache=cache, workers=workers,
+                                      config=projects[name], executor=executor, slots=slots,
+                                      progress=(lambda event: emit(name, event)) if progress else None,
+                                      **collect_kwargs)
+            if cache is not None:
+                cache.save()
+            entry.update(status="ok", files=result["count"], tokens=result["total_tokens"],
+                         updated_modules=len(result["updated_modules"]), path=result["path"],
+                         tokens_saved=result["dedup"]["tokens_saved"], errors=result["errors"])
+        except Exception as e:
+            entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+        emit(name, {"event": "project_done", **{k: v for k, v in entry.items() if k != "project"}})
+        return entry
+
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    slots = threading.BoundedSemaphore(workers * 2) if executor is not None else None
+    try:
+        with ThreadPoolExecutor(max_workers=parallel_projects) as threads:
+            report = list(threads.map(lambda name: run(name, executor, slots), names))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return {
+        "projects": report,
+        "seconds": round(time.perf_counter() - start, 3),
+        "workers": workers,
+        "parallel_projects": parallel_projects,
+        "files": sum(entry.get("files", 0) for entry in report),
+        "tokens": sum(entry.get("tokens", 0) for entry in report),
+        "tokens_saved": sum(entry.get("tokens_saved", 0) for entry in report),
+        "failed": [entry["project"] for entry in report if entry["status"] != "ok"],
+    }
+
+
+def format_report(report):
+    """Отчет пакетной сборки в виде текстовой таблицы."""
+    rows = [("PROJECT", "STATUS", "SECONDS", "FILES", "TOKENS")]
+    for entry in report["projects"]:
+        rows.append((entry["project"], entry["status"], f"{entry['seconds']:.2f}",
+                     str(entry.get("files", "-")), str(entry.get("tokens", "-"))))
+    rows.append(("TOTAL", f"{len(report['failed'])} failed", f"{report['seconds']:.2f}",
+                 str(report["files"]), str(report["tokens"])))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "-" * len(lines[0]))
+    lines.insert(-1, "-" * len(lines[0]))
+    return "\n".join(lines)
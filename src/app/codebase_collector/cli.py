@@ -0,0 +1,283 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+from .code_parser import DEFAULT_SKELETON_LEVEL, SKELETON_LEVELS
+from .packer import parse_budget
+from .project_manager import ProjectManager
+
+# Коды возврата
+EXIT_OK = 0
+EXIT_FAILED = 1       # сборка упала
+EXIT_USAGE = 2        # неверные аргументы, проект не найден (как у argparse)
+EXIT_PARTIAL = 3      # сборка прошла, но часть файлов не прочиталась
+EXIT_INTERRUPTED = 130
+
+
+class UsageError(Exception):
+    pass
+
+
+class EventStream:
+    """
+    События в stdout по одному JSON-объекту на строку. У каждого события
+    есть "event" и "t" - секунды с запуска команды. Все прочие print()
+    на время команды уходят в stderr, чтобы не ломать поток.
+    """
+
+    def __init__(self, out):
+        self._out = out
+        self._start = time.perf_counter()
+        self.errors = 0
+
+    def __call__(self, event):
+        if event.get("event") == "error":
+            self.errors += 1
+        line = {"event": event["event"], "t": round(time.perf_counter() - self._start, 3)}
+        line.update((k, v) for k, v in event.items() if k != "event")
+        self._out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._out.flush()
+
+    def emit(self, event, **fields):
+        self({"event": event, **fields})
+
+
+def _split_list(values):
+    # --ext .py,.md --ext .txt -> [".py", ".md", ".txt"]
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
+
+
+def resolve_project(target, args):
+    """
+    Имя зарегистрированного проекта или путь к папке -> (имя, config).
+    Для папки, зарегистрированной под другим именем, берутся её настройки.
+    Флаги --ext/--ignore переопределяют сохраненные настройки.
+    """
+    projects = ProjectManager.load_projects()
+    if target in projects:
+        name, config = target, dict(projects[target])
+    elif os.path.isdir(target):
+        path = os.path.abspath(target)
+        name = next((n for n, c in projects.items()
+                     if c.get("path") and os.path.abspath(c["path"]) == path), None)
+        if name is not None:
+            config = dict(projects[name])
+        else:
+            name = os.path.basename(path.rstrip(os.sep)) or "root"
+            config = {"path": path,
+                      "extensions": list(ProjectManager.DEFAULT_EXTENSIONS),
+                      "ignore_patterns": list(ProjectManager.DEFAULT_IGNORE_PATTERNS)}
+    else:
+        raise UsageError(f"unknown project or directory: {target}")
+
+    if not config.get("path") or not os.path.isdir(config["path"]):
+        raise UsageError(f"project path not found: {config.get('path')}")
+    if args.name:
+        name = args.name
+    if args.ext:
+        config["extensions"] = [e if e.startswith(".") else "." + e for e in _split_list(args.ext)]
+    if args.ignore:
+        config["ignore_patterns"] = _split_list(args.ignore)
+    return name, config
+
+
+def _collect_options(args, settings):
+    export_dir = args.export_dir or settings.get("default_export_dir")
+    if not export_dir:
+        raise UsageError("--export-dir is required (no default_export_dir in global settings)")
+    # Как в GUI: по умолчанию - по числу ядер
+    workers = args.workers if args.workers is not None else settings.get("workers")
+    token_mode = args.token_mode or settings.get("token_mode", "exact")
+    budget = args.budget or settings.get("bundle_budget")
+    return export_dir, {"workers": workers or os.cpu_count(), "token_mode": token_mode,
+                        "bundle_budget": parse_budget(budget) if budget else None,
+                        "sniff_files": not args.no_sniff, "dedup": args.dedup or settings.get("dedup", False),
+                        "archive": args.archive or settings.get("archive", False),
+                        "sqlite": args.sqlite or settings.get("sqlite", False),
+                        "skeleton_level": args.skeleton_level or settings.get("skeleton_level", DEFAULT_SKELETON_LEVEL)}
+
+
+def cmd_collect(args, events):
+    from .collector import collect_codebase
+    from .updater import AnalysisCache
+
+    name, config = resolve_project(args.project, args)
+    export_dir, options = _collect_options(args, ProjectManager.load_global_settings())
+    events.emit("start", project=name, root=config["path"], export_dir=export_dir,
+                incremental=not args.full, **options)
+
+    cache = None if args.full else AnalysisCache(ProjectManager.get_cache_file(name))
+    start = time.perf_counter()
+    result = collect_codebase(name, export_dir, cache=cache, config=config, progress=events,
+                              profile=args.profile, **options)
+    if cache is not None:
+        cache.save()
+    events.emit("done", project=name, files=result["count"], path=result["path"],
+                updated_modules=result["updated_modules"], tokens=result["tokens"],
+                timings=result["timings"], bundles=result["bundles"], dedup=result["dedup"], archive=result["archive"],
+                database=result["database"], skeletons=result["skeletons"],
+                seconds=round(time.perf_counter() - start, 3),
+                errors=events.errors)
+    return EXIT_PARTIAL if events.errors else EXIT_OK
+
+
+def cmd_watch(args, events):
+    from .watcher import ProjectWatcher
+
+    name, config = resolve_project(args.project, args)
+    export_dir, options = _collect_options(args, ProjectManager.load_global_settings())
+
+    def on_update(result, changes, seconds):
+        events.emit("update", project=name, changes=sorted(changes) if changes else None,
+                    updated_modules=result["updated_modules"], files=result["count"],
+                    seconds=round(seconds, 3))
+
+    watcher = ProjectWatcher(name, export_dir, debounce=args.debounce, use_inotify=not args.poll,
+                             on_update=on_update, config=config, **options)
+    events.emit("start", project=name, root=config["path"], export_dir=export_dir, watch=True, **options)
+    watcher.run()
+    return EXIT_OK
+
+
+def cmd_batch(args, events):
+    from .batch import collect_batch, format_report
+
+    settings = ProjectManager.load_global_settings()
+    export_dir, options = _collect_options(args, settings)
+    events.emit("start", projects=args.projects or "all", export_dir=export_dir,
+                incremental=not args.full, **options)
+    try:
+        report = collect_batch(args.projects or None, export_dir, parallel_projects=args.parallel,
+                               incremental=not args.full, progress=events, **options)
+    except ValueError as e:
+        raise UsageError(str(e))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    # Таблица для человека - в stderr, машинный отчет - событием summary
+    print(format_report(report))
+    events.emit("summary", **report)
+    if report["failed"]:
+        return EXIT_FAILED
+    return EXIT_PARTIAL if events.errors else EXIT_OK
+
+
+def cmd_slice(args, events):
+    from .slicer import make_slice
+
+    export_dir = args.export_dir or ProjectManager.load_global_settings().get("default_export_dir")
+    if not export_dir:
+        raise UsageError("--export-dir is required (no default_export_dir in global settings)")
+    name = args.project
+    projects = ProjectManager.load_projects()
+    if name not in projects and os.path.isdir(name):
+        path = os.path.abspath(name)
+        name = next((n for n, c in projects.items()
+                     if c.get("path") and os.path.abspath(c["path"]) == path),
+                    os.path.basename(path.rstrip(os.sep)) or "root")
+    try:
+        result = make_slice(os.path.join(export_dir, name), args.entry, budget=parse_budget(args.budget),
+                            full_depth=args.full_depth, max_depth=args.max_depth, output=args.output)
+    except (ValueError, FileNotFoundError) as e:
+        raise UsageError(str(e))
+    events.emit("slice", project=name, **result)
+    return EXIT_OK
+
+
+def cmd_projects(args, events):
+    for name, config in sorted(ProjectManager.load_projects().items()):
+        events.emit("project", name=name, path=config.get("path"),
+                    extensions=config.get("extensions", []), ignore_patterns=config.get("ignore_patterns", []))
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="codebase-collector",
+                                     description="Сбор базы знаний проекта без GUI. События - JSON lines в stdout.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_project_args(p):
+        p.add_argument("project", help="имя проекта из ProjectManager или путь к папке")
+        p.add_argument("--export-dir", help="папка экспорта (по умолчанию - из глобальных настроек)")
+        p.add_argument("--name", help="имя проекта в экспорте (по умолчанию - имя папки)")
+        p.add_argument("--ext", action="append", help="расширения через запятую, напр. .py,.md")
+        p.add_argument("--ignore", action="append", help="игнорируемые папки через запятую")
+        p.add_argument("--workers", type=int, help="процессов для анализа (0 - по числу ядер)")
+        p.add_argument("--token-mode", choices=["exact", "estimate"])
+        p.add_argument("--budget", help="разложить файлы по бандлам не больше N токенов, напр. 128k")
+        p.add_argument("--no-sniff", action="store_true",
+                       help="не отсеивать бинарные, минифицированные и сгенерированные файлы")
+        p.add_argument("--dedup", action="store_true", help="копии файлов писать ссылкой на первый экземпляр")
+        p.add_argument("--archive", action="store_true", help="упаковать экспорт в <project>.zip с индексом модулей")
+        p.add_argument("--sqlite", action="store_true", help="вести codebase.sqlite: файлы, символы, граф, FTS5")
+        p.add_argument("--skeleton-level", choices=SKELETON_LEVELS,
+                       help="детализация signatures/: имена, сигнатуры, + докстринги, + return-ы (по умолчанию)")
+
+    p = sub.add_parser("collect", help="собрать базу знаний проекта")
+    add_project_args(p)
+    p.add_argument("--full", action="store_true", help="без кэша: полная пересборка")
+    p.add_argument("--profile", action="store_true", help="cProfile сборки в profile.pstats")
+    p.set_defaults(func=cmd_collect)
+
+    p = sub.add_parser("watch", help="пересобирать при изменении файлов")
+    add_project_args(p)
+    p.add_argument("--debounce", type=float, default=0.3)
+    p.add_argument("--poll", action="store_true", help="не использовать inotify, только опрос")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("batch", help="собрать несколько проектов на общем пуле процессов")
+    p.add_argument("projects", nargs="*", help="имена проектов (по умолчанию - все зарегистрированные)")
+    p.add_argument("--export-dir", help="папка экспорта (по умолчанию - из глобальных настроек)")
+    p.add_argument("--workers", type=int, help="процессов в общем пуле (0 - по числу ядер)")
+    p.add_argument("--parallel", type=int, help="сколько проектов собирать одновременно")
+    p.add_argument("--token-mode", choices=["exact", "estimate"])
+    p.add_argument("--budget", help="разложить файлы по бандлам не больше N токенов, напр. 128k")
+    p.add_argument("--no-sniff", action="store_true",
+                   help="не отсеивать бинарные, минифицированные и сгенерированные файлы")
+    p.add_argument("--dedup", action="store_true", help="копии файлов писать ссылкой на первый экземпляр")
+    p.add_argument("--archive", action="store_true", help="упаковать экспорт в <project>.zip с индексом модулей")
+    p.add_argument("--sqlite", action="store_true", help="вести codebase.sqlite: файлы, символы, граф, FTS5")
+    p.add_argument("--skeleton-level", choices=SKELETON_LEVELS,
+                   help="детализация signatures/: имена, сигнатуры, + докстринги, + return-ы (по умолчанию)")
+    p.add_argument("--full", action="store_true", help="без кэша: полная пересборка")
+    p.add_argument("--report", help="сохранить отчет в JSON-файл")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("slice", help="срез контекста от файла или символа по графу импортов")
+    p.add_argument("project", help="имя проекта (или путь к папке), уже собранного в --export-dir")
+    p.add_argument("entry", help="путь файла в проекте или символ: pkg.core.Runner.run, Runner.run")
+    p.add_argument("--export-dir", help="папка экспорта (по умолчанию - из глобальных настроек)")
+    p.add_argument("--budget", default="100k", help="бюджет токенов среза, напр. 32k (по умолчанию 100k)")
+    p.add_argument("--full-depth", type=int, default=1, help="до какой глубины импорта файлы идут целиком")
+    p.add_argument("--max-depth", type=int, help="дальше этой глубины граф не обходится")
+    p.add_argument("--output", help="куда записать срез (по умолчанию - slices/ в экспорте проекта)")
+    p.set_defaults(func=cmd_slice)
+
+    p = sub.add_parser("projects", help="список зарегистрированных проектов")
+    p.set_defaults(func=cmd_projects)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    events = EventStream(sys.stdout)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            return args.func(args, events)
+    except UsageError as e:
+        events.emit("error", message=str(e), fatal=True)
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        events.emit("interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        events.emit("error", message=f"{type(e).__name__}: {e}", fatal=True)
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
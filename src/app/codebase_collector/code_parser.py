@@ -1,54 +1,163 @@
 import ast
-import sys
+from collections import defaultdict, deque, namedtuple
+
+# Уровни детализации скелета, от самого короткого: только имена; сигнатуры;
+# сигнатуры + докстринги; сигнатуры + докстринги + что возвращают функции.
+# Каждый уровень включает предыдущий
+SKELETON_LEVELS = ("names", "signatures", "docstrings", "returns")
+DEFAULT_SKELETON_LEVEL = "returns"
+_NAMES, _SIGNATURES, _DOCSTRINGS, _RETURNS = range(len(SKELETON_LEVELS))
+
+# Ограничения, чтобы скелет не разрастался на отдельных файлах
+RETURN_MAX_CHARS = 50    # длина одного return-выражения
+MAX_RETURNS = 5          # разных return-ов на функцию
+CLASS_DOC_MAX_LINES = 20  # строк докстринга класса
+
+# Результат одного прохода по .py файлу:
+# outline - структура скелета, из которой render_skeleton без разбора файла
+# рисует любой уровень (списки и строки - хранится в кэше анализа как есть),
+# imports - [(module, level, lineno, names)], names - импортируемые имена (from x import a, b),
+# symbols - [(qualname, kind, lineno, end_lineno, signature)] для функций, методов и классов,
+# signature - строка определения без тела ("def f(a: int) -> str", "class A(B)").
+#
+# Элементы outline:
+# ("var", имя, текст)                                   - аннотированная переменная
+# ("def", имя, декораторы, сигнатура, докстринг, returns)
+# ("class", имя, декораторы, заголовок, докстринг, члены) - члены: переменные, затем методы и классы
+# ("error", сообщение)                                  - файл не разобрался
+# ("decl", ключевое слово, имя, сигнатура, комментарий, члены) - объявление
+#                                                         не-Python файла (lang_parser), члены None у листьев
+PyAnalysis = namedtuple("PyAnalysis", ["outline", "imports", "symbols"])
+
+# Поля, в которых у составных операторов лежат вложенные операторы (в порядке полей ast)
+_BLOCK_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+_COMPOUND = tuple(getattr(ast, name) for name in
+                  ("If", "For", "AsyncFor", "While", "With", "AsyncWith", "Try", "TryStar", "Match",
+                   "ClassDef", "ExceptHandler", "match_case") if hasattr(ast, name))
+
+def analyze_python(code: str, filename: str) -> PyAnalysis:
+    """
+    Разбирает файл один раз и строит по одному дереву и структуру скелета, и
+    импорты, и список определений. Return-ы собираются тем же обходом, без
+    ast.walk по каждой функции. Декораторы, аннотации, базы классов и return-ы
+    берутся срезом исходника по позициям нод; ast.unparse - только для
+    аргументов функций (у них нет позиций) и многострочных выражений.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        return PyAnalysis([("error", str(e))], [], [])
+
+    if "\r" in code:
+        code = code.replace("\r\n", "\n").replace("\r", "\n")
+    lines = code.split("\n")
+    imports, returns = _scan_tree(tree, lines=lines)
+    symbols = []
+    outline = _outline(tree, lines, returns, symbols)
+    return PyAnalysis(outline, imports, symbols)
+
+def _scan_tree(root, owner=None, lines=None):
+    """
+    Один обход дерева (в ширину, как ast.walk, но только по блокам операторов):
+    импорты всего файла и return-ы, сгруппированные по ближайшей функции.
+    """
+    imports = []
+    returns = defaultdict(dict)
+    queue = deque([(root, owner)])
+    while queue:
+        node, owner = queue.popleft()
+        for field in _BLOCK_FIELDS:
+            # В выражениях не бывает ни return, ни import - туда не спускаемся
+            block = getattr(node, field, None)
+            if not block:
+                continue
+            for child in block:
+                if isinstance(child, ast.Import):
+                    for alias in child.names:
+                        imports.append((alias.name, 0, child.lineno, ()))
+                elif isinstance(child, ast.ImportFrom):
+                    # from . import x -> module == ""
+                    names = tuple(alias.name for alias in child.names)
+                    imports.append((child.module or "", child.level, child.lineno, names))
+                elif isinstance(child, ast.Return):
+                    if child.value is not None and owner is not None:
+                        found = returns[id(owner)]
+                        text = _short_return(child.value, lines)
+                        if text not in found:
+                            found[text if len(found) < MAX_RETURNS else "..."] = None
+                elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    queue.append((child, child))
+                elif isinstance(child, _COMPOUND):
+                    queue.append((child, owner))
+    return imports, returns
+
+# Выражения, которые в исходнике после return могут стоять без скобок
+_BARE = (ast.Tuple, ast.Yield, ast.YieldFrom, ast.NamedExpr)
+
+def _cut(line, start, end):
+    # col_offset у нод - смещение в байтах UTF-8, а не в символах
+    if line.isascii():
+        return line[start:end]
+    return line.encode("utf-8")[start:end].decode("utf-8", errors="replace")
+
+def _strip_comment(line):
+    # Комментарий в конце строки: "#" вне строковых литералов (по четности кавычек)
+    pos = line.find("#")
+    while pos >= 0:
+        head = line[:pos]
+        if head.count("'") % 2 == 0 and head.count('"') % 2 == 0:
+            return head.strip()
+        pos = line.find("#", pos + 1)
+    return line.strip()
+
+def _segment(lines, node):
+    """Текст ноды: однострочная - срез исходника, многострочная - ast.unparse."""
+    if lines is not None and node.lineno == node.end_lineno:
+        return _cut(lines[node.lineno - 1], node.col_offset, node.end_col_offset)
+    return ast.unparse(node)
+
+def _short_return(value, lines=None) -> str:
+    if lines is None:
+        try:
+            # ast.unparse восстанавливает код из ноды (Python 3.9+)
+            ret_code = ast.unparse(value)
+        except Exception:
+            return "..."
+    elif value.lineno == value.end_lineno:
+        ret_code = _cut(lines[value.lineno - 1], value.col_offset, value.end_col_offset)
+    else:
+        # Многострочное выражение (dict/list на полэкрана): склеиваем строки,
+        # пока не наберется на обрезку, - цена не зависит от размера выражения
+        ret_code = _strip_comment(_cut(lines[value.lineno - 1], value.col_offset, None))
+        for i in range(value.lineno, value.end_lineno):
+            if len(ret_code) > RETURN_MAX_CHARS:
+                break
+            line = _strip_comment(lines[i] if i < value.end_lineno - 1 else
+                                  _cut(lines[i], 0, value.end_col_offset))
+            if line:
+                glue = "" if ret_code.endswith(("(", "[", "{")) or line.startswith((")", "]", "}")) else " "
+                ret_code += glue + line
+    if isinstance(value, _BARE) and not ret_code.startswith("("):
+        # return a, b - кортеж без скобок; в "a, b | c" их не отличить от соседних return-ов
+        ret_code = f"({ret_code})"
+    # Если возвращается что-то длинное (dict/list comprehension), обрезаем
+    if len(ret_code) > RETURN_MAX_CHARS:
+        ret_code = ret_code[:RETURN_MAX_CHARS - 3] + "..."
+    return ret_code
 
 def get_return_values(node: ast.FunctionDef) -> str:
     """
     Ищет все return statement в функции и возвращает их строковое представление.
     """
-    returns = []
-    for child in ast.walk(node):
-        if isinstance(child, ast.Return) and child.value:
-            try:
-                # ast.unparse восстанавливает код из ноды (Python 3.9+)
-                ret_code = ast.unparse(child.value)
-                # Если возвращается что-то длинное (dict/list comprehension), обрезаем
-                if len(ret_code) > 50:
-                    ret_code = ret_code[:47] + "..."
-                returns.append(ret_code)
-            except:
-                returns.append("...")
-    
-    if not returns:
-        return ""
-    
-    # Убираем дубликаты, сохраняя порядок
-    unique = sorted(list(set(returns)), key=lambda x: returns.index(x))
-    return " | ".join(unique)
-
-def generate_skeleton_for_file(code: str, filename: str) -> str:
+    _, returns = _scan_tree(node, owner=node)
+    return " | ".join(returns.get(id(node), ()))
+
+def generate_skeleton_for_file(code: str, filename: str, level: str = DEFAULT_SKELETON_LEVEL) -> str:
     """
     Создает API-скелет файла с сохранением Type Hints и Return statements.
+    level - один из SKELETON_LEVELS.
     """
-    try:
-        tree = ast.parse(code)
-    except SyntaxError as e:
-        return f"# SYNTAX ERROR in {filename}: {e}\n"
-
-    lines = [f"# SKELETON: {filename}"]
-    
-    # Обрабатываем глобальные переменные (константы), если они аннотированы
-    for node in tree.body:
-        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
-            # CONST: int = 10
-            lines.append(ast.unparse(node))
-
-    for node in tree.body:
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            lines.append(_process_func(node, indent=0))
-        elif isinstance(node, ast.ClassDef):
-            lines.append(_process_class(node, indent=0))
-            
-    return "\n".join(lines) + "\n"
+    return render_skeleton(analyze_python(code, filename).outline, filename, level)
 
 def get_imports(code: str) -> list:
     """
@@ -56,107 +165,122 @@ def get_imports(code: str) -> list:
     Возвращает список кортежей: (module_name, level)
     level > 0 означает относительный импорт (from . import x)
     """
-    try:
-        tree = ast.parse(code)
-    except:
-        return []
+    return [(module, level) for module, level, _, _ in analyze_python(code, "").imports]
 
-    imports = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.append((alias.name, 0))
-        elif isinstance(node, ast.ImportFrom):
-            if node.module:
-                imports.append((node.module, node.level))
-            else:
-                # from . import x
-                imports.append(("", node.level))
-    return imports
-
-def _process_func(node, indent=0):
-    prefix = "    " * indent
-    
-    # 1. Декораторы
-    decorator_lines = []
-    for dec in node.decorator_list:
-        decorator_lines.append(f"{prefix}@{ast.unparse(dec)}")
-    
-    # 2. Сигнатура (def name(args) -> ret:)
-    # ast.unparse(node.args) вернет "a: int, b: str = 'x'"
-    args_str = ast.unparse(node.args)
-    
-    # Возвращаемый тип
-    ret_annotation = ""
-    if node.returns:
-        ret_annotation = f" -> {ast.unparse(node.returns)}"
-    
-    header = f"{prefix}{'async ' if isinstance(node, ast.AsyncFunctionDef) else ''}def {node.name}({args_str}){ret_annotation}:"
-    
-    # 3. Докстринги и Returns
-    body_lines = []
-    doc = ast.get_docstring(node)
-    if doc:
-        # Форматируем докстринг, чтобы он не занимал 100 строк, если он огромный
-        doc_lines = doc.split('\n')
-        if len(doc_lines) > 1:
-            body_lines.append(f'{prefix}    """{doc_lines[0]} ..."""')
-        else:
-            body_lines.append(f'{prefix}    """{doc}"""')
-    
-    # Ищем, что возвращает функция
-    return_vals = get_return_values(node)
-    
-    # Формируем тело "заглушки"
-    if return_vals:
-        body_lines.append(f"{prefix}    ...; return {return_vals}")
-    else:
-        body_lines.append(f"{prefix}    ...")
+def _outline(tree, lines, returns, symbols):
+    # Глобальные переменные (константы), если они аннотированы: CONST: int = 10
+    outline = [("var", node.target.id, _segment(lines, node)) for node in tree.body
+               if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name)]
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            outline.append(_outline_func(node, lines, returns, symbols, ""))
+        elif isinstance(node, ast.ClassDef):
+            outline.append(_outline_class(node, lines, returns, symbols, ""))
+    return outline
 
-    return "\n".join(decorator_lines + [header] + body_lines) + "\n"
+def _outline_func(node, lines, returns, symbols, scope):
+    decorators = [_segment(lines, dec) for dec in node.decorator_list]
 
-def _process_class(node, indent=0):
-    prefix = "    " * indent
-    
-    # Декораторы класса
-    decorator_lines = []
-    for dec in node.decorator_list:
-        decorator_lines.append(f"{prefix}@{ast.unparse(dec)}")
+    # Сигнатура (def name(args) -> ret): ast.unparse(node.args) вернет "a: int, b: str = 'x'"
+    ret_annotation = f" -> {_segment(lines, node.returns)}" if node.returns else ""
+    signature = f"{'async ' if isinstance(node, ast.AsyncFunctionDef) else ''}def {node.name}" \
+                f"({ast.unparse(node.args)}){ret_annotation}"
+    symbols.append((scope + node.name, "method" if scope else "function", node.lineno, node.end_lineno, signature))
 
-    # Заголовок класса (class A(B):)
+    # Докстринг функции - только первая строка, чтобы он не занимал 100 строк
+    doc = ast.get_docstring(node) or ""
+    if "\n" in doc:
+        doc = doc.split("\n", 1)[0] + " ..."
+    # Что возвращает функция (собрано заранее в _scan_tree)
+    return ("def", node.name, decorators, signature, doc, list(returns.get(id(node), ())))
+
+def _outline_class(node, lines, returns, symbols, scope):
+    qualname = scope + node.name
+    scope = f"{scope}{node.name}."
+    decorators = [_segment(lines, dec) for dec in node.decorator_list]
+
+    # Заголовок класса (class A(B))
     bases = ""
     if node.bases:
-        bases = "(" + ", ".join([ast.unparse(b) for b in node.bases]) + ")"
-    
-    header = f"{prefix}class {node.name}{bases}:"
-    
-    lines = decorator_lines + [header]
-    
-    doc = ast.get_docstring(node)
-    if doc:
-        lines.append(f'{prefix}    """{doc}"""')
-    
-    # Внутренности класса
-    has_content = False
-    
-    # Сначала поля класса (Type Hints)
-    for item in node.body:
-        if isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
-            # x: int = 5
-            lines.append(f"{prefix}    {ast.unparse(item)}")
-            has_content = True
+        bases = "(" + ", ".join([_segment(lines, b) for b in node.bases]) + ")"
+    header = f"class {node.name}{bases}"
+    symbols.append((qualname, "class", node.lineno, node.end_lineno, header))
+
+    doc = ast.get_docstring(node) or ""
+    if doc.count("\n") >= CLASS_DOC_MAX_LINES:
+        doc = "\n".join(doc.split("\n", CLASS_DOC_MAX_LINES)[:CLASS_DOC_MAX_LINES]) + "\n..."
 
-    # Затем методы
+    # Сначала поля класса (Type Hints), затем методы и вложенные классы
+    members = [("var", item.target.id, _segment(lines, item)) for item in node.body
+               if isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name)]
     for item in node.body:
         if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            lines.append(_process_func(item, indent + 1))
-            has_content = True
-        # Вложенные классы
+            members.append(_outline_func(item, lines, returns, symbols, scope))
         elif isinstance(item, ast.ClassDef):
-            lines.append(_process_class(item, indent + 1))
-            has_content = True
-    
-    if not has_content and not doc:
+            members.append(_outline_class(item, lines, returns, symbols, scope))
+    return ("class", node.name, decorators, header, doc, members)
+
+def render_skeleton(outline, filename, level=DEFAULT_SKELETON_LEVEL) -> str:
+    """
+    Текст скелета нужного уровня из outline (analyze_python). Только склейка
+    строк, без разбора кода: переключение уровня не требует читать файлы.
+    """
+    if outline and outline[0][0] == "error":
+        return f"# SYNTAX ERROR in {filename}: {outline[0][1]}\n"
+    detail = SKELETON_LEVELS.index(level)
+    lines = [f"# SKELETON: {filename}"]
+    lines.extend(_render(item, 0, detail) for item in outline)
+    return "\n".join(lines) + "\n"
+
+def _render(item, indent, detail):
+    prefix = "    " * indent
+    kind = item[0]
+    if kind == "var":
+        return prefix + (item[1] if detail == _NAMES else item[2])
+
+    if kind == "def":
+        _, name, decorators, signature, doc, returns = item
+        if detail == _NAMES:
+            return prefix + signature.split("(", 1)[0]
+        lines = [f"{prefix}@{dec}" for dec in decorators]
+        lines.append(f"{prefix}{signature}:")
+        if doc and detail >= _DOCSTRINGS:
+            lines.append(f'{prefix}    """{doc}"""')
+        # Тело "заглушки"
+        if returns and detail >= _RETURNS:
+            lines.append(f"{prefix}    ...; return {' | '.join(returns)}")
+        else:
+            lines.append(f"{prefix}    ...")
+        return "\n".join(lines) + "\n"
+
+    if kind == "decl":
+        # Синтаксис скобочных языков: комментарий // перед объявлением, члены в { }
+        _, keyword, name, signature, doc, members = item
+        if detail == _NAMES:
+            line = f"{prefix}{keyword} {name}".rstrip() if keyword else prefix + name
+            if members is None:
+                return line
+            return "\n".join([line] + [_render(m, indent + 1, detail) for m in members])
+        lines = []
+        if doc and detail >= _DOCSTRINGS:
+            lines.extend(f"{prefix}// {line}".rstrip() for line in doc.split("\n"))
+        if members is None:
+            lines.append(prefix + signature)
+            return "\n".join(lines)
+        lines.append(f"{prefix}{signature} {{")
+        lines.extend(_render(member, indent + 1, detail) for member in members)
+        lines.append(prefix + "}")
+        return "\n".join(lines) + "\n"
+
+    _, name, decorators, header, doc, members = item
+    if detail == _NAMES:
+        return "\n".join([prefix + header.split("(", 1)[0]] + [_render(m, indent + 1, detail) for m in members])
+    lines = [f"{prefix}@{dec}" for dec in decorators]
+    lines.append(f"{prefix}{header}:")
+    show_doc = doc and detail >= _DOCSTRINGS
+    if show_doc:
+        lines.append(f'{prefix}    """{doc}"""')
+    lines.extend(_render(member, indent + 1, detail) for member in members)
+    if not members and not show_doc:
         lines.append(f"{prefix}    pass")
-        
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
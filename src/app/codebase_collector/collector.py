@@ -1,31 +1,285 @@
 import os
 import json
-import pathspec
+import cProfile
+import hashlib
+import time
 from datetime import datetime
-from collections import defaultdict
-from .code_parser import generate_skeleton_for_file, get_imports
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import accumulate
+from .archive import ARCHIVE_SUFFIX, write_archive
+from .code_parser import DEFAULT_SKELETON_LEVEL, SKELETON_LEVELS, analyze_python, render_skeleton
+from .dedup import (DEDUP_MIN_SIZE, DuplicateIndex, duplicate_key, duplicate_reference, plan_references,
+                    rebase_analysis)
+from .gitignore import GitIgnore
+from .graph import write_graph
+from .import_index import ImportIndex
+from .lang_parser import LANGUAGES, extract_outline
+from .module_discovery import is_module_root, scan_project
+from .module_writer import ModuleWriter, remove_stale_modules
+from .packer import parse_budget, write_bundles
+from .tokenizer import (TOKEN_THREADS, TokenEstimator, count_tokens, count_tokens_batch, get_encoder,
+                        pick_calibration_sample, tokenizer_name)
 from .project_manager import ProjectManager
+from .sniffer import HEAD_SIZE, sniff, summarize
+from .sqlite_export import DATABASE_NAME, SqliteExport
+from .stats import CollectStats, dump_profile
+from .symbol_index import SYMBOLS_NAME, SymbolIndex
 
 MAX_FILE_SIZE = 2_000_000
 
+class CollectCancelled(Exception):
+    """Сборка остановлена через cancel. Уже записанные модули целые, недописанный - удален."""
+
 def load_gitignore(root_path):
-    gitignore_path = os.path.join(root_path, ".gitignore")
-    if os.path.exists(gitignore_path):
-        with open(gitignore_path, "r", encoding="utf-8") as f:
-            return pathspec.PathSpec.from_lines("gitwildmatch", f)
-    return None
+    # Все уровни: global excludes, .git/info/exclude, вложенные .gitignore
+    return GitIgnore(root_path)
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+def analyze_file(content, rel_file, ext, tokens=None, kind=None, source=None):
+    """
+    Полный анализ одного файла: токены, структура скелета (для .py и
+    JS/TS, C/C++, Go, Rust - см. lang_parser) и импорты (для .py).
+    Результат целиком кладется в кэш инкрементальной сборки. Сам скелет
+    рисуется из outline под нужный уровень (render_skeleton), его токены
+    копятся в skel_tokens по уровням.
+    source - (текст, токены) сгенерированного .py файла, у которого content -
+    сводка: из него берутся импорты и определения для графа и symbols.json.
+    """
+    if tokens is None:
+        tokens = count_tokens(content)
+    analysis = {"tokens": tokens, "outline": None, "skel_tokens": {}, "imports": [], "symbols": []}
+    if kind is not None:
+        # Бинарный / минифицированный / сгенерированный файл: content - сводка, не код
+        analysis["sniff"] = kind
+        if source is not None:
+            py = analyze_python(source[0], rel_file)
+            analysis["imports"] = py.imports
+            analysis["symbols"] = symbol_costs(source[0], source[1], py.symbols)
+    elif ext == ".py":
+        # Один ast.parse на файл: скелет, импорты и определения за один проход
+        py = analyze_python(content, rel_file)
+        analysis["outline"] = py.outline
+        analysis["imports"] = py.imports
+        analysis["symbols"] = symbol_costs(content, tokens, py.symbols)
+    elif ext in LANGUAGES:
+        analysis["outline"] = extract_outline(content, ext)
+    return analysis
+
+def symbol_costs(content, tokens, symbols):
+    """
+    Дописывает к каждому определению его стоимость в токенах: доля токенов
+    файла по длине строк lineno..end_lineno (без отдельного подсчета на символ).
+    """
+    if not symbols:
+        return symbols
+    # starts[i] - смещение начала строки i + 1
+    starts = [0]
+    starts.extend(accumulate(len(line) + 1 for line in content.split("\n")))
+    scale = tokens / (len(content) or 1)
+    last = len(starts) - 1
+    return [symbol + (round((starts[min(symbol[3], last)] - starts[symbol[2] - 1]) * scale),) for symbol in symbols]
+
+def read_file(file_abs, sniff_files=True):
+    """
+    Чтение файла проекта. С sniff_files сначала смотрятся первые HEAD_SIZE байт:
+    бинарные, минифицированные и сгенерированные файлы целиком не читаются,
+    вместо содержимого - короткая сводка (см. sniffer.py). Кодировка определяется
+    там же. Возвращает (content, kind), kind - None для обычного текста.
+    """
+    if not sniff_files:
+        with open(file_abs, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read(), None
+    with open(file_abs, "rb") as f:
+        head = f.read(HEAD_SIZE)
+        size = os.fstat(f.fileno()).st_size
+        kind, encoding = sniff(os.path.basename(file_abs), head, size)
+        if kind is not None:
+            return summarize(kind, os.path.basename(file_abs), head, size, encoding), kind
+        data = head + f.read()
+    content = data.decode(encoding, errors="ignore")
+    if "\r" in content:
+        # Как при чтении в текстовом режиме (universal newlines)
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content, None
+
+def load_files(tasks, estimator=None, sniff_files=True, skeleton_level=DEFAULT_SKELETON_LEVEL,
+               token_threads=TOKEN_THREADS):
+    """
+    Чтение и анализ пачки файлов - вся CPU-тяжелая работа Phase 2.
+    task = (file_abs, rel_file, ext, need_analysis, known_hash).
+    Токены всей пачки считаются одним count_tokens_batch, а в режиме оценки - estimator;
+    так же, второй пачкой, - токены скелетов уровня skeleton_level.
+    Функция верхнего уровня, чтобы её можно было отдать в ProcessPoolExecutor;
+    в воркере пула token_threads=1 - параллельность уже дают сами процессы.
+    Одинаковые файлы пачки анализируются один раз (копии - rebase_analysis).
+    Возвращает список (content, digest, analysis, error, cost) в порядке задач,
+    cost - [read_ms, tokenize_ms, parse_ms] файла (время пакетного подсчета
+    токенов делится между файлами пропорционально длине).
+    """
+    results = []
+    costs = []
+    kinds = []
+    to_analyze = []
+    copies = []  # (индекс копии, индекс первого экземпляра в пачке)
+    first = {}
+    for file_abs, rel_file, ext, need_analysis, known_hash in tasks:
+        start = time.perf_counter()
+        kinds.append(None)
+        try:
+            content, kinds[-1] = read_file(file_abs, sniff_files)
+        except Exception as e:
+            results.append((None, None, None, str(e)))
+            costs.append([0.0, 0.0, 0.0])
+            continue
+        costs.append([(time.perf_counter() - start) * 1000, 0.0, 0.0])
+        if not need_analysis:
+            results.append((content, None, None, None))
+            continue
+        digest = content_hash(content)
+        if digest != known_hash:
+            index = first.setdefault(duplicate_key(rel_file, digest), len(results))
+            if index != len(results):
+                copies.append((len(results), index))
+            else:
+                to_analyze.append(len(results))
+        results.append((content, digest, None, None))
+
+    if estimator is None:
+        get_encoder()  # Загрузка кодировщика - разовая цена процесса, не файлов
+    start = time.perf_counter()
+    if estimator is not None:
+        counts = [estimator.estimate(results[i][0], tasks[i][2]) for i in to_analyze]
+    else:
+        counts = count_tokens_batch([results[i][0] for i in to_analyze], token_threads)
+    batch_ms = (time.perf_counter() - start) * 1000
+    batch_chars = sum(len(results[i][0]) for i in to_analyze) or 1
+
+    for i, tokens in zip(to_analyze, counts):
+        content, digest, _, _ = results[i]
+        _, rel_file, ext, _, _ = tasks[i]
+        costs[i][1] = batch_ms * len(content) / batch_chars
+        start = time.perf_counter()
+        try:
+            source = None
+            if kinds[i] == "generated" and ext == ".py":
+                # Сгенерированный .py в экспорт идет сводкой, но его импорты и
+                # определения нужны графу и индексу символов
+                text = read_file(tasks[i][0], sniff_files=False)[0]
+                source = (text, estimator.estimate(text, ext) if estimator is not None else count_tokens(text))
+            results[i] = (content, digest, analyze_file(content, rel_file, ext, tokens, kinds[i], source), None)
+        except Exception as e:
+            results[i] = (None, None, None, str(e))
+        costs[i][2] = (time.perf_counter() - start) * 1000
+
+    # Остальные уровни скелета досчитываются при переключении, уже из кэша
+    skeletons = [(i, render_skeleton(results[i][2]["outline"], tasks[i][1], skeleton_level)) for i in to_analyze
+                 if results[i][2] is not None and results[i][2]["outline"] is not None]
+    if skeletons:
+        start = time.perf_counter()
+        if estimator is not None:
+            counts = [estimator.estimate(text, tasks[i][2]) for i, text in skeletons]
+        else:
+            counts = count_tokens_batch([text for _, text in skeletons], token_threads)
+        batch_ms = (time.perf_counter() - start) * 1000
+        batch_chars = sum(len(text) for _, text in skeletons) or 1
+        for (i, text), tokens in zip(skeletons, counts):
+            results[i][2]["skel_tokens"][skeleton_level] = tokens
+            costs[i][1] += batch_ms * len(text) / batch_chars
 
-def count_tokens(text):
+    for i, j in copies:
+        content, digest, _, _ = results[i]
+        analysis, error = results[j][2], results[j][3]
+        results[i] = (content, digest, rebase_analysis(analysis), None) if analysis is not None else \
+            (None, None, None, error)
+    return [result + (cost,) for result, cost in zip(results, costs)]
+
+def run_file_tasks(tasks, workers=1, chunk_size=None, estimator=None, executor=None, slots=None, sniff_files=True,
+                   skeleton_level=DEFAULT_SKELETON_LEVEL):
     """
-    Пытается использовать tiktoken (точность GPT-4), иначе эвристика.
+    Генератор результатов load_files в порядке задач, поэтому итог сборки
+    не зависит от числа процессов. Задачи идут пачками по chunk_size
+    (по умолчанию ~4 пачки на процесс, не больше 64 файлов); workers > 1 - пул процессов.
+    executor - общий пул нескольких сборок (пакетный режим, см. batch.py), тогда
+    workers - его размер; slots - общий на все сборки семафор пачек в работе.
     """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(64, len(tasks) // (max(workers, 1) * 4)))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+    if executor is None and (workers <= 1 or len(chunks) < 2):
+        for chunk in chunks:
+            yield from load_files(chunk, estimator, sniff_files, skeleton_level)
+        return
+
+    loader = partial(load_files, estimator=estimator, sniff_files=sniff_files, skeleton_level=skeleton_level,
+                     token_threads=1)
+    if executor is not None:
+        yield from _pipeline(executor, chunks, loader, workers * 2, slots)
+        return
+    # Пачек меньше, чем процессов (инкрементальная сборка пары файлов) - лишние
+    # процессы не поднимаем: каждый платит за запуск и загрузку кодировщика
+    workers = min(workers, len(chunks))
+    with ProcessPoolExecutor(max_workers=workers) as own_executor:
+        yield from _pipeline(own_executor, chunks, loader, workers * 2, slots)
+
+def _pipeline(executor, chunks, loader, window, slots=None):
+    # В работе не больше window пачек: если запись отстает от чтения,
+    # готовые результаты (с текстом файлов) не копятся в памяти
+    chunks_iter = iter(chunks)
+    chunk = next(chunks_iter, None)
+    pending = deque()
     try:
-        import tiktoken
-        # cl100k_base - кодировщик для GPT-4 и GPT-3.5
-        enc = tiktoken.get_encoding("cl100k_base")
-        return len(enc.encode(text))
-    except Exception: 
-        return len(text) // 4
+        while chunk is not None or pending:
+            while chunk is not None and len(pending) < window:
+                # Ждать общий слот можно, только если своих пачек в работе нет:
+                # иначе сборки, занявшие все слоты, ждали бы друг друга
+                if slots is not None and not slots.acquire(blocking=not pending):
+                    break
+                pending.append(executor.submit(loader, chunk))
+                chunk = next(chunks_iter, None)
+            future = pending.popleft()
+            try:
+                results = future.result()
+            finally:
+                # Слот пачки возвращается и тогда, когда воркер упал
+                if slots is not None:
+                    slots.release()
+            yield from results
+    finally:
+        # Сборка прервана: отменяем свои пачки и возвращаем их слоты
+        for future in pending:
+            future.cancel()
+            if slots is not None:
+                slots.release()
+
+def token_bound(data, estimator):
+    # В режиме оценки к итогу модуля дописываем погрешность
+    if estimator is None or not data["token_count"]:
+        return ""
+    if not estimator.ratios:
+        return ", estimated"
+    return f", est. ±{100 * data.get('token_error', 0) / data['token_count']:.0f}%"
+
+def module_fingerprint(files, children, references=()):
+    """
+    Отпечаток состава модуля: пути, размеры и mtime файлов + подмодули
+    + копии, записанные ссылкой на оригинал (references - пары (копия, оригинал)).
+    Если он совпал с прошлой сборкой, модуль можно не пересобирать.
+    """
+    h = hashlib.sha1()
+    for _, _, rel_file, size, mtime in sorted(files, key=lambda f: f[2]):
+        h.update(f"{rel_file}\0{size}\0{mtime}\n".encode("utf-8"))
+    for child in sorted(children):
+        h.update(f"child:{child}\n".encode("utf-8"))
+    for rel_file, origin in sorted(references):
+        h.update(f"dup:{rel_file}\0{origin}\n".encode("utf-8"))
+    return h.hexdigest()
 
 def get_module_name_from_path(root_project, folder_path):
     rel = os.path.relpath(folder_path, root_project)
@@ -35,143 +289,215 @@ def get_module_name_from_path(root_project, folder_path):
         parts = parts[1:]
     return "-".join(parts)
 
-def is_module_root(dir_path, files_in_dir):
-    has_init = "__init__.py" in files_in_dir
-    has_readme = any(f.lower().startswith("readme") for f in files_in_dir)
-    return has_init and has_readme
-
-def resolve_import_path(base_file_rel_path, import_name, import_level, all_files_set):
+def collect_codebase(project_name, base_export_dir, cache=None, workers=1, chunk_size=None, token_mode="exact",
+                     config=None, progress=None, executor=None, slots=None, bundle_budget=None,
+                     stats_top=20, profile=False, cancel=None, sniff_files=True, dedup=False, archive=False,
+                     sqlite=False, skeleton_level=DEFAULT_SKELETON_LEVEL, scan_cache=None):
     """
-    Пытается найти, на какой реальный файл указывает импорт.
+    Собирает базу знаний проекта.
+    cache - AnalysisCache из updater.py: если передан, неизменившиеся файлы
+    не анализируются заново, а неизменившиеся модули не перезаписываются.
+    workers - число процессов для чтения и анализа файлов (None - по числу ядер),
+    chunk_size - сколько файлов отправлять процессу за раз.
+    token_mode - "exact" (tiktoken) или "estimate" (коэффициенты по расширениям,
+    откалиброванные на выборке файлов проекта, с оценкой погрешности).
+    config - настройки проекта (path, extensions, ignore_patterns); по умолчанию
+    берутся из ProjectManager по имени.
+    progress(event) - получает события сборки (словари с ключом "event"):
+    phase - этап завершен (с длительностью), progress - обработано файлов,
+    module - модуль записан, error - файл или папку не удалось прочитать.
+    Все ошибки (и разбора файлов тоже) пишутся в stats.json, их число - в errors результата.
+    executor, slots - общий пул процессов при пакетной сборке (см. run_file_tasks).
+    bundle_budget - если задан, файлы дополнительно раскладываются по бандлам
+    bundles/bundle_NNN.txt не больше этого числа токенов (см. packer.py).
+    stats_top - сколько самых медленных файлов попадет в stats.json.
+    profile - запустить сборку под cProfile: profile.pstats рядом с stats.json
+    (при workers > 1 профилируется только основной процесс).
+    cancel - токен отмены (например, threading.Event): когда cancel.is_set(),
+    сборка прерывается исключением CollectCancelled. Проверяется между файлами;
+    недописанный модуль удаляется, остальные файлы экспорта остаются прежними.
+    sniff_files - проверять начало файла до полного чтения: бинарные файлы
+    пропускаются, минифицированные и сгенерированные заменяются сводкой.
+    Одинаковые по содержимому файлы анализируются один раз, копии берут анализ
+    оригинала. dedup - в экспорт копия пишется ссылкой на оригинал, а не целиком.
+    archive - дополнительно упаковать экспорт в один <project>.zip с индексом
+    модулей рядом с папкой проекта (см. archive.py).
+    sqlite - вести codebase.sqlite в папке проекта: файлы, определения, граф
+    импортов и полнотекстовый индекс; обновляется на месте (см. sqlite_export.py).
+    skeleton_level - детализация signatures/ (SKELETON_LEVELS в code_parser.py).
+    Скелеты рисуются из кэшированной структуры файла, поэтому при смене уровня
+    с кэшем файлы не перечитываются: перезаписываются только signatures/.
+    scan_cache - ScanCache из module_discovery.py (watch-режим): папки, где
+    ничего не менялось, не перечитываются при обходе проекта.
     """
-    if import_level > 0:
-        # Относительный импорт (from .utils import x)
-        # base_file: src/model/pipeline.py -> dir: src/model
-        current_dir = os.path.dirname(base_file_rel_path)
-        # Поднимаемся вверх на level-1
-        for _ in range(import_level - 1):
-            current_dir = os.path.dirname(current_dir)
-        
-        # Вариант 1: импорт файла (from . import utils -> src/model/utils.py)
-        candidate = os.path.join(current_dir, f"{import_name}.py").replace("\\", "/")
-        if candidate in all_files_set: return candidate
-        
-        # Вариант 2: импорт папки (from . import coords -> src/model/coords/__init__.py)
-        candidate_pkg = os.path.join(current_dir, import_name, "__init__.py").replace("\\", "/")
-        if candidate_pkg in all_files_set: return candidate_pkg
-        
-    else:
-        # Абсолютный импорт (from src.model import utils)
-        # Превращаем точки в слеши
-        path_part = import_name.replace(".", "/")
-        
-        candidate = f"{path_part}.py"
-        if candidate in all_files_set: return candidate
-        
-        candidate_pkg = f"{path_part}/__init__.py"
-        if candidate_pkg in all_files_set: return candidate_pkg
-        
-        # Пробуем добавить src/ если не нашли (частая структура)
-        candidate_src = f"src/{path_part}.py"
-        if candidate_src in all_files_set: return candidate_src
-        
-    return None
-
-def collect_codebase(project_name, base_export_dir):
-    config = ProjectManager.get_project_config(project_name)
+    if skeleton_level not in SKELETON_LEVELS:
+        raise ValueError(f"Unknown skeleton level: {skeleton_level} (expected one of {', '.join(SKELETON_LEVELS)})")
+    kwargs = dict(cache=cache, workers=workers, chunk_size=chunk_size, token_mode=token_mode, config=config,
+                  progress=progress, executor=executor, slots=slots, bundle_budget=bundle_budget,
+                  stats_top=stats_top, cancel=cancel, sniff_files=sniff_files, dedup=dedup,
+                  archive=archive, sqlite=sqlite, skeleton_level=skeleton_level, scan_cache=scan_cache)
+    if not profile:
+        return _collect_codebase(project_name, base_export_dir, **kwargs)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return _collect_codebase(project_name, base_export_dir, profiler=profiler, **kwargs)
+    finally:
+        profiler.disable()
+
+def _collect_codebase(project_name, base_export_dir, cache, workers, chunk_size, token_mode,
+                      config, progress, executor, slots, bundle_budget, stats_top, cancel, sniff_files, dedup,
+                      archive, sqlite, skeleton_level, scan_cache, profiler=None):
+    if config is None:
+        config = ProjectManager.get_project_config(project_name)
     root_path = config.get("path")
+    if not root_path or not os.path.isdir(root_path):
+        raise FileNotFoundError(f"Project path not found: {root_path}")
     target_exts = set(ext.lower() for ext in config.get("extensions", []))
     ignore_patterns = config.get("ignore_patterns", [])
     
+    def emit(event, **fields):
+        if progress is not None:
+            progress({"event": event, **fields})
+
+    stats = CollectStats(stats_top)
+
+    def report_error(path, error, kind="read"):
+        stats.add_error(path, str(error), kind)
+        emit("error", file=path, message=str(error), kind=kind)
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise CollectCancelled(project_name)
+
+    timings = {}
+    phase_start = time.perf_counter()
+
+    def end_phase(name, **fields):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[name] = round(now - phase_start, 4)
+        phase_start = now
+        emit("phase", phase=name, seconds=timings[name], **fields)
+
     gitignore = load_gitignore(root_path)
-    module_roots = []
     
     # --- 1. Discovery & Indexing ---
-    all_files_rel_paths = set() # Для резолвинга импортов
-    
-    for root, dirs, files in os.walk(root_path):
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ignore_patterns]
-        rel_root = os.path.relpath(root, root_path).replace("\\", "/")
-        
-        if root == root_path:
-            module_roots.append(root)
-        elif is_module_root(root, files):
-            module_roots.append(root)
-            
-        for f in files:
-            # Сохраняем относительные пути (src/main.py) для поиска
-            rel_path = f if rel_root == "." else f"{rel_root}/{f}"
-            all_files_rel_paths.add(rel_path)
+    # Один проход: корни модулей, раскладка файлов по модулям и пути для резолвинга импортов.
+    # Читать файлы будем позже, когда станет ясно, изменился ли модуль с прошлой сборки
+    scan = scan_project(root_path, target_exts, ignore_patterns, gitignore, MAX_FILE_SIZE, scan_cache)
+    import_index = ImportIndex(scan.all_files)  # Для резолвинга импортов
+    modules_files = scan.modules_files
+    for path, error in scan.errors:
+        report_error(path, error, "scan")
+    end_phase("discovery", files=sum(len(files) for files in modules_files.values()), modules=len(modules_files))
+    check_cancel()
 
     # --- 2. Collection ---
-    modules_data = defaultdict(lambda: {"code": [], "skel": [], "readmes": [], "children": set(), "token_count": 0})
-    dependency_edges = set()
+    modules_data = defaultdict(lambda: {"readmes": [], "children": set(), "token_count": 0, "references": []})
+    for mod_root in scan.modules:
+        children = scan.modules.children(mod_root)
+        if mod_root in modules_files or children:
+            modules_data[mod_root]["children"] = {get_module_name_from_path(root_path, child) for child in children}
+    dependency_edges = set()  # (файл, файл-цель)
+    file_module = {}  # файл -> модуль, для свертки графа до модулей
     files_count = 0
-    
-    for root, dirs, files in os.walk(root_path):
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ignore_patterns]
-        
-        # Deepest Parent Logic
-        owner_path = None
-        best_len = -1
-        for mod_root in module_roots:
-            if root.startswith(mod_root):
-                if len(mod_root) > best_len:
-                    best_len = len(mod_root)
-                    owner_path = mod_root
-        
-        if not owner_path: owner_path = root_path
-        if root in module_roots and root != owner_path:
-            child_name = get_module_name_from_path(root_path, root)
-            modules_data[owner_path]["children"].add(child_name)
-
-        rel_dir = os.path.relpath(root, root_path)
-
-        for file in files:
-            file_abs = os.path.join(root, file)
-            rel_file = os.path.join(rel_dir, file).replace("\\", "/")
-            
-            if gitignore and gitignore.match_file(rel_file): continue
-            if os.path.getsize(file_abs) > MAX_FILE_SIZE: continue
+    skeleton_tokens = 0
 
-            ext = os.path.splitext(file)[1].lower()
-            
-            try:
-                with open(file_abs, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-
-                tokens = count_tokens(content)
-
-                if file.lower().startswith("readme"):
-                    modules_data[owner_path]["readmes"].append((rel_file, content))
-                
-                if ext in target_exts:
-                    header = f"\n{'='*40}\nFILE: {rel_file}\nTOKENS: {tokens}\n{'='*40}\n"
-                    modules_data[owner_path]["code"].append(header + content)
-                    modules_data[owner_path]["token_count"] += tokens
-                    files_count += 1
-                    
-                    if ext == ".py":
-                        skel = generate_skeleton_for_file(content, rel_file)
-                        if skel:
-                            modules_data[owner_path]["skel"].append(skel)
-                        
-                        # --- Graph Building ---
-                        # Находим все импорты в файле
-                        imports = get_imports(content)
-                        for imp_name, level in imports:
-                            # Пытаемся понять, ссылается ли импорт на файл внутри нашего проекта
-                            target_file = resolve_import_path(rel_file, imp_name, level, all_files_rel_paths)
-                            if target_file:
-                                # Добавляем ребро в граф (Файл -> Файл)
-                                dependency_edges.add(f'    "{rel_file}" --> "{target_file}"')
-
-            except Exception as e:
-                print(f"Error {rel_file}: {e}")
-
-    # --- 3. Export ---
     final_output_dir = os.path.join(base_export_dir, project_name)
     dir_code = os.path.join(final_output_dir, "code")
+    if cache is not None:
+        # Кэш один на проект, а папок экспорта может быть несколько: отпечатки
+        # модулей верны только для той, куда писала прошлая сборка
+        cache.begin({"path": os.path.abspath(root_path), "export": os.path.abspath(final_output_dir),
+                     "extensions": sorted(target_exts), "token_mode": token_mode, "sniff": sniff_files,
+                     "dedup": dedup, "skeleton_level": skeleton_level})
+    # Модули не менялись, но скелеты прошлой сборки другого уровня - перерисуем их из кэша
+    rerender = cache is not None and cache.rerender
+
+    # Одинаковые файлы (вендорные копии, шаблонные __init__.py, LICENSE) находятся
+    # по ходу сборки (DuplicateIndex): хэш считает воркер, который и так читает
+    # файл, или он уже есть в кэше - отдельного прохода с чтением нет. С dedup
+    # по хэшам из кэша заранее известны копии, которые можно вовсе не читать
+    planned_refs, unsettled = {}, set()
+    if dedup and cache is not None:
+        planned_refs, unsettled = plan_references([(rel_file, size, cache.lookup_digest(rel_file, size, mtime))
+                                                   for files in modules_files.values()
+                                                   for _, _, rel_file, size, mtime in files])
+    duplicate_index = DuplicateIndex()
+
+    def is_reference(size, origin):
+        # Копия, которая в экспорт пишется ссылкой на оригинал
+        return dedup and size >= DEDUP_MIN_SIZE and origin is not None
+
+    # План Phase 2: решаем, что делать с каждым файлом. Сама работа (чтение +
+    # анализ) собирается в tasks и выполняется load_file, в т.ч. параллельно
+    plan = []
+    tasks = []
+    for owner_path, files in modules_files.items():
+        data = modules_data[owner_path]
+        mod_name = get_module_name_from_path(root_path, owner_path)
+
+        unchanged = False
+        if cache is not None:
+            references = [(rel, planned_refs[rel]) for _, _, rel, size, _ in files
+                          if is_reference(size, planned_refs.get(rel))]
+            # unsettled: оригинал копии может смениться на файл, который еще не прочитан
+            unchanged = cache.module_unchanged(mod_name, module_fingerprint(files, data["children"], references)) \
+                and not any(rel in unsettled for _, _, rel, _, _ in files) and \
+                os.path.exists(os.path.join(dir_code, f"{mod_name}.txt")) and \
+                all(cache.lookup(rel, size, mtime) is not None for _, _, rel, size, mtime in files)
+        if unchanged:
+            data["unchanged"] = True
+            stats.skipped_modules += 1
+
+        for file, file_abs, rel_file, size, mtime in files:
+            ext = os.path.splitext(file)[1].lower()
+            is_readme = file.lower().startswith("readme")
+
+            if is_readme:
+                data["readme_files"] = data.get("readme_files", []) + [(rel_file, file_abs)]
+
+            cached = cache.lookup(rel_file, size, mtime) if cache is not None else None
+            task = None
+            if unchanged:
+                # Модуль не менялся: код не перечитываем, для графа и
+                # итогов берем анализ из кэша
+                pass
+            elif is_reference(size, planned_refs.get(rel_file)):
+                # Копия пишется ссылкой при любом исходе: читать её не нужно, анализ - в кэше
+                pass
+            elif cached is not None:
+                task = (file_abs, rel_file, ext, False, None)
+            else:
+                # mtime мог смениться без изменения содержимого (checkout, touch):
+                # при совпадении хэша воркер не будет анализировать файл заново
+                known_hash = cache.known_hash(rel_file) if cache is not None else None
+                task = (file_abs, rel_file, ext, True, known_hash)
+
+            plan.append((owner_path, rel_file, ext, is_readme, size, mtime, cached, task is not None))
+            if task is not None:
+                tasks.append(task)
+    end_phase("plan", tasks=len(tasks))
+    check_cancel()
+
+    estimator = None
+    if token_mode == "estimate":
+        # Калибровка на выборке файлов, которые попадут в экспорт
+        candidates = [f[1] for files in modules_files.values() for f in files
+                      if os.path.splitext(f[0])[1].lower() in target_exts]
+        samples = []
+        for file_abs in pick_calibration_sample(candidates):
+            try:
+                content, kind = read_file(file_abs, sniff_files)
+                if kind is None:
+                    samples.append((os.path.splitext(file_abs)[1].lower(), content))
+            except OSError as e:
+                report_error(os.path.relpath(file_abs, root_path).replace("\\", "/"), e)
+        estimator = TokenEstimator.calibrate(samples)
+        end_phase("calibration", samples=len(samples))
+
+    # --- 3. Export (потоково, по мере обработки файлов) ---
     dir_skel = os.path.join(final_output_dir, "signatures")
     dir_docs = os.path.join(final_output_dir, "readmes")
     
@@ -179,37 +505,198 @@ def collect_codebase(project_name, base_export_dir):
         os.makedirs(d, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y-%m-%d")
-    
-    # Save Modules
-    for mod_path, data in modules_data.items():
-        mod_name = get_module_name_from_path(root_path, mod_path)
+    updated_modules = []
+    bundle_files = []  # Файлы экспорта с токенами - для упаковки в бандлы
+
+    def open_module(owner_path):
+        data = modules_data[owner_path]
+        # README читаем сразу: они идут в шапку модуля раньше кода и нужны для ALL_READMES
+        for rel_file, file_abs in data.get("readme_files", []):
+            try:
+                with open(file_abs, "r", encoding="utf-8", errors="ignore") as f:
+                    data["readmes"].append((rel_file, f.read()))
+            except OSError as e:
+                report_error(rel_file, e)
+        mod_name = get_module_name_from_path(root_path, owner_path)
+        if data.get("unchanged"):
+            if rerender:
+                return ModuleWriter(dir_code, dir_skel, mod_name, timestamp, data["children"], data["readmes"],
+                                    skeletons_only=True)
+            return None
+        return ModuleWriter(dir_code, dir_skel, mod_name, timestamp, data["children"], data["readmes"])
+
+    def text_tokens(text, ext):
+        return estimator.estimate(text, ext) if estimator is not None else count_tokens(text)
+
+    def skeleton_of(analysis, rel_file, ext, render):
+        """
+        Скелет файла уровня skeleton_level и его токены. Токены уровня считаются
+        один раз и остаются в анализе, а с ним - в кэше; текст рисуется, только
+        если его надо записать или посчитать.
+        """
+        costs = analysis["skel_tokens"]
+        skel = ""
+        if render or skeleton_level not in costs:
+            skel = render_skeleton(analysis["outline"], rel_file, skeleton_level)
+        if skeleton_level not in costs:
+            costs[skeleton_level] = text_tokens(skel, ext)
+        return skel, costs[skeleton_level]
+
+    def close_module(owner_path, writer):
+        data = modules_data[owner_path]
+        data["written"] = True
+        if cache is not None and owner_path in modules_files:
+            # Отпечаток - с копиями-ссылками, как они вышли при сборке
+            cache.set_module(get_module_name_from_path(root_path, owner_path),
+                             module_fingerprint(modules_files[owner_path], data["children"], data["references"]))
+        if writer is None:
+            return
+        if writer.skeletons_only:
+            writer.close(None)
+            return
         total_tokens = data["token_count"]
-        
-        lines = [
-            f"# MODULE: {mod_name}", 
-            f"# DATE: {timestamp}", 
-            f"# TOTAL TOKENS: {total_tokens} (approx. {total_tokens/1000:.1f}k)",
-            ""
-        ]
-        
-        if data["children"]:
-            lines.append("# >>> INCLUDED SUBMODULES:")
-            for child in sorted(data["children"]):
-                lines.append(f"#     - {child}")
-            lines.append("# " + "-"*30)
+        writer.close(f"# TOTAL TOKENS: {total_tokens} (approx. {total_tokens/1000:.1f}k{token_bound(data, estimator)})")
+        updated_modules.append(writer.mod_name)
+        emit("module", module=writer.mod_name, tokens=total_tokens)
 
-        for path, txt in data["readmes"]:
-             lines.append(f"\n# DOCUMENTATION ({path}):\n{txt}\n")
+    # Выполнение + детерминированное слияние: результаты идут в порядке plan,
+    # файлы одного модуля в plan идут подряд, поэтому открыт всегда один модуль
+    results = run_file_tasks(tasks, workers=workers, chunk_size=chunk_size, estimator=estimator,
+                             executor=executor, slots=slots, sniff_files=sniff_files,
+                             skeleton_level=skeleton_level)
+    db = SqliteExport(os.path.join(final_output_dir, DATABASE_NAME)) if sqlite else None
+    symbol_index = SymbolIndex(import_index.module_names())
+    current_owner = None
+    writer = None
+    total = len(plan)
+    next_report = 0.0
+    try:
+        for done, (owner_path, rel_file, ext, is_readme, size, mtime, analysis, has_task) in enumerate(plan, 1):
+            check_cancel()
+            # Не чаще 10 событий в секунду, последнее - всегда
+            if progress is not None and (done == total or time.monotonic() >= next_report):
+                next_report = time.monotonic() + 0.1
+                emit("progress", done=done, total=total)
+
+            if owner_path != current_owner:
+                if current_owner is not None:
+                    close_module(current_owner, writer)
+                current_owner = owner_path
+                current_module = get_module_name_from_path(root_path, owner_path)
+                writer = open_module(owner_path)
+
+            data = modules_data[owner_path]
+            content = None
+            digest = None
+            cost = None
+            fresh = False
+            if has_task:
+                content, digest, new_analysis, error, cost = next(results)
+                if error:
+                    report_error(rel_file, error)
+                    continue
+                fresh = new_analysis is not None
+                if digest is not None:
+                    analysis = new_analysis
+                    if analysis is None:
+                        analysis = cache.lookup_hash(rel_file, digest)
+                    if cache is not None:
+                        cache.store(rel_file, size, mtime, digest, analysis)
+
+            if digest is None and cache is not None:
+                digest = cache.lookup_digest(rel_file, size, mtime)
+            origin = duplicate_index.add(rel_file, digest) if digest is not None else None
+            if is_reference(size, origin):
+                data["references"].append((rel_file, origin))
+
+            if analysis.get("sniff"):
+                stats.add_skipped(rel_file, analysis["sniff"])
+                if analysis["sniff"] == "binary":
+                    continue
+
+            if ext in target_exts:
+                tokens = analysis["tokens"]
+                skel = ""
+                if analysis["outline"] is not None:
+                    skel, skel_tokens = skeleton_of(analysis, rel_file, ext, render=writer is not None)
+                    if analysis["outline"] and analysis["outline"][0][0] == "error":
+                        # Файл экспортирован целиком, но без скелета: в stats.json, без события error
+                        stats.add_error(rel_file, analysis["outline"][0][1], "parse")
+                if origin is not None:
+                    full_tokens = tokens
+                    if is_reference(size, origin):
+                        content = duplicate_reference(origin, full_tokens)
+                        tokens = text_tokens(content, ext)
+                        if analysis["outline"] is not None:
+                            skel = f"# SKELETON: {rel_file} - same as {origin}\n"
+                            skel_tokens = text_tokens(skel, ext)
+                    stats.add_duplicate(full_tokens, full_tokens - tokens)
+                if analysis["outline"] is not None:
+                    skeleton_tokens += skel_tokens
+                data["token_count"] += tokens
+                if estimator is not None:
+                    data["token_error"] = data.get("token_error", 0) + tokens * (estimator.error_pct(ext) or 0) / 100
+                files_count += 1
+
+                write_start = time.perf_counter()
+                if writer is not None:
+                    writer.add_file(rel_file, tokens, content, skel)
+                stats.add_file(rel_file, current_module, size, tokens, cost,
+                               (time.perf_counter() - write_start) * 1000, cached=not fresh and origin is None)
+                if db is not None:
+                    db.add_file(rel_file, current_module, tokens, digest, size, mtime, analysis["symbols"],
+                                lambda: content if content is not None else
+                                read_file(os.path.join(root_path, rel_file), sniff_files)[0])
+                if bundle_budget:
+                    bundle_files.append({"module": current_module,
+                                         "path": rel_file, "abs": os.path.join(root_path, rel_file),
+                                         "tokens": tokens, "size": size, "mtime": mtime,
+                                         "reference": content if is_reference(size, origin) else None})
 
-        lines.extend(data["code"])
-        
-        if lines:
-            with open(os.path.join(dir_code, f"{mod_name}.txt"), "w", encoding="utf-8") as f:
-                f.write("\n".join(lines))
+                file_module[rel_file] = current_module
+                if analysis["symbols"]:
+                    symbol_index.add_file(rel_file, current_module, analysis["symbols"])
 
-        if data["skel"]:
-            with open(os.path.join(dir_skel, f"{mod_name}_API.txt"), "w", encoding="utf-8") as f:
-                f.write("\n".join(data["skel"]))
+                # --- Graph Building ---
+                targets = set()
+                for imp_name, level, lineno, names in analysis["imports"]:
+                    # Пытаемся понять, ссылается ли импорт на файлы внутри нашего проекта
+                    resolved = import_index.resolve(rel_file, imp_name, level, names)
+                    symbol_index.add_import(rel_file, lineno, resolved, names)
+                    for target_file in resolved:
+                        if target_file != rel_file:
+                            # Добавляем ребро в граф (Файл -> Файл)
+                            dependency_edges.add((rel_file, target_file))
+                            targets.add(target_file)
+                if db is not None:
+                    db.set_edges(rel_file, targets)
+
+        if current_owner is not None:
+            close_module(current_owner, writer)
+            writer = None
+
+        # Модули без собственных файлов (только подмодули)
+        for owner_path in list(modules_data):
+            if not modules_data[owner_path].get("written"):
+                close_module(owner_path, open_module(owner_path))
+    except BaseException:
+        # Закрываем генератор явно: отменяются пачки в работе, освобождаются
+        # общие слоты и свой пул процессов - не дожидаясь сборщика мусора
+        results.close()
+        if writer is not None:
+            writer.abort()
+        if db is not None:
+            db.abort()
+        raise
+
+    if cache is not None:
+        cache.finish()
+    # Модули, которых больше нет: их файлы не должны оставаться в экспорте,
+    # в архиве и перед RAG-индексатором
+    remove_stale_modules(dir_code, dir_skel, {get_module_name_from_path(root_path, p) for p in modules_data})
+    if db is not None:
+        db.finish(project_name, timestamp)
+    end_phase("collect", files=files_count, modules=len(updated_modules))
 
     # All Readmes
     all_readmes = []
@@ -221,19 +708,62 @@ def collect_codebase(project_name, base_export_dir):
             f.write("\n".join(all_readmes))
 
     # Architecture JSON
-    tree = {"project": project_name, "modules": sorted([get_module_name_from_path(root_path, p) for p in modules_data.keys()])}
+    tree = {
+        "project": project_name,
+        "modules": sorted([get_module_name_from_path(root_path, p) for p in modules_data.keys()]),
+        "hierarchy": scan.modules.to_dict(lambda p: get_module_name_from_path(root_path, p)),
+    }
     with open(os.path.join(final_output_dir, "architecture.json"), "w", encoding="utf-8") as f:
         json.dump(tree, f, indent=2)
 
-    # --- Mermaid Export ---
-    # Создаем граф только если есть связи
-    if dependency_edges:
-        mermaid_lines = ["graph TD"]
-        # Стили узлов (опционально)
-        mermaid_lines.append("    node [shape=box, style=filled, fillcolor=\"#f9f9f9\", fontname=\"Consolas\"]")
-        mermaid_lines.extend(sorted(list(dependency_edges)))
-        
-        with open(os.path.join(final_output_dir, "dependencies.mermaid"), "w", encoding="utf-8") as f:
-            f.write("\n".join(mermaid_lines))
-
-    return {"count": files_count, "path": final_output_dir}
\ No newline at end of file
+    # Индекс определений: полное имя -> файл, строки, сигнатура, токены, ссылки из импортов
+    symbol_index.write(os.path.join(final_output_dir, SYMBOLS_NAME), project_name)
+
+    # --- Graph Export ---
+    # Граф модулей: циклы, fan-in/fan-out, слои; полная смежность - в JSON,
+    # в mermaid - ограниченная по размеру сводка
+    graph = write_graph(final_output_dir, project_name, dependency_edges, file_module)
+
+    end_phase("export", cycles=len(graph.cycles()))
+
+    bundles = None
+    if bundle_budget:
+        bundle_budget = parse_budget(bundle_budget)
+        manifest = write_bundles(os.path.join(final_output_dir, "bundles"), project_name,
+                                 bundle_files, bundle_budget, timestamp,
+                                 read=lambda path: read_file(path, sniff_files)[0])
+        bundles = len(manifest["bundles"])
+        end_phase("bundles", bundles=bundles)
+
+    archive_path = None
+    if archive:
+        archive_path = final_output_dir + ARCHIVE_SUFFIX
+        module_tokens = {get_module_name_from_path(root_path, p): data["token_count"]
+                         for p, data in modules_data.items()}
+        # Экспорт однозначно задан составом модулей и параметрами сборки - архиву
+        # не нужно перечитывать его, чтобы понять, что ничего не изменилось
+        sources = {"modules": {get_module_name_from_path(root_path, p): module_fingerprint(
+                                   modules_files.get(p, []), data["children"], data["references"])
+                               for p, data in modules_data.items()},
+                   "options": {"extensions": sorted(target_exts), "token_mode": token_mode, "sniff": sniff_files,
+                               "dedup": dedup, "skeleton_level": skeleton_level,
+                               "bundle_budget": bundle_budget, "sqlite": sqlite}}
+        write_archive(final_output_dir, archive_path, project_name, module_tokens, timestamp, sources)
+        end_phase("archive", path=archive_path)
+
+    tokens_info = estimator.report() if estimator is not None else {"tokenizer": tokenizer_name()}
+    tokens_info["mode"] = token_mode
+
+    # Статистика сборки: этапы, стоимость файлов, ошибки (+ профиль)
+    meta = {"project": project_name, "date": datetime.now().isoformat(timespec="seconds"),
+            "workers": workers, "tokenizer": tokens_info["tokenizer"], "token_mode": token_mode}
+    if profiler is not None:
+        meta["profile"] = dump_profile(profiler, final_output_dir)
+    stats.write(final_output_dir, timings, **meta)
+
+    return {"count": files_count, "path": final_output_dir, "updated_modules": sorted(updated_modules),
+            "total_tokens": sum(data["token_count"] for data in modules_data.values()),
+            "tokens": tokens_info, "timings": timings, "bundles": bundles, "dedup": stats.dedup(),
+            "skeletons": {"level": skeleton_level, "tokens": skeleton_tokens},
+            "archive": archive_path, "database": db.path if db is not None else None,
+            "errors": stats.error_count}
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+
+from .sniffer import name_kind
+
+# Файлы меньше этого размера в экспорте ссылкой не заменяются: ссылка не короче самого файла
+DEDUP_MIN_SIZE = 256
+
+
+def duplicate_key(rel_file, digest):
+    """
+    Ключ одинакового содержимого: хэш текста (content_hash, как в кэше) плюс
+    расширение и тип по имени - от них тоже зависит анализ.
+    """
+    name = os.path.basename(rel_file)
+    return digest, os.path.splitext(name)[1].lower(), name_kind(name)
+
+
+class DuplicateIndex:
+    """
+    Копии находятся по ходу сборки, без отдельного прохода с чтением файлов:
+    хэш приходит из воркера (он и так читает файл) или из кэша.
+    Оригинал - первый в порядке экспорта файл с тем же содержимым.
+    """
+
+    def __init__(self):
+        self._origins = {}
+
+    def add(self, rel_file, digest):
+        """Файл в порядке экспорта. Возвращает его оригинал, если файл - копия, иначе None."""
+        origin = self._origins.setdefault(duplicate_key(rel_file, digest), rel_file)
+        return origin if origin != rel_file else None
+
+
+def plan_references(entries):
+    """
+    Копии, известные еще до чтения файлов, - по хэшам из кэша.
+    entries - (rel_file, size, digest) в порядке экспорта, digest - None, если
+    файл менялся и хэш будет известен только после чтения.
+    Возвращает (references, unsettled): references - {rel_file: origin} для копий,
+    у которых хэш известен и раньше есть файл с тем же хэшем (копия при любом
+    исходе, её можно не читать); unsettled - файлы с известным хэшем, перед
+    которыми есть файл того же размера с неизвестным хэшем: есть ли у них
+    оригинал и какой, выяснится только при сборке.
+    """
+    origins = {}
+    unknown = set()  # (размер, расширение, тип по имени) файлов с неизвестным хэшем
+    references = {}
+    unsettled = set()
+    for rel_file, size, digest in entries:
+        name = os.path.basename(rel_file)
+        shape = (size, os.path.splitext(name)[1].lower(), name_kind(name))
+        if digest is None:
+            unknown.add(shape)
+            continue
+        if shape in unknown:
+            unsettled.add(rel_file)
+        origin = origins.setdefault(duplicate_key(rel_file, digest), rel_file)
+        if origin != rel_file:
+            references[rel_file] = origin
+    return references, unsettled
+
+
+def rebase_analysis(analysis):
+    """
+    Анализ копии - это анализ оригинала. Скелет рисуется уже с путем копии,
+    поэтому токены уровней скелета (в них входит заголовок с путем) у копии свои.
+    """
+    return {**analysis, "skel_tokens": {}}
+
+
+def duplicate_reference(origin, tokens):
+    """Текст, который пишется в экспорт вместо содержимого копии."""
+    return f"# DUPLICATE OF: {origin} (same content, {tokens} tokens)\n"
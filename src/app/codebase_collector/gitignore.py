@@ -0,0 +1,162 @@
+import os
+import pathspec
+
+# Скомпилированные правила кэшируются по пути файла и его mtime:
+# повторные обходы (инкрементальная сборка, watch) не перечитывают .gitignore
+_spec_cache = {}
+
+
+def compile_ignore_file(path):
+    """
+    Читает и компилирует файл правил (.gitignore, info/exclude, global excludes).
+    Возвращает список паттернов или None, если файла нет или он пуст.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _spec_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            spec = pathspec.PathSpec.from_lines("gitwildmatch", f)
+    except OSError as e:
+        print(f"Error {path}: {e}")
+        return None
+    # Пустые строки и комментарии дают паттерны с include=None - они не нужны
+    patterns = tuple(p for p in spec.patterns if p.include is not None) or None
+    _spec_cache[path] = (mtime, patterns)
+    return patterns
+
+
+def find_git_root(path):
+    """Ближайшая сверху папка с .git (сам путь тоже проверяется) или None."""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.isdir(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def global_excludes_file():
+    """
+    core.excludesFile из ~/.gitconfig, иначе путь git по умолчанию
+    ($XDG_CONFIG_HOME/git/ignore). git не вызывается - только чтение конфига.
+    """
+    gitconfig = os.path.expanduser("~/.gitconfig")
+    if os.path.exists(gitconfig):
+        section = None
+        try:
+            with open(gitconfig, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("["):
+                        section = line.strip("[]").strip().lower()
+                    elif section == "core" and "=" in line:
+                        key, value = line.split("=", 1)
+                        if key.strip().lower() == "excludesfile":
+                            return os.path.expanduser(value.strip().strip('"'))
+        except OSError:
+            pass
+    xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(xdg, "git", "ignore")
+
+
+def _check(patterns, path):
+    # Внутри одного файла правил побеждает последний совпавший паттерн
+    for pattern in reversed(patterns):
+        if pattern.match_file(path) is not None:
+            return pattern.include
+    return None
+
+
+class GitIgnore:
+    """
+    Иерархический .gitignore: глобальный excludes-файл, .git/info/exclude,
+    .gitignore в папках выше проекта (до корня репозитория) и во всех вложенных папках.
+    Правила каждой папки компилируются один раз; набор действующих правил
+    ("уровни") передается при обходе сверху вниз, как владелец-модуль.
+
+    Уровень - (patterns, dir_prefix, outer_prefix): путь для проверки получается
+    как outer_prefix + путь относительно папки с этим .gitignore.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = os.path.abspath(root_path)
+        levels = []
+
+        git_root = find_git_root(self.root_path)
+        outer_prefix = ""
+        if git_root:
+            rel = os.path.relpath(self.root_path, git_root).replace("\\", "/")
+            outer_prefix = "" if rel == "." else rel + "/"
+
+        # Правила с меньшим приоритетом идут первыми
+        for path in (global_excludes_file(),
+                     os.path.join(git_root, ".git", "info", "exclude") if git_root else None):
+            patterns = compile_ignore_file(path) if path else None
+            if patterns:
+                levels.append((patterns, "", outer_prefix))
+
+        # .gitignore в папках между корнем репозитория и проектом
+        if git_root and outer_prefix:
+            parts = outer_prefix.rstrip("/").split("/")
+            for i in range(len(parts)):
+                patterns = compile_ignore_file(os.path.join(git_root, *parts[:i], ".gitignore"))
+                if patterns:
+                    levels.append((patterns, "", "/".join(parts[i:]) + "/"))
+
+        self.base_levels = tuple(levels)
+        self._dir_levels = {}  # rel_dir -> уровни, для проверок вне обхода (ignored)
+
+    def for_dir(self, parent_levels, dir_abs, rel_dir, has_gitignore):
+        """
+        Уровни правил для папки: родительские + её собственный .gitignore (если есть).
+        parent_levels=None - корень проекта.
+        """
+        levels = self.base_levels if parent_levels is None else parent_levels
+        if has_gitignore:
+            patterns = compile_ignore_file(os.path.join(dir_abs, ".gitignore"))
+            if patterns:
+                levels = levels + ((patterns, f"{rel_dir}/" if rel_dir else "", ""),)
+        return levels
+
+    def match(self, levels, rel_path, is_dir=False):
+        """
+        True, если путь (относительно корня проекта) игнорируется.
+        Более глубокий .gitignore имеет приоритет над верхними.
+        """
+        if is_dir:
+            rel_path += "/"
+        for patterns, dir_prefix, outer_prefix in reversed(levels):
+            result = _check(patterns, outer_prefix + rel_path[len(dir_prefix):])
+            if result is not None:
+                return result
+        return False
+
+    def levels_for(self, rel_dir):
+        """Уровни правил папки rel_dir (относительно корня проекта) - те же, что набрал бы обход."""
+        levels = self._dir_levels.get(rel_dir)
+        if levels is None:
+            parent = self.levels_for(rel_dir.rpartition("/")[0]) if rel_dir else None
+            dir_abs = os.path.join(self.root_path, *rel_dir.split("/")) if rel_dir else self.root_path
+            levels = self.for_dir(parent, dir_abs, rel_dir, os.path.isfile(os.path.join(dir_abs, ".gitignore")))
+            self._dir_levels[rel_dir] = levels
+        return levels
+
+    def ignored(self, rel_path, is_dir=False):
+        """
+        Проверка отдельного пути без обхода (события watch-режима): путь
+        игнорируется, если игнорируется он сам или любая папка над ним.
+        Уровни папок запоминаются - после правки .gitignore нужен новый GitIgnore.
+        """
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            if self.match(self.levels_for("/".join(parts[:i - 1])), "/".join(parts[:i]), is_dir=True):
+                return True
+        return self.match(self.levels_for("/".join(parts[:-1])), rel_path, is_dir)
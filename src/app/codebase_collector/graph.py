@@ -0,0 +1,172 @@
+import json
+import os
+from collections import defaultdict
+
+GRAPH_JSON_NAME = "dependencies.json"
+MERMAID_NAME = "dependencies.mermaid"
+
+# Граф в mermaid - сводка для человека и LLM: не больше стольких модулей и связей
+SUMMARY_MAX_NODES = 60
+SUMMARY_MAX_EDGES = 150
+
+
+class ModuleGraph:
+    """
+    Граф зависимостей между модулями (корнями из discovery), свернутый из
+    ребер файл -> файл. Вес ребра - число файловых импортов между модулями.
+    Циклы (сильно связные компоненты), fan-in/fan-out и топологические слои
+    считаются за O(V + E).
+    """
+
+    def __init__(self, file_edges, file_module):
+        # file_edges - пары (файл, файл-цель), file_module - файл -> имя модуля
+        self.files = defaultdict(set)
+        self.edges = defaultdict(lambda: defaultdict(int))
+        self.file_module = file_module
+        self.nodes = set(file_module.values())
+        for source, target in file_edges:
+            self.files[source].add(target)
+            src_mod, dst_mod = file_module.get(source), file_module.get(target)
+            if src_mod is not None and dst_mod is not None and src_mod != dst_mod:
+                self.edges[src_mod][dst_mod] += 1
+
+        self.fan_out = {node: len(self.edges.get(node, ())) for node in self.nodes}
+        self.fan_in = dict.fromkeys(self.nodes, 0)
+        for targets in self.edges.values():
+            for target in targets:
+                self.fan_in[target] += 1
+        self.components = self._strongly_connected()
+        self.component_of = {node: i for i, comp in enumerate(self.components) for node in comp}
+        self.layer = self._layers()
+
+    def _strongly_connected(self):
+        """
+        Алгоритм Тарьяна без рекурсии. Компоненты выдаются в обратном
+        топологическом порядке: компонента идет после всех, от которых зависит.
+        """
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+        counter = 0
+        for start in sorted(self.nodes):
+            if start in index:
+                continue
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            work = [(start, iter(sorted(self.edges.get(start, ()))))]
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.edges.get(child, ())))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+        return components
+
+    def _layers(self):
+        # Слой 0 - модули без зависимостей внутри проекта; слой модуля = 1 + max слоя
+        # его зависимостей. Модули одного цикла - в одном слое
+        layer = {}
+        for i, component in enumerate(self.components):
+            depth = 0
+            for node in component:
+                for target in self.edges.get(node, ()):
+                    j = self.component_of[target]
+                    if j != i:
+                        depth = max(depth, layer[j] + 1)
+            layer[i] = depth
+        return {node: layer[self.component_of[node]] for node in self.nodes}
+
+    def cycles(self):
+        return [comp for comp in self.components if len(comp) > 1]
+
+    def layers(self):
+        result = defaultdict(list)
+        for node in sorted(self.nodes):
+            result[self.layer[node]].append(node)
+        return [result[i] for i in sorted(result)]
+
+    def to_dict(self, project_name):
+        cycles = self.cycles()
+        cycle_of = {node: i for i, comp in enumerate(cycles) for node in comp}
+        imported_by = defaultdict(list)
+        for source in sorted(self.edges):
+            for target in self.edges[source]:
+                imported_by[target].append(source)
+        modules = {}
+        for node in sorted(self.nodes):
+            modules[node] = {
+                "imports": dict(sorted(self.edges.get(node, {}).items())),
+                "imported_by": sorted(imported_by.get(node, [])),
+                "fan_in": self.fan_in[node],
+                "fan_out": self.fan_out[node],
+                "layer": self.layer[node],
+                "cycle": cycle_of.get(node),
+            }
+        return {"project": project_name, "modules": modules, "cycles": cycles, "layers": self.layers(),
+                "files": {source: sorted(targets) for source, targets in sorted(self.files.items())},
+                "file_modules": dict(sorted(self.file_module.items()))}
+
+    def to_mermaid(self, max_nodes=SUMMARY_MAX_NODES, max_edges=SUMMARY_MAX_EDGES):
+        """
+        Сводный граф модулей: самые связанные модули (по fan-in + fan-out) и
+        самые тяжелые ребра между ними; модули в циклах подсвечены.
+        """
+        ranked = sorted(self.nodes, key=lambda n: (-(self.fan_in[n] + self.fan_out[n]), n))
+        shown = set(ranked[:max_nodes])
+        edges = [(weight, source, target) for source, targets in self.edges.items() if source in shown
+                 for target, weight in targets.items() if target in shown]
+        total_edges = sum(len(targets) for targets in self.edges.values())
+        edges.sort(key=lambda e: (-e[0], e[1], e[2]))
+        edges = edges[:max_edges]
+
+        ids = {node: f"m{i}" for i, node in enumerate(sorted(shown))}
+        lines = ["graph TD"]
+        if len(shown) < len(self.nodes) or len(edges) < total_edges:
+            lines.append(f"    %% summary: {len(shown)} of {len(self.nodes)} modules, "
+                         f"{len(edges)} of {total_edges} edges; full graph in {GRAPH_JSON_NAME}")
+        for node in sorted(shown):
+            lines.append(f'    {ids[node]}["{node}"]')
+        for weight, source, target in edges:
+            lines.append(f"    {ids[source]} -->|{weight}| {ids[target]}")
+        in_cycles = sorted(node for comp in self.cycles() for node in comp if node in shown)
+        if in_cycles:
+            lines.append("    classDef cycle fill:#fdd,stroke:#c00")
+            lines.append(f"    class {','.join(ids[node] for node in in_cycles)} cycle")
+        return "\n".join(lines) + "\n"
+
+
+def write_graph(out_dir, project_name, file_edges, file_module):
+    """
+    Пишет dependencies.json (полная смежность модулей и файлов, циклы, слои)
+    и dependencies.mermaid (ограниченная по размеру сводка). Возвращает граф.
+    """
+    graph = ModuleGraph(file_edges, file_module)
+    with open(os.path.join(out_dir, GRAPH_JSON_NAME), "w", encoding="utf-8") as f:
+        json.dump(graph.to_dict(project_name), f, indent=1, ensure_ascii=False)
+    with open(os.path.join(out_dir, MERMAID_NAME), "w", encoding="utf-8") as f:
+        f.write(graph.to_mermaid())
+    return graph
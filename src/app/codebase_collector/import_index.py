@@ -0,0 +1,103 @@
+import posixpath
+
+# Папки, которые почти всегда являются корнями исходников
+COMMON_SOURCE_ROOTS = ("src", "lib")
+
+
+class ImportIndex:
+    """
+    Индекс для резолвинга импортов, строится один раз за сборку.
+    modules - "пакет.модуль" -> файл для всех корней исходников: корень проекта,
+    src/ и lib/, а также любая папка, в которой лежит пакет верхнего уровня
+    (папка с __init__.py, у родителя которой __init__.py нет). Файлы в папках
+    без __init__.py (namespace packages) тоже получают имена.
+    После этого каждый поиск - попадание в словарь.
+    """
+
+    def __init__(self, all_files):
+        py_files = [f for f in all_files if f.endswith(".py")]
+        self.files = set(py_files)
+
+        py_dirs = {posixpath.dirname(f) for f in py_files}
+        init_dirs = {posixpath.dirname(f) for f in py_files if posixpath.basename(f) == "__init__.py"}
+        roots = {""}
+        roots.update(r for r in COMMON_SOURCE_ROOTS if any(d == r or d.startswith(r + "/") for d in py_dirs))
+        roots.update(posixpath.dirname(d) for d in init_dirs if d and posixpath.dirname(d) not in init_dirs)
+        # При совпадении имен выигрывает более мелкий корень (сначала сам корень проекта)
+        self.roots = sorted(roots, key=lambda r: (0 if not r else r.count("/") + 1, r))
+        priority = {root: i for i, root in enumerate(self.roots)}
+
+        self.modules = {}
+        best = {}
+        for f in py_files:
+            parts = f[:-3].split("/")
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            # Корни, лежащие на пути файла: проверяем каждую папку-предка, O(глубины)
+            for depth in range(len(parts)):
+                root = "/".join(parts[:depth]) if depth else ""
+                if root not in priority:
+                    continue
+                name = ".".join(parts[depth:])
+                if name and (name not in best or priority[root] < best[name]):
+                    best[name] = priority[root]
+                    self.modules[name] = f
+
+    def module_names(self):
+        """
+        Обратный индекс: файл -> самое короткое из его имен ("pkg.core", а не
+        "src.pkg.core"). Файлы, все имена которых заняты другими, не попадают.
+        """
+        names = {}
+        for name, f in self.modules.items():
+            if f not in names or len(name) < len(names[f]):
+                names[f] = name
+        return names
+
+    def _file_for_path(self, path):
+        # path - путь без расширения: модуль (path.py) или пакет (path/__init__.py)
+        candidate = f"{path}.py"
+        if candidate in self.files:
+            return candidate
+        candidate = f"{path}/__init__.py"
+        if candidate in self.files:
+            return candidate
+        return None
+
+    def resolve(self, base_file, module, level=0, names=()):
+        """
+        Файлы проекта, на которые указывает импорт из base_file.
+        Для "from pkg import a, b" к самому pkg добавляются подмодули pkg.a и pkg.b,
+        если это файлы (в т.ч. "from . import x", где module == "").
+        """
+        targets = []
+        if level > 0:
+            # Относительный импорт: поднимаемся от папки файла на level-1 уровней
+            base_dir = posixpath.dirname(base_file)
+            for _ in range(level - 1):
+                base_dir = posixpath.dirname(base_dir)
+            path = posixpath.join(base_dir, *module.split(".")) if module else base_dir
+            target = self._file_for_path(path) if module else None
+            if target:
+                targets.append(target)
+            from_package = False
+            for name in names:
+                sub = self._file_for_path(posixpath.join(path, name))
+                if sub:
+                    targets.append(sub)
+                else:
+                    from_package = True
+            # from . import helper, где helper определен в __init__.py пакета
+            if not module and from_package:
+                package_init = f"{path}/__init__.py" if path else "__init__.py"
+                if package_init in self.files:
+                    targets.append(package_init)
+        else:
+            target = self.modules.get(module)
+            if target:
+                targets.append(target)
+            for name in names:
+                sub = self.modules.get(f"{module}.{name}")
+                if sub:
+                    targets.append(sub)
+        return targets
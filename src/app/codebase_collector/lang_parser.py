@@ -0,0 +1,614 @@
+import re
+
+from .code_parser import CLASS_DOC_MAX_LINES
+
+# Скелеты для не-Python файлов: один потоковый проход регулярками по тексту,
+# без грамматики и сторонних парсеров. Разбираются только уровни, где живут
+# объявления (файл, namespace/mod, класс/struct/interface/impl/trait, enum);
+# тела функций пропускаются сканером скобок, не разбирая их содержимого.
+# Результат - тот же outline, что у analyze_python, с элементами
+# ("decl", ключевое слово, имя, сигнатура, комментарий, члены) - члены None
+# у листьев (функции, поля, переменные, типы) и список у контейнеров.
+LANGUAGES = {
+    ".js": "js", ".jsx": "js", ".mjs": "js", ".cjs": "js", ".ts": "js", ".tsx": "js", ".mts": "js", ".cts": "js",
+    ".c": "c", ".h": "c", ".cpp": "c", ".cc": "c", ".cxx": "c", ".hpp": "c", ".hh": "c", ".hxx": "c",
+    ".go": "go",
+    ".rs": "rust",
+}
+
+# Ограничения, чтобы скелет не разрастался на отдельных объявлениях
+SIGNATURE_MAX_CHARS = 200  # заголовок объявления без тела
+VALUE_MAX_CHARS = 120      # показанное начало значения: const x = { ... }
+
+_COMMENT = r"//[^\n]*|/\*[\s\S]*?\*/"
+_DQ = r'"(?:[^"\\\n]|\\[\s\S])*"'
+_SQ = r"'(?:[^'\\\n]|\\[\s\S])*'"
+# Строки и символьные литералы: кавычка без пары до конца строки - просто символ
+# (апострофы в тексте JSX, лайфтаймы Rust)
+_STRINGS = {
+    # Шаблонная строка JS: вложенные `...` и {...} внутри ${...} - на один уровень
+    "js": r"`(?:[^`\\$]|\\[\s\S]|\$(?!\{)|\$\{(?:[^{}`]|`(?:[^`\\]|\\[\s\S])*`|\{[^{}]*\})*\})*`|"
+          + _DQ + "|" + _SQ,
+    "c": r'R"(?P<delim>[^(\s"]{0,16})\([\s\S]*?\)(?P=delim)"|' + _DQ + "|" + _SQ,
+    "go": r"`[^`]*`|" + _DQ + "|" + _SQ,
+    "rust": r'(?<!\w)b?r(?P<hashes>#*)"[\s\S]*?"(?P=hashes)|"(?:[^"\\]|\\[\s\S])*"'
+            r"|(?<!\w)b?'(?:[^'\\\n]|\\(?:x[0-9a-fA-F]{2}|u\{[0-9a-fA-F]{1,6}\}|.))'",
+}
+# Символы, с которых начинается хоть один токен: позиции с другими символами
+# отсекаются одной проверкой, не перебирая все альтернативы (в 3 раза быстрее)
+_FIRST = {"js": "`/", "c": "#R", "go": "`", "rust": "#rb"}
+
+
+def _patterns(lang):
+    # Сканер уровня объявлений: переводы строк, скобки, концы операторов,
+    # строки препроцессора C и атрибуты Rust. Сканер тела: только то, что
+    # влияет на баланс фигурных скобок
+    strings = _STRINGS[lang]
+    slash = "|(?P<slash>/)" if lang == "js" else ""
+    pre = r"|(?P<pre>\#)" if lang in ("c", "rust") else ""
+    first = re.escape("\n/\"'{}()[];," + _FIRST[lang])
+    collect = re.compile(rf"(?=[{first}])(?:(?P<nl>\n)|(?P<com>{_COMMENT})|(?P<str>{strings}){pre}"
+                         rf"|(?P<open>[{{(\[])|(?P<close>[}})\]])|(?P<end>[;,]){slash})")
+    body = re.compile(rf"(?=[{first}])(?:(?P<com>{_COMMENT})|(?P<str>{strings})|(?P<open>\{{)|(?P<close>\}}){slash})")
+    return collect, body
+
+
+_PATTERNS = {lang: _patterns(lang) for lang in _STRINGS}
+
+# Регулярное выражение JS: "/" после оператора, скобки или ключевого слова
+_JS_REGEX = re.compile(r"/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*")
+_JS_REGEX_AFTER = frozenset("(,=:[!&|?{};+-*%<>~^")
+_JS_REGEX_WORDS = frozenset(("return", "typeof", "case", "in", "of", "void", "yield", "await",
+                             "delete", "throw", "instanceof", "new", "else", "do"))
+# Перевод строки не завершает оператор JS/TS после этих слов и перед этими символами/словами
+_JS_CONTINUE = frozenset(("export", "default", "declare", "abstract", "async", "function", "class", "interface",
+                          "enum", "const", "let", "var", "type", "extends", "implements", "static", "public",
+                          "private", "protected", "readonly", "new", "namespace", "module", "get", "set"))
+_JS_CONTINUE_NEXT = frozenset(("extends", "implements", "as", "satisfies", "from", "instanceof", "in"))
+_NEXT = re.compile(r"(?:\s+|//[^\n]*|/\*[\s\S]*?\*/)*(\S)([\w$]*)")
+_GLUE = re.compile(r"(?<=[(\[]) | (?=[)\]])")
+_LAST_WORD = re.compile(r"[\w$]+$")
+_DECORATORS = re.compile(r"^(?:@[\w$.]+(?:\((?:[^()]|\([^()]*\))*\))?\s*)+")
+_RS_ATTR_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]]')
+
+
+class _Extractor:
+    """Один проход по файлу: стек контейнеров и текущий оператор уровня объявлений."""
+
+    def __init__(self, code, lang):
+        self.code = code
+        self.lang = lang
+        self.collect_re, self.body_re = _PATTERNS[lang]
+        self.classify = _CLASSIFIERS[lang]
+        self.outline = []
+        # Контейнер: [вид, ключевое слово, имя, сигнатура, комментарий, члены, члены через запятую]
+        self.stack = [["file", "", "", "", "", self.outline, False]]
+        self.parts = []
+        self.start = None    # начало текущего оператора
+        self.nest = 0        # глубина ( и [ внутри оператора
+        self.doc = []        # комментарии подряд перед оператором
+        self.doc_end = 0
+        self.stmt_doc = None
+        self.unnamed = None  # безымянный struct/enum C для "typedef struct { ... } name;"
+
+    def run(self):
+        code = self.code
+        search = self.collect_re.search
+        pos = 0
+        while True:
+            m = search(code, pos)
+            end = m.start() if m else len(code)
+            if end > pos:
+                self._text(pos, end)
+            if m is None:
+                break
+            kind = m.lastgroup
+            pos = m.end()
+            if kind == "nl":
+                if self.start is None:
+                    continue
+                if self.nest == 0 and self.lang in ("go", "js") and self._line_end(end):
+                    self._statement("\n")
+                else:
+                    self.parts.append(" ")
+            elif kind == "com":
+                self._comment(m.group(), end, pos)
+            elif kind == "pre" and not code[code.rfind("\n", 0, end) + 1:end].strip():
+                pos = self._directive(end, pos)
+            else:
+                if self.start is None:
+                    self._begin(end)
+                ch = m.group()
+                if kind == "open":
+                    if ch == "{" and self.nest == 0:
+                        pos = self._open(pos)
+                    else:
+                        self.nest += 1
+                        self.parts.append(ch)
+                elif kind == "close":
+                    if self.nest > 0:
+                        self.nest -= 1
+                        self.parts.append(ch)
+                    elif ch == "}":
+                        self._close()
+                    else:
+                        self.parts.append(ch)
+                elif kind == "end":
+                    if self.nest == 0 and (ch == ";" or self.stack[-1][6]):
+                        self._statement(ch)
+                    else:
+                        self.parts.append(ch)
+                elif kind == "slash":
+                    regex = self._regex_literal(end)
+                    if regex is not None:
+                        pos = regex.end()
+                        ch = regex.group()
+                    self.parts.append(ch)
+                else:
+                    self.parts.append(ch)
+        self._statement("\n")
+        while len(self.stack) > 1:
+            self._close()
+        return self.outline
+
+    def _text(self, a, b):
+        if self.start is None:
+            segment = self.code[a:b]
+            stripped = segment.lstrip()
+            if not stripped:
+                return
+            self._begin(b - len(stripped))
+        self.parts.append(self.code[a:b])
+
+    def _begin(self, at):
+        self.start = at
+        if self.doc and self.code.count("\n", self.doc_end, at) <= 1:
+            self.stmt_doc = self.doc
+        self.doc = []
+
+    def _reset(self):
+        self.parts = []
+        self.start = None
+        self.nest = 0
+        self.stmt_doc = None
+
+    def _comment(self, text, start, end):
+        if self.start is not None:
+            self.parts.append(" ")
+            return
+        # Комментарий объявления - с начала строки, подряд, без пустой строки до объявления
+        line_start = self.code.rfind("\n", 0, start) + 1
+        if self.code[line_start:start].strip():
+            self.doc = []
+            return
+        if self.doc and self.code.count("\n", self.doc_end, start) > 1:
+            self.doc = []
+        self.doc.append(text)
+        self.doc_end = end
+
+    def _directive(self, start, pos):
+        # Строка препроцессора C (с продолжениями через \) или атрибут Rust #[...]:
+        # пропускаются целиком, комментарий перед ними остается у объявления
+        code = self.code
+        if self.lang == "rust":
+            depth = 0
+            for m in _RS_ATTR_TOKEN.finditer(code, pos):
+                if m.group() == "[":
+                    depth += 1
+                elif m.group() == "]":
+                    depth -= 1
+                    if depth <= 0:
+                        end = m.end()
+                        break
+            else:
+                end = len(code)
+        else:
+            end = code.find("\n", pos)
+            while end != -1 and code[end - 1] == "\\":
+                end = code.find("\n", end + 1)
+            if end == -1:
+                end = len(code)
+        if self.doc:
+            if self.code.count("\n", self.doc_end, start) > 1:
+                self.doc = []
+            self.doc_end = end
+        return end
+
+    def _line_end(self, pos):
+        # Завершает ли перевод строки оператор (Go - по правилу вставки ";", JS/TS - эвристика ASI)
+        for piece in reversed(self.parts):
+            piece = piece.rstrip()
+            if piece:
+                break
+        else:
+            return False
+        last = piece[-1]
+        if self.lang == "go":
+            return last.isalnum() or last in "_)]}\"'`" or piece.endswith(("++", "--"))
+        if not (last.isalnum() or last in "_$)]\"'`"):
+            return False
+        word = _LAST_WORD.search(piece)
+        if word is not None and word.group() in _JS_CONTINUE:
+            return False
+        following = _NEXT.match(self.code, pos)
+        if following is not None and (following.group(1) in ".,=:?|&+-*/%<>([{"
+                                      or following.group(2) in _JS_CONTINUE_NEXT):
+            return False
+        if self.code[self.start] == "@" and _DECORATORS.fullmatch("".join(self.parts).strip()):
+            return False
+        return True
+
+    def _regex_literal(self, pos):
+        code = self.code
+        i = pos - 1
+        while i >= 0 and code[i] in " \t\r\n":
+            i -= 1
+        if i >= 0 and code[i] not in _JS_REGEX_AFTER and code[i] != "}":
+            j = i
+            while j >= 0 and (code[j].isalnum() or code[j] in "_$"):
+                j -= 1
+            if code[j + 1:i + 1] not in _JS_REGEX_WORDS:
+                return None
+        return _JS_REGEX.match(code, pos)
+
+    def _skip(self, pos):
+        # Пропуск тела до парной "}": считаются только фигурные скобки вне строк и комментариев
+        code = self.code
+        search = self.body_re.search
+        depth = 1
+        while True:
+            m = search(code, pos)
+            if m is None:
+                return len(code)
+            pos = m.end()
+            kind = m.lastgroup
+            if kind == "open":
+                depth += 1
+            elif kind == "close":
+                depth -= 1
+                if depth == 0:
+                    return pos
+            elif kind == "slash":
+                regex = self._regex_literal(m.start())
+                if regex is not None:
+                    pos = regex.end()
+
+    def _value(self, start, end):
+        # Начало тела значения без комментариев: "{ a: 1, b: 2 ... }"
+        body = self.code[start:end - 1]
+        head = body[:VALUE_MAX_CHARS * 4]
+        pieces = []
+        last = 0
+        for m in self.body_re.finditer(head):
+            if m.lastgroup == "com":
+                pieces.append(head[last:m.start()])
+                pieces.append(" ")
+                last = m.end()
+        pieces.append(head[last:])
+        value = " ".join("".join(pieces).split())
+        if len(value) > VALUE_MAX_CHARS or len(head) < len(body) and value:
+            value = value[:VALUE_MAX_CHARS].rstrip() + " ..."
+        return f"{{ {value} }}" if value else "{ }"
+
+    def _header(self):
+        text = " ".join("".join(self.parts).split())
+        if "( " in text or " )" in text or "[ " in text or " ]" in text:
+            # Заголовок, разбитый по строкам: f(\n a,\n b,\n) -> f(a, b,)
+            text = _GLUE.sub("", text)
+        # Метки доступа C++ (public:) - не часть объявления
+        return _C_ACCESS.sub("", text) if self.lang == "c" and ":" in text else text
+
+    def _doc(self, container):
+        if not self.stmt_doc:
+            return ""
+        return _doc_text(self.stmt_doc, container)
+
+    def _add(self, decl):
+        self.stack[-1][5].append(decl)
+
+    def _statement(self, end):
+        if self.start is not None:
+            text = self._header()
+            unnamed, self.unnamed = self.unnamed, None
+            if unnamed is not None and end == ";" and re.fullmatch(r"[\w\s,*]+", text):
+                members, i = unnamed
+                _, keyword, _, signature, doc, inner = members[i]
+                members[i] = ("decl", keyword, text, f"{signature} {text}", doc, inner)
+            else:
+                found = self.classify(text, end, self.stack[-1][0])
+                if found is not None:
+                    self._add(("decl", found[1], found[2], _bound(text), self._doc(False), None))
+        self._reset()
+
+    def _open(self, pos):
+        text = self._header()
+        self.unnamed = None
+        found = self.classify(text, "{", self.stack[-1][0]) if text else None
+        if found is not None and found[0] == "container":
+            _, keyword, name, kind = found
+            comma = kind == "enum" or self.lang == "rust" and kind == "struct"
+            self.stack.append([kind, keyword, name, _bound(text), self._doc(True), [], comma])
+            self._reset()
+            return pos
+        end = self._skip(pos)
+        if found is not None:
+            category, keyword, name = found[:3]
+            signature = _bound(text) + (" { ... }" if category == "func" else " " + self._value(pos, end))
+            self._add(("decl", keyword, name, signature, self._doc(False), None))
+        self._reset()
+        return end
+
+    def _close(self):
+        if len(self.stack) == 1:
+            self._reset()
+            return
+        self._statement("}")
+        kind, keyword, name, signature, doc, members, _ = self.stack.pop()
+        self._add(("decl", keyword, name, signature, doc, members))
+        if not name and self.lang == "c" and kind in ("class", "enum"):
+            self.unnamed = (self.stack[-1][5], len(self.stack[-1][5]) - 1)
+
+
+def _bound(text):
+    if len(text) > SIGNATURE_MAX_CHARS:
+        return text[:SIGNATURE_MAX_CHARS].rstrip() + " ..."
+    return text
+
+
+def _doc_text(comments, container):
+    """Текст комментариев без разметки (//, ///, /** */, * в начале строк), обрезанный как докстринги Python."""
+    lines = []
+    for comment in comments:
+        if comment.startswith("/*"):
+            for line in comment[2:-2].lstrip("*!").split("\n"):
+                line = line.strip()
+                if line.startswith("*"):
+                    line = line[1:].strip()
+                lines.append(line)
+        else:
+            lines.append(comment.lstrip("/!").strip())
+    while lines and not lines[-1]:
+        lines.pop()
+    while lines and not lines[0]:
+        lines.pop(0)
+    if not container:
+        return lines[0] + " ..." if len(lines) > 1 else "".join(lines)
+    if len(lines) > CLASS_DOC_MAX_LINES:
+        lines = lines[:CLASS_DOC_MAX_LINES] + ["..."]
+    return "\n".join(lines)
+
+
+def _after_angles(text, i):
+    # Индекс за парной ">" для text[i] == "<" (шаблоны C++, обобщения Rust); "->" не считается
+    depth = 0
+    for j in range(i, len(text)):
+        ch = text[j]
+        if ch == "<":
+            depth += 1
+        elif ch == ">" and text[j - 1] != "-":
+            depth -= 1
+            if depth == 0:
+                return j + 1
+    return len(text)
+
+
+# Классификаторы: (категория, ключевое слово, имя[, вид контейнера]) или None.
+# Категории: container - члены разбираются; func - тело пропускается ("{ ... }");
+# value - от тела показывается начало; leaf - объявление без тела.
+# end - чем закончился заголовок: "{", ";", "," или перевод строки / "}".
+
+_JS_CONTAINER = re.compile(r"(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:const\s+)?"
+                           r"(class|interface|enum|namespace|module)\b(?![.$])\s*([\w$.]*|'[^']*'|\"[^\"]*\")")
+_JS_FUNCTION = re.compile(r"(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:async\s+)?function\b\s*\*?\s*([\w$]*)")
+_JS_VARIABLE = re.compile(r"(?:export\s+)?(?:declare\s+)?(const|let|var|type)\s+([\w$]+)")
+_JS_REQUIRE = re.compile(r"\s*=\s*(?:await\s+)?(?:require|import)\s*\(")
+_JS_EXPORTS = re.compile(r"(module\.exports|exports\.[\w$]+)\s*=")
+_JS_ARROW = re.compile(r"=\s*(?:async\b\s*)?(?:function\b|(?:\([^)]*\)|[\w$]+)\s*(?::[^=]*)?=>)")
+_JS_MEMBER = re.compile(r"(?:(?:public|private|protected|static|readonly|abstract|override|declare|accessor"
+                        r"|async|get|set)\s+)*\*?\s*(#?[\w$]+|\[[^\]]*\]|'[^']*'|\"[^\"]*\")\s*[?!]?\s*(<.*?>)?\s*(\()?")
+_JS_ENUM_MEMBER = re.compile(r"[\w$]+|'[^']*'|\"[^\"]*\"")
+_JS_KIND = {"class": "class", "interface": "interface", "enum": "enum"}
+
+
+def _classify_js(text, end, parent):
+    if parent == "enum":
+        m = _JS_ENUM_MEMBER.match(text)
+        return ("leaf", "", m.group()) if m else None
+    text = _DECORATORS.sub("", text)
+    if not text:
+        return None
+    m = _JS_CONTAINER.match(text)
+    if m:
+        keyword, name = m.group(1), m.group(2) or "default"
+        if end == "{":
+            return "container", keyword, name, _JS_KIND.get(keyword, "file")
+        return "leaf", keyword, name
+    if text == "declare global" and end == "{":
+        return "container", "declare", "global", "file"
+    m = _JS_FUNCTION.match(text)
+    if m:
+        return "func" if end == "{" else "leaf", "function", m.group(1) or "default"
+    if parent in ("class", "interface"):
+        m = _JS_MEMBER.match(text)
+        if m is None:
+            return None
+        callable_ = m.group(3) is not None or "=>" in text
+        return "func" if end == "{" and callable_ else "value" if end == "{" else "leaf", "", m.group(1)
+    m = _JS_VARIABLE.match(text)
+    if m:
+        if _JS_REQUIRE.match(text, m.end()):
+            return None
+        keyword, name = m.groups()
+    else:
+        m = _JS_EXPORTS.match(text)
+        if m is None:
+            return None
+        keyword, name = "", m.group(1)
+    if end == "{":
+        return "func" if _JS_ARROW.search(text) else "value", keyword, name
+    return "leaf", keyword, name
+
+
+_C_ACCESS = re.compile(r"^(?:(?:public|private|protected|signals|slots|Q_SLOTS|Q_SIGNALS)\s*:\s*)+")
+_C_NOISE = re.compile(r"\b__attribute__\s*\(\((?:[^()]|\([^()]*\))*\)\)|\b__declspec\s*\([^)]*\)|\[\[.*?\]\]"
+                      r"|\balignas\s*\([^)]*\)")
+_C_CONTAINER = re.compile(r"(?:typedef\s+)?(?:(?:export|inline)\s+)?"
+                          r"(class|struct|union|enum(?:\s+class|\s+struct)?|namespace)\b\s*(.*)")
+_C_EXTERN = re.compile(r'extern\s+"[^"]*"')
+_C_CALL = re.compile(r"((?:[\w~]+::)*(?:operator\s*(?:\(\)|[^\s(]+)|~?\w+))\s*\(")
+_C_POINTER = re.compile(r"\(\s*\*\s*(\w+)\s*\)\s*\(")
+_C_NAME = re.compile(r"(\w+)\s*(?:\[[^\]]*\]\s*)*(?::\s*\w+\s*)?$")
+_C_ASSIGN = re.compile(r"(?<![=!<>+\-*/%&|^])(?<!operator)=(?!=)")
+_C_COLON = re.compile(r"(?<!:):(?!:)")
+_C_CONTROL = frozenset(("if", "for", "while", "switch", "return", "sizeof", "catch", "do", "else", "case", "goto",
+                        "throw", "delete", "new", "static_assert", "decltype", "typeof", "alignof", "friend"))
+
+
+def _classify_c(text, end, parent):
+    bare = _C_NOISE.sub("", text).strip() if "__" in text or "[[" in text or "alignas" in text else text
+    if bare.startswith("template"):
+        i = bare.find("<")
+        bare = bare[_after_angles(bare, i):].strip() if i != -1 else bare
+    if not bare:
+        return None
+    if parent == "enum":
+        m = re.match(r"\w+", bare)
+        return ("leaf", "", m.group()) if m else None
+    m = _C_CONTAINER.match(bare)
+    if m and "=" not in bare and (end != "{" or "(" not in bare):
+        keyword, rest = m.groups()
+        kind = keyword.split()[0]
+        if kind == "namespace":
+            return ("container", keyword, rest.strip(), "file") if end == "{" else None
+        words = [w for w in _C_COLON.split(rest, 1)[0].split() if w != "final"]
+        if end == "{":
+            return "container", keyword, words[-1] if words else "", "enum" if kind == "enum" else "class"
+        if len(words) == 1:
+            return "leaf", keyword, words[0]
+    if end == "{" and _C_EXTERN.fullmatch(bare):
+        return "container", "extern", bare.split(None, 1)[1], "file"
+    first = bare.split(None, 1)[0]
+    if first in ("using", "typedef"):
+        m = re.match(r"using\s+(\w+)\s*=", bare)
+        if m:
+            return "leaf", "using", m.group(1)
+        if first == "typedef":
+            m = _C_POINTER.search(bare) or _C_NAME.search(bare)
+            return ("leaf", "typedef", m.group(1)) if m else None
+        return None
+    if first in _C_CONTROL:
+        return None
+    m = _C_ASSIGN.search(bare)
+    eq = m.start() if m else -1
+    paren = bare.find("(")
+    if paren != -1 and (eq == -1 or paren < eq):
+        m = _C_POINTER.search(bare)
+        if m and m.start() == paren:
+            return "leaf", "", m.group(1)
+        m = _C_CALL.search(bare)
+        if m is None or m.group(1) in _C_CONTROL:
+            return None
+        name = m.group(1)
+        if not bare[:m.start(1)].strip() and "::" not in name and parent != "class":
+            return None
+        return "func" if end == "{" else "leaf", "", name
+    m = _C_NAME.search(bare[:eq] if eq != -1 else bare)
+    if m is None or not bare[:m.start()].strip():
+        return None
+    if end == "{":
+        return "func" if bare.endswith(")") else "value", "", m.group(1)
+    return "leaf", "", m.group(1)
+
+
+_GO_FUNC = re.compile(r"func\s*(?:\(\s*(?:\w+\s+)?\*?\s*([\w.]+)[^)]*\)\s*)?(\w+)")
+_GO_TYPE = re.compile(r"type\s+(\w+)")
+_GO_GROUP = re.compile(r"(type|var|const)\s*\(")
+_GO_VALUE = re.compile(r"(var|const)\s+(\w+)")
+_GO_FIELD = re.compile(r"\w+(?:\s*,\s*\w+)*|\*?[\w.]+")
+
+
+def _classify_go(text, end, parent):
+    if parent in ("struct", "interface"):
+        m = _GO_FIELD.match(text)
+        if m is None:
+            return None
+        if end == "{":
+            for kind in ("struct", "interface"):
+                if text.endswith(kind):
+                    return "container", "", m.group(), kind
+            return "value", "", m.group()
+        return "leaf", "", m.group()
+    m = _GO_FUNC.match(text)
+    if m:
+        name = f"{m.group(1)}.{m.group(2)}" if m.group(1) else m.group(2)
+        return "func" if end == "{" else "leaf", "func", name
+    m = _GO_GROUP.match(text)
+    if m:
+        return "leaf", m.group(1), "(...)"
+    m = _GO_TYPE.match(text)
+    if m:
+        if end == "{":
+            for kind in ("struct", "interface"):
+                if text.endswith(kind):
+                    return "container", "type", m.group(1), kind
+            return "value", "type", m.group(1)
+        return "leaf", "type", m.group(1)
+    m = _GO_VALUE.match(text)
+    if m:
+        if end == "{":
+            return "func" if "func(" in text else "value", m.group(1), m.group(2)
+        return "leaf", m.group(1), m.group(2)
+    return None
+
+
+_RS_ITEM = re.compile(r"(?:pub(?:\s*\([^)]*\))?\s+)?(?:(?:default|const|async|unsafe|extern(?:\s+\"[^\"]*\")?)\s+)*"
+                      r"(fn|struct|enum|union|trait|mod|type|const|static(?:\s+mut)?|macro_rules!)\s*(\w*)")
+_RS_IMPL = re.compile(r"(?:unsafe\s+)?impl\b\s*")
+_RS_EXTERN = re.compile(r'(?:unsafe\s+)?extern(?:\s+"[^"]*")?')
+_RS_FIELD = re.compile(r"(?:pub(?:\s*\([^)]*\))?\s+)?(\w+)")
+_RS_KIND = {"struct": "struct", "union": "struct", "enum": "enum", "trait": "class", "mod": "file"}
+
+
+def _classify_rust(text, end, parent):
+    if parent in ("struct", "enum"):
+        m = _RS_FIELD.match(text)
+        if m is None:
+            return None
+        return "value" if end == "{" else "leaf", "", m.group(1)
+    m = _RS_ITEM.match(text)
+    if m:
+        keyword, name = m.groups()
+        keyword = keyword.split()[0]
+        if end == "{":
+            if keyword in _RS_KIND:
+                return "container", keyword, name, _RS_KIND[keyword]
+            return "func" if keyword in ("fn", "macro_rules!") else "value", keyword, name
+        return "leaf", keyword, name
+    m = _RS_IMPL.match(text)
+    if m and end == "{":
+        i = m.end()
+        if text.startswith("<", i):
+            i = _after_angles(text, i)
+        name = re.split(r"\s+where\b", text[i:], 1)[0].strip()
+        return "container", "impl", name, "class"
+    if end == "{" and _RS_EXTERN.fullmatch(text):
+        return "container", "extern", text.split(None, 1)[1] if " " in text else "", "file"
+    return None
+
+
+_CLASSIFIERS = {"js": _classify_js, "c": _classify_c, "go": _classify_go, "rust": _classify_rust}
+
+
+def extract_outline(code, ext):
+    """
+    Outline скелета для JS/TS, C/C++, Go и Rust (см. LANGUAGES) за один
+    проход без сторонних зависимостей: объявления верхнего уровня и членов
+    классов/структур/интерфейсов с сигнатурами без тел и комментариями, стоящими
+    прямо перед объявлением. Для остальных расширений - None.
+    """
+    lang = LANGUAGES.get(ext)
+    if lang is None:
+        return None
+    if "\r" in code:
+        code = code.replace("\r\n", "\n").replace("\r", "\n")
+    return _Extractor(code, lang).run()
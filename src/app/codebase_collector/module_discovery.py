@@ -1,4 +1,5 @@
 import os
+from collections import defaultdict, namedtuple
 
 def discover_modules(project_path):
     """
@@ -18,3 +19,208 @@ def discover_modules(project_path):
             modules.append(root)
 
     return modules
+
+def is_module_root(dir_path, files_in_dir):
+    has_init = "__init__.py" in files_in_dir
+    has_readme = any(f.lower().startswith("readme") for f in files_in_dir)
+    return has_init and has_readme
+
+class ModuleTree:
+    """
+    Индекс модулей проекта: префиксное дерево (trie) по компонентам пути.
+    owner() находит ближайший модуль-предок за O(глубины пути), без перебора
+    всех модулей и без ложных совпадений префиксов (src/model vs src/model2).
+    parent()/children() - связи между модулями. Модули добавляются сверху вниз
+    (как при обходе), корень проекта - модуль всегда.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        # Узел trie: [дети по имени папки, abs путь модуля или None]
+        self._trie = [{}, root_path]
+        self._rel = {root_path: ""}
+        self._parent = {root_path: None}
+        self._children = defaultdict(list)
+
+    def add(self, rel_dir, abs_path):
+        node = self._trie
+        parent = node[1]
+        for part in rel_dir.split("/"):
+            node = node[0].setdefault(part, [{}, None])
+            if node[1] is not None and node[1] != abs_path:
+                parent = node[1]
+        node[1] = abs_path
+        self._rel[abs_path] = rel_dir
+        self._parent[abs_path] = parent
+        self._children[parent].append(abs_path)
+
+    def owner(self, rel_path):
+        """Модуль, которому принадлежит папка или файл rel_path (относительно корня)."""
+        node = self._trie
+        owner = node[1]
+        if not rel_path or rel_path == ".":
+            return owner
+        for part in rel_path.replace("\\", "/").split("/"):
+            node = node[0].get(part)
+            if node is None:
+                break
+            if node[1] is not None:
+                owner = node[1]
+        return owner
+
+    def parent(self, module_path):
+        return self._parent.get(module_path)
+
+    def children(self, module_path):
+        return list(self._children.get(module_path, ()))
+
+    def rel_path(self, module_path):
+        return self._rel.get(module_path)
+
+    def __iter__(self):
+        # Модули в порядке добавления (порядок обхода, корень первым)
+        return iter(self._rel)
+
+    def __contains__(self, module_path):
+        return module_path in self._rel
+
+    def to_dict(self, name_fn, module_path=None):
+        """
+        Иерархия модулей для architecture.json:
+        {"name", "path", "children": [...]}, name_fn(abs_path) -> имя модуля.
+        """
+        if module_path is None:
+            module_path = self.root_path
+        return {
+            "name": name_fn(module_path),
+            "path": self._rel[module_path] or ".",
+            "children": [self.to_dict(name_fn, child) for child in self._children.get(module_path, ())],
+        }
+
+# Результат обхода проекта:
+# modules - ModuleTree с корнями модулей (корень проекта - тоже модуль),
+# modules_files - owner_path -> [(file, file_abs, rel_file, size, mtime_ns)] только
+#   для файлов, которые попадут в экспорт (целевые расширения и README),
+# all_files - относительные пути всех файлов в непропущенных папках (для импортов),
+# errors - [(rel_path, сообщение)] папок и файлов, которые не удалось прочитать.
+ProjectScan = namedtuple("ProjectScan", ["modules", "modules_files", "all_files", "errors"])
+
+class ScanCache:
+    """
+    Содержимое папок (DirEntry) с прошлого обхода - для watch-режима.
+    scan_project заново читает только папки, сброшенные invalidate(),
+    остальные берет отсюда вместе с уже полученным stat файлов.
+    """
+
+    def __init__(self):
+        self._dirs = {}  # rel_dir -> [DirEntry]
+
+    def entries(self, dir_abs, rel_dir):
+        entries = self._dirs.get(rel_dir)
+        if entries is None:
+            with os.scandir(dir_abs) as it:
+                entries = list(it)
+            self._dirs[rel_dir] = entries
+        return entries
+
+    def invalidate(self, changes):
+        """
+        changes - относительные пути, как их отдает источник изменений:
+        у папок путь заканчивается на "/", "/" - изменилось неизвестно что.
+        Сбрасывается папка, где лежит путь; у папки - еще и всё под ней.
+        """
+        for rel in changes:
+            if rel == "/" or rel.rsplit("/", 1)[-1] == ".gitignore":
+                # Правила поменялись - в обход могут войти папки, которые раньше не смотрелись
+                self._dirs.clear()
+                return
+            if rel.endswith("/"):
+                rel = rel[:-1]
+                prefix = rel + "/"
+                for rel_dir in [d for d in self._dirs if d == rel or d.startswith(prefix)]:
+                    del self._dirs[rel_dir]
+            self._dirs.pop(rel.rpartition("/")[0], None)
+
+def scan_project(root_path, target_exts, ignore_patterns, gitignore=None, max_file_size=None, scan_cache=None):
+    """
+    Один обход проекта через os.scandir (в том же порядке, что и os.walk).
+    Игнорируемые папки (ignore_patterns и .gitignore) отсекаются до спуска в них,
+    владелец-модуль и действующие правила gitignore передаются сверху вниз,
+    stat берется из DirEntry и только для файлов, которые могут попасть в экспорт.
+    Содержимое файлов здесь не читается. gitignore - объект GitIgnore или None.
+    scan_cache - ScanCache: неизменившиеся папки не читаются заново.
+    Ошибки чтения не печатаются, а возвращаются в errors - их учитывает сборка.
+    """
+    modules = ModuleTree(root_path)
+    modules_files = defaultdict(list)
+    all_files = set()
+    errors = []
+
+    # (abs_path, rel_path, owner_path, уровни правил gitignore родителя)
+    stack = [(root_path, "", None, None)]
+    while stack:
+        dir_abs, rel_dir, owner, levels = stack.pop()
+        try:
+            if scan_cache is not None:
+                entries = scan_cache.entries(dir_abs, rel_dir)
+            else:
+                with os.scandir(dir_abs) as it:
+                    entries = list(it)
+        except OSError as e:
+            errors.append((rel_dir or ".", str(e)))
+            continue
+
+        files = []
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if entry.name.startswith('.') or entry.name in ignore_patterns:
+                    continue
+                # Симлинки на папки, как и в os.walk, не обходим
+                if not entry.is_symlink():
+                    subdirs.append(entry)
+            else:
+                files.append(entry)
+
+        # Deepest Parent Logic: владелец - ближайший модуль сверху (или сама папка)
+        names = [e.name for e in files]
+        if gitignore is not None:
+            levels = gitignore.for_dir(levels, dir_abs, rel_dir, ".gitignore" in names)
+        if owner is None:
+            owner = dir_abs
+        elif is_module_root(dir_abs, names):
+            modules.add(rel_dir, dir_abs)
+            owner = dir_abs
+
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        for entry in files:
+            rel_file = prefix + entry.name
+            all_files.add(rel_file)
+
+            # Файл, который не попадет в экспорт, не трогаем вовсе
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext not in target_exts and not entry.name.lower().startswith("readme"):
+                continue
+            if gitignore is not None and gitignore.match(levels, rel_file):
+                continue
+            try:
+                st = entry.stat()
+            except OSError as e:
+                errors.append((rel_file, str(e)))
+                continue
+            if max_file_size is not None and st.st_size > max_file_size:
+                continue
+            modules_files[owner].append((entry.name, entry.path, rel_file, st.st_size, st.st_mtime_ns))
+
+        for entry in reversed(subdirs):
+            rel_sub = prefix + entry.name
+            # Папка под .gitignore не обходится вовсе (git и сам не смотрит внутрь)
+            if gitignore is not None and gitignore.match(levels, rel_sub, is_dir=True):
+                continue
+            stack.append((entry.path, rel_sub, owner, levels))
+
+    return ProjectScan(modules, modules_files, all_files, errors)
@@ -0,0 +1,114 @@
+import os
+
+# Под строку "# TOTAL TOKENS: ..." резервируется место фиксированной длины:
+# итог известен только в конце модуля, и строка дописывается поверх резерва
+TOKENS_LINE_WIDTH = 80
+
+
+class ModuleWriter:
+    """
+    Потоковая запись code/<module>.txt и signatures/<module>_API.txt.
+    Файлы открываются один раз, каждый обработанный файл проекта сразу
+    дописывается в конец, поэтому в памяти не копится код модуля.
+    Запись идет во временные .part файлы, которые переименовываются в close().
+    skeletons_only - модуль не менялся, переписываются только скелеты
+    (сменился их уровень): code/<module>.txt остается прежним.
+    """
+
+    def __init__(self, dir_code, dir_skel, mod_name, timestamp, children, readmes, skeletons_only=False):
+        self.mod_name = mod_name
+        self.skeletons_only = skeletons_only
+        self.code_path = os.path.join(dir_code, f"{mod_name}.txt")
+        self.skel_path = os.path.join(dir_skel, f"{mod_name}_API.txt")
+        self._skel = None
+        self._code = None
+        if skeletons_only:
+            return
+        self._code = open(self.code_path + ".part", "w", encoding="utf-8")
+
+        self._code.write(f"# MODULE: {mod_name}\n# DATE: {timestamp}\n")
+        self._tokens_pos = self._code.tell()
+        self._code.write("# TOTAL TOKENS: ".ljust(TOKENS_LINE_WIDTH) + "\n")
+
+        lines = []
+        if children:
+            lines.append("# >>> INCLUDED SUBMODULES:")
+            for child in sorted(children):
+                lines.append(f"#     - {child}")
+            lines.append("# " + "-"*30)
+
+        for path, txt in readmes:
+            lines.append(f"\n# DOCUMENTATION ({path}):\n{txt}\n")
+
+        # Элементы модуля разделяются "\n" (как при "\n".join)
+        for line in lines:
+            self._code.write("\n" + line)
+
+    def add_file(self, rel_file, tokens, content, skel=None):
+        if self._code is not None:
+            header = f"\n{'='*40}\nFILE: {rel_file}\nTOKENS: {tokens}\n{'='*40}\n"
+            self._code.write("\n" + header)
+            self._code.write(content)
+        if skel:
+            if self._skel is None:
+                self._skel = open(self.skel_path + ".part", "w", encoding="utf-8")
+            else:
+                self._skel.write("\n")
+            self._skel.write(skel)
+
+    def close(self, tokens_line):
+        """
+        Дописывает итоговую строку токенов в зарезервированное место и
+        атомарно подменяет старые файлы модуля новыми.
+        """
+        if self._code is None:
+            self._close_skel()
+            return
+        reserved = TOKENS_LINE_WIDTH - len(tokens_line.encode("utf-8"))
+        if reserved >= 0:
+            self._code.seek(self._tokens_pos)
+            self._code.write(tokens_line + " " * reserved)
+            self._code.close()
+        else:
+            # Строка не влезла в резерв (на практике не бывает) - переписываем файл целиком
+            self._code.close()
+            self._rewrite_tokens_line(tokens_line)
+
+        os.replace(self.code_path + ".part", self.code_path)
+        self._close_skel()
+
+    def _close_skel(self):
+        if self._skel is not None:
+            self._skel.close()
+            os.replace(self.skel_path + ".part", self.skel_path)
+        elif os.path.exists(self.skel_path):
+            # Скелетов в модуле больше нет - старый _API.txt устарел
+            os.remove(self.skel_path)
+
+    def abort(self):
+        for f, path in ((self._code, self.code_path), (self._skel, self.skel_path)):
+            if f is not None:
+                f.close()
+                if os.path.exists(path + ".part"):
+                    os.remove(path + ".part")
+
+    def _rewrite_tokens_line(self, tokens_line):
+        part = self.code_path + ".part"
+        with open(part, "r", encoding="utf-8") as src, open(part + "2", "w", encoding="utf-8") as dst:
+            for i, line in enumerate(src):
+                dst.write(tokens_line + "\n" if i == 2 else line)
+        os.replace(part + "2", part)
+
+
+def remove_stale_modules(dir_code, dir_skel, mod_names):
+    """
+    Удаляет code/<module>.txt и signatures/<module>_API.txt модулей, которых
+    больше нет в проекте (папку удалили, сменились фильтры). Возвращает их имена.
+    """
+    stale = set()
+    for directory, suffix in ((dir_code, ".txt"), (dir_skel, "_API.txt")):
+        for entry in os.listdir(directory):
+            if entry.endswith(suffix) and entry[:-len(suffix)] not in mod_names:
+                os.remove(os.path.join(directory, entry))
+                stale.add(entry[:-len(suffix)])
+    return sorted(stale)
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+# Служебные строки вокруг каждого файла в бандле (заголовок с путем и токенами)
+FILE_HEADER_TOKENS = 24
+# Шапка самого бандла
+BUNDLE_HEADER_TOKENS = 64
+
+MANIFEST_NAME = "manifest.json"
+_BUNDLE_FILE = re.compile(r"^bundle_\d+\.txt$")
+
+
+def parse_budget(value):
+    """'128k' / '1m' / '50000' -> число токенов."""
+    value = str(value).strip().lower()
+    for suffix, mult in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * mult)
+    return int(value)
+
+
+def pack_files(items, budget):
+    """
+    Раскладка файлов по бандлам не больше budget токенов, только по границам файлов.
+    items - список (module, rel_file, tokens) в порядке экспорта: модули идут
+    в порядке обхода проекта, поэтому соседние модули - соседи и по дереву.
+
+    Связанные файлы держатся вместе по иерархии модуль -> папка -> файл:
+    группа, которая влезает в остаток текущего бандла, дописывается в него;
+    влезающая в пустой бандл - начинает новый; иначе делится на подгруппы.
+    Один проход по дереву групп (next-fit), O(числа файлов).
+    Файл больше бюджета получает отдельный бандл.
+    Возвращает список бандлов, бандл - список индексов items.
+    """
+    capacity = max(1, budget - BUNDLE_HEADER_TOKENS)
+
+    # Дерево групп: узел = [tokens, children], лист - (cost, индекс файла)
+    root = [0, []]
+    groups = {}
+    for i, (module, rel_file, tokens) in enumerate(items):
+        cost = tokens + FILE_HEADER_TOKENS
+        path = [module] + posixpath.dirname(rel_file).split("/")
+        node = root
+        node[0] += cost
+        key = ()
+        for part in path:
+            key += (part,)
+            child = groups.get(key)
+            if child is None:
+                child = groups[key] = [0, []]
+                node[1].append(child)
+            node = child
+            node[0] += cost
+        node[1].append((cost, i))
+
+    bundles = [[]]
+    used = 0
+
+    def place(node):
+        nonlocal used
+        if isinstance(node, tuple):
+            cost, i = node
+            if used + cost > capacity and bundles[-1]:
+                bundles.append([])
+                used = 0
+            bundles[-1].append(i)
+            used += cost
+            return
+        tokens = node[0]
+        if used + tokens <= capacity:
+            # Группа целиком: все её файлы в порядке обхода
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                if isinstance(current, tuple):
+                    bundles[-1].append(current[1])
+                else:
+                    stack.extend(reversed(current[1]))
+            used += tokens
+            return
+        if tokens <= capacity and bundles[-1]:
+            bundles.append([])
+            used = 0
+            place(node)
+            return
+        for child in node[1]:
+            place(child)
+
+    # Глубина рекурсии ограничена глубиной папок
+    for child in root[1]:
+        place(child)
+    return [bundle for bundle in bundles if bundle]
+
+
+def _bundle_fingerprint(entries, budget, total):
+    # Число бандлов входит в отпечаток: оно записано в шапке ("N/total")
+    h = hashlib.sha1(f"budget:{budget}\ntotal:{total}\n".encode("utf-8"))
+    for entry in entries:
+        h.update(f"{entry['path']}\0{entry['module']}\0{entry['size']}\0{entry['mtime']}\0"
+                 f"{entry['tokens']}\0{entry.get('reference')}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _read_text(file_abs):
+    with open(file_abs, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def write_bundles(out_dir, project_name, files, budget, timestamp, read=_read_text):
+    """
+    Пишет bundles/bundle_NNN.txt и manifest.json.
+    files - список словарей {module, path, abs, tokens, size, mtime, reference} в порядке
+    экспорта; reference - текст вместо содержимого файла (копия, записанная ссылкой на оригинал).
+    read(abs) - текст файла так, как он записан в code/ (сборщик передает свой
+    read_file: сводка вместо бинарного/минифицированного файла, кодировка, BOM),
+    чтобы бандл совпадал с code/<module>.txt и токенами манифеста.
+    Бандл, состав и файлы которого не менялись с прошлой сборки (по манифесту),
+    не перезаписывается. Возвращает манифест.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    old = {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            old = {b["name"]: b.get("fingerprint") for b in json.load(f).get("bundles", [])}
+    except (OSError, ValueError):
+        pass
+
+    packed = pack_files([(f["module"], f["path"], f["tokens"]) for f in files], budget)
+    total = len(packed)
+    manifest = {"project": project_name, "budget": budget, "bundles": []}
+
+    for n, indexes in enumerate(packed, 1):
+        entries = [files[i] for i in indexes]
+        name = f"bundle_{n:03d}.txt"
+        tokens = sum(e["tokens"] for e in entries)
+        fingerprint = _bundle_fingerprint(entries, budget, total)
+        modules = list(dict.fromkeys(e["module"] for e in entries))
+        manifest["bundles"].append({
+            "name": name,
+            "tokens": tokens,
+            "oversize": tokens + BUNDLE_HEADER_TOKENS + FILE_HEADER_TOKENS * len(entries) > budget,
+            "modules": modules,
+            "files": [{"path": e["path"], "module": e["module"], "tokens": e["tokens"]} for e in entries],
+            "fingerprint": fingerprint,
+        })
+
+        path = os.path.join(out_dir, name)
+        if old.get(name) == fingerprint and os.path.exists(path):
+            continue
+        with open(path + ".part", "w", encoding="utf-8") as out:
+            out.write(f"# BUNDLE: {n}/{total}\n# PROJECT: {project_name}\n# DATE: {timestamp}\n")
+            out.write(f"# TOTAL TOKENS: {tokens} (budget {budget})\n# MODULES: {', '.join(modules)}\n")
+            for e in entries:
+                out.write(f"\n{'='*40}\nFILE: {e['path']}\nMODULE: {e['module']}\nTOKENS: {e['tokens']}\n{'='*40}\n")
+                if e.get("reference"):
+                    out.write(e["reference"])
+                    continue
+                try:
+                    out.write(read(e["abs"]))
+                except OSError as err:
+                    out.write(f"# ERROR: {err}\n")
+        os.replace(path + ".part", path)
+
+    # Лишние бандлы от прошлой сборки (проект уменьшился или бюджет вырос)
+    names = {b["name"] for b in manifest["bundles"]}
+    for entry in os.listdir(out_dir):
+        if _BUNDLE_FILE.match(entry) and entry not in names:
+            os.remove(os.path.join(out_dir, entry))
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
@@ -5,6 +5,8 @@ from appdirs import user_data_dir
 class ProjectManager:
     APP_NAME = "CodeBaseCollector"
     AUTHOR = "User"
+    DEFAULT_EXTENSIONS = [".py", ".md", ".txt"]
+    DEFAULT_IGNORE_PATTERNS = ["venv", ".git", "__pycache__", "node_modules", "dist", ".idea", ".vscode"]
     
     @staticmethod
     def _get_config_dir():
@@ -20,6 +22,11 @@ class ProjectManager:
     def _get_global_settings_file():
         return os.path.join(ProjectManager._get_config_dir(), "settings.json")
 
+    @staticmethod
+    def get_cache_file(name):
+        # Кэш анализа для инкрементальной сборки (см. updater.py)
+        return os.path.join(ProjectManager._get_config_dir(), "cache", f"{name}.json")
+
     # --- Global Settings ---
     @staticmethod
     def load_global_settings():
@@ -57,10 +64,10 @@ class ProjectManager:
         if ignore_patterns is None:
             # Если проект уже был, сохраняем старые игноры, иначе берем дефолт
             ignore_patterns = projects.get(name, {}).get("ignore_patterns", 
-                ["venv", ".git", "__pycache__", "node_modules", "dist", ".idea", ".vscode"])
+                list(ProjectManager.DEFAULT_IGNORE_PATTERNS))
         
         if extensions is None:
-             extensions = projects.get(name, {}).get("extensions", [".py", ".md", ".txt"])
+             extensions = projects.get(name, {}).get("extensions", list(ProjectManager.DEFAULT_EXTENSIONS))
 
         projects[name] = {
             "path": path,
@@ -0,0 +1,173 @@
+import json
+import os
+import re
+from collections import deque
+from datetime import datetime
+
+from .graph import GRAPH_JSON_NAME
+from .packer import FILE_HEADER_TOKENS
+from .symbol_index import SYMBOLS_NAME
+from .tokenizer import count_tokens
+
+SLICES_DIR = "slices"
+
+# Разметка экспорта (см. ModuleWriter): заголовок файла в code/<module>.txt
+# и начало скелета файла в signatures/<module>_API.txt
+_CODE_HEADER = re.compile(r"\n={40}\nFILE: (.+)\nTOKENS: (\d+)\n={40}\n")
+_SKELETON_HEADER = re.compile(r"^# SKELETON: (.+?)(?: - same as .+)?$", re.MULTILINE)
+_DUPLICATE = re.compile(r"^# DUPLICATE OF: (.+) \(same content")
+
+
+class _ExportReader:
+    """Ленивое чтение кода и скелетов отдельных файлов из экспорта проекта."""
+
+    def __init__(self, export_dir, file_modules):
+        self.export_dir = export_dir
+        self.file_modules = file_modules
+        self._code = {}
+        self._skel = {}
+
+    def _load(self, module):
+        if module in self._code:
+            return
+        code, skel = {}, {}
+        try:
+            with open(os.path.join(self.export_dir, "code", f"{module}.txt"), "r", encoding="utf-8") as f:
+                text = f.read()
+            headers = list(_CODE_HEADER.finditer(text))
+            for i, m in enumerate(headers):
+                end = headers[i + 1].start() - 1 if i + 1 < len(headers) else len(text)
+                code[m.group(1)] = (text[m.end():end], int(m.group(2)))
+        except OSError:
+            pass
+        try:
+            with open(os.path.join(self.export_dir, "signatures", f"{module}_API.txt"), "r", encoding="utf-8") as f:
+                text = f.read()
+            headers = list(_SKELETON_HEADER.finditer(text))
+            for i, m in enumerate(headers):
+                end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+                skel[m.group(1)] = text[m.start():end].rstrip("\n") + "\n"
+        except OSError:
+            pass
+        self._code[module], self._skel[module] = code, skel
+
+    def code(self, rel_file):
+        """(текст, токены) файла; копия, записанная ссылкой, читается у оригинала."""
+        module = self.file_modules.get(rel_file)
+        if module is None:
+            return None
+        self._load(module)
+        entry = self._code[module].get(rel_file)
+        if entry is not None:
+            m = _DUPLICATE.match(entry[0])
+            if m and m.group(1) != rel_file:
+                return self.code(m.group(1))
+        return entry
+
+    def skeleton(self, rel_file):
+        module = self.file_modules.get(rel_file)
+        if module is None:
+            return None
+        self._load(module)
+        return self._skel[module].get(rel_file)
+
+
+def resolve_entry(export_dir, entry, file_modules):
+    """
+    Точка входа среза: путь файла или символ из symbols.json - полное имя
+    (pkg.core.Runner.run) или его хвост (Runner.run), если он однозначен.
+    Возвращает (файл, символ или None).
+    """
+    entry = entry.replace("\\", "/")
+    if entry in file_modules:
+        return entry, None
+    try:
+        with open(os.path.join(export_dir, SYMBOLS_NAME), "r", encoding="utf-8") as f:
+            symbols = json.load(f)["symbols"]
+    except (OSError, ValueError, KeyError):
+        symbols = {}
+    if entry in symbols:
+        return symbols[entry]["file"], symbols[entry]
+    matches = sorted(key for key in symbols if key.endswith("." + entry) or key.endswith(":" + entry))
+    if len(matches) == 1:
+        return symbols[matches[0]]["file"], symbols[matches[0]]
+    if matches:
+        raise ValueError(f"Ambiguous entry '{entry}': {', '.join(matches[:5])}"
+                         + (f" and {len(matches) - 5} more" if len(matches) > 5 else ""))
+    raise ValueError(f"Entry '{entry}' is neither an exported file nor a known symbol")
+
+
+def make_slice(export_dir, entry, budget=100_000, full_depth=1, max_depth=None, output=None):
+    """
+    Срез контекста от точки входа по графу импортов (dependencies.json):
+    обход в ширину, файлы на расстоянии до full_depth идут целиком, дальше -
+    только скелеты из signatures/. Файл, который целиком не влезает в бюджет,
+    заменяется скелетом; не влезает и скелет - пропускается. Точка входа -
+    файл целиком или, для символа, только его определение.
+    Читаются только модули посещенных файлов, поэтому срез строится быстро.
+    Пишет один файл slices/<entry>.txt (или output). Возвращает отчет.
+    """
+    try:
+        with open(os.path.join(export_dir, GRAPH_JSON_NAME), "r", encoding="utf-8") as f:
+            graph = json.load(f)
+    except OSError:
+        raise FileNotFoundError(f"{GRAPH_JSON_NAME} not found in {export_dir}: collect the project first")
+    adjacency = graph["files"]
+    file_modules = graph["file_modules"]
+    reader = _ExportReader(export_dir, file_modules)
+    entry_file, symbol = resolve_entry(export_dir, entry, file_modules)
+
+    parts = []
+    report = []
+    skipped = []
+    used = 0
+    seen = {entry_file}
+    queue = deque([(entry_file, 0)])
+    while queue:
+        rel_file, depth = queue.popleft()
+        choices = []
+        code = reader.code(rel_file)
+        if depth == 0 and symbol is not None and code is not None:
+            start, end = symbol["lines"]
+            text = "\n".join(code[0].split("\n")[start - 1:end]) + "\n"
+            choices.append(("definition", text, count_tokens(text)))
+        elif depth <= full_depth and code is not None:
+            choices.append(("full", code[0], code[1]))
+        skel = reader.skeleton(rel_file)
+        if skel is not None:
+            choices.append(("signatures", skel, count_tokens(skel)))
+
+        for mode, text, tokens in choices:
+            if used + tokens + FILE_HEADER_TOKENS <= budget:
+                used += tokens + FILE_HEADER_TOKENS
+                parts.append(f"\n{'='*40}\nFILE: {rel_file}\nMODE: {mode}\nTOKENS: {tokens}\n{'='*40}\n{text}")
+                report.append({"path": rel_file, "mode": mode, "depth": depth, "tokens": tokens})
+                break
+        else:
+            if choices:
+                skipped.append(rel_file)
+
+        if max_depth is None or depth < max_depth:
+            for target in adjacency.get(rel_file, []):
+                if target not in seen:
+                    seen.add(target)
+                    queue.append((target, depth + 1))
+
+    title = entry if symbol is None else f"{entry} ({symbol['kind']} in {entry_file}:{symbol['lines'][0]})"
+    header = [f"# SLICE: {title}", f"# PROJECT: {graph['project']}",
+              f"# DATE: {datetime.now().strftime('%Y-%m-%d')}",
+              f"# TOTAL TOKENS: {used} (budget {budget})",
+              f"# FILES: {len(report)}, skipped over budget: {len(skipped)}"]
+    header.extend(f"#   [{item['mode']}] {item['path']} (depth {item['depth']}, {item['tokens']} tokens)"
+                  for item in report)
+
+    if output is None:
+        safe = re.sub(r"[^\w.-]+", "_", entry).strip("_") or "slice"
+        output = os.path.join(export_dir, SLICES_DIR, f"{safe}.txt")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output + ".part", "w", encoding="utf-8") as f:
+        f.write("\n".join(header) + "\n")
+        f.writelines(parts)
+    os.replace(output + ".part", output)
+    return {"path": output, "entry": entry_file, "symbol": symbol is not None, "tokens": used,
+            "budget": budget, "files": report, "skipped": skipped}
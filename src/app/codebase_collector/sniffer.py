@@ -0,0 +1,125 @@
+import codecs
+import re
+
+# Сколько байт читается для определения типа файла
+HEAD_SIZE = 8192
+
+# Строки длиннее - признак минифицированного файла
+MINIFIED_LINE = 1000
+MINIFIED_AVG_LINE = 300
+
+# Маркеры сгенерированного кода - только устоявшиеся заголовки генераторов и
+# только в комментарии в начале файла (до первой строки кода; докстринги и
+# код не смотрятся): Go "// Code generated ... DO NOT EDIT.", @generated,
+# "This file is (auto)generated", "Generated by <tool>. Do not edit"
+GENERATED_GO = re.compile(r"^// Code generated .* DO NOT EDIT\.$")
+GENERATED_MARKER = re.compile(r"@generated\b"
+                              r"|\b(?:this|the) (?:file|code) (?:is|was|has been) (?:auto-?|automatically )?generated\b"
+                              r"|\b(?:auto-?)?generated (?:by|from)\b.*\bdo not (?:edit|modify)\b", re.IGNORECASE)
+GENERATED_HEAD_LINES = 5
+_COMMENT_LINE = re.compile(r"\s*(?:#|//|/\*|\*|<!--|--|;)")
+GENERATED_NAMES = {"package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "cargo.lock",
+                   "composer.lock", "pipfile.lock", "go.sum"}
+MINIFIED_SUFFIXES = (".min.js", ".min.css", ".min.mjs", ".map")
+
+# Доля управляющих символов (кроме \t \n \r \f), после которой текст считается бинарным
+BINARY_CONTROL_RATIO = 0.1
+_CONTROL = re.compile(r"[\x00-\x08\x0b\x0e-\x1f\x7f]")
+
+# Слово для выбора между cp1251 и latin-1: латиница и байты букв обеих кодировок
+_WORD = re.compile(rb"[A-Za-z\xc0-\xff\xa8\xb8]+")
+
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def detect_encoding(head, complete):
+    """
+    Кодировка по первым байтам: BOM, иначе UTF-8 (если декодируется без ошибок),
+    иначе cp1251 для кириллицы и latin-1 для остального.
+    complete - head содержит файл целиком (иначе последний символ мог обрезаться).
+    """
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    # Байты 0xC0-0xFF в cp1251 - всегда кириллица, так что отличаем по словам:
+    # русское слово целиком из не-ASCII букв, а буквы с диакритикой latin-1
+    # стоят внутри латинских слов (café, Größe)
+    cyrillic = mixed = 0
+    for word in _WORD.findall(head):
+        high = sum(1 for byte in word if byte > 127)
+        if high == len(word):
+            cyrillic += high
+        else:
+            mixed += high
+    return "cp1251" if cyrillic and cyrillic >= mixed * 2 else "latin-1"
+
+
+def name_kind(name):
+    """Тип файла, понятный по одному имени: lock-файлы и *.min.js."""
+    lower = name.lower()
+    if lower in GENERATED_NAMES:
+        return "generated"
+    if lower.endswith(MINIFIED_SUFFIXES):
+        return "minified"
+    return None
+
+
+def sniff(name, head, size):
+    """
+    Быстрая проверка файла по имени и первым HEAD_SIZE байтам, до полного чтения.
+    Возвращает (kind, encoding): kind - None (обычный текст), "binary",
+    "minified" или "generated".
+    """
+    encoding = detect_encoding(head, size <= len(head))
+    if encoding != "utf-16" and b"\0" in head:
+        return "binary", None
+    kind = name_kind(name)
+    if kind is not None:
+        return kind, encoding
+
+    text = head.decode(encoding, errors="ignore")
+    if not text:
+        return None, encoding
+    # Без NUL, но "текст" из управляющих символов (utf-16 BOM у мусора, latin-1)
+    if len(_CONTROL.findall(text)) > len(text) * BINARY_CONTROL_RATIO:
+        return "binary", None
+    lines = text.split("\n")
+    if len(lines) > 1 and size > len(head):
+        lines = lines[:-1]  # последняя строка обрезана
+    longest = max(len(line) for line in lines)
+    if longest > MINIFIED_LINE and len(text) / len(lines) > MINIFIED_AVG_LINE:
+        return "minified", encoding
+    if is_generated(lines[:GENERATED_HEAD_LINES]):
+        return "generated", encoding
+    return None, encoding
+
+
+def is_generated(lines):
+    """Заголовок генератора в комментарии, которым начинается файл (пустые строки пропускаются)."""
+    for line in lines:
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if not _COMMENT_LINE.match(line):
+            return False
+        if GENERATED_GO.match(line) or GENERATED_MARKER.search(line):
+            return True
+    return False
+
+
+def summarize(kind, name, head, size, encoding):
+    """Короткая замена содержимого файла, который не стоит экспортировать целиком."""
+    header = f"# [{kind.upper()} FILE SKIPPED: {size} bytes"
+    if kind == "binary":
+        return header + "]\n"
+    text = head.decode(encoding, errors="ignore")
+    if kind == "minified":
+        preview = text[:200]
+    else:
+        preview = "\n".join(text.split("\n")[:10])[:500]
+    return f"{header}, preview:]\n{preview}\n"
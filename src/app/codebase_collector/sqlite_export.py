@@ -0,0 +1,154 @@
+import os
+import sqlite3
+from contextlib import closing
+
+DATABASE_NAME = "codebase.sqlite"
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    module TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    hash TEXT,
+    size INTEGER,
+    mtime INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_module ON files(module);
+CREATE TABLE IF NOT EXISTS symbols (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    qualname TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER,
+    end_line INTEGER,
+    signature TEXT,
+    tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols(qualname);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols(file_id);
+CREATE TABLE IF NOT EXISTS edges (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (source, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_target ON edges(target);
+CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(path UNINDEXED, body, tokenize='unicode61');
+"""
+
+
+class SqliteExport:
+    """
+    База знаний в SQLite: files (путь, модуль, токены, хэш), symbols (определения
+    из AST-прохода), edges (граф импортов файл -> файл) и полнотекстовый индекс
+    content (FTS5, rowid = files.id).
+    Обновляется на месте: строки файла переписываются, только если изменились
+    хэш, модуль или токены; ребра - если изменился набор целей; файлы, которых
+    больше нет в проекте, удаляются в finish(). Вся сборка - одна транзакция,
+    прерванная сборка оставляет базу от прошлого запуска.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Транзакцией управляем сами: BEGIN здесь, COMMIT в finish()
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # Старая схема: проще собрать базу заново
+            self.conn.close()
+            os.remove(path)
+            self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("BEGIN")
+
+        self.files = {path: (file_id, digest, module, tokens) for file_id, path, digest, module, tokens
+                      in self.conn.execute("SELECT id, path, hash, module, tokens FROM files")}
+        self.edges = {}
+        for source, target in self.conn.execute("SELECT source, target FROM edges"):
+            self.edges.setdefault(source, set()).add(target)
+        self._seen = set()
+        self.changed = 0
+
+    def add_file(self, rel_file, module, tokens, digest, size, mtime, symbols, load_content):
+        """
+        Строка файла, его определения и текст для поиска.
+        load_content() вызывается, только если файл новый или изменился.
+        """
+        self._seen.add(rel_file)
+        old = self.files.get(rel_file)
+        if old is not None and digest is not None and old[1:] == (digest, module, tokens):
+            return
+        content = load_content()
+        cur = self.conn.cursor()
+        if old is None:
+            cur.execute("INSERT INTO files (path, module, tokens, hash, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                        (rel_file, module, tokens, digest, size, mtime))
+            file_id = cur.lastrowid
+        else:
+            file_id = old[0]
+            cur.execute("UPDATE files SET module = ?, tokens = ?, hash = ?, size = ?, mtime = ? WHERE id = ?",
+                        (module, tokens, digest, size, mtime, file_id))
+            cur.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+            cur.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+        cur.executemany("INSERT INTO symbols (file_id, qualname, name, kind, line, end_line, signature, tokens) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(file_id, qualname, qualname.rsplit(".", 1)[-1], kind, line, end_line, signature, sym_tokens)
+                         for qualname, kind, line, end_line, signature, sym_tokens in symbols])
+        cur.execute("INSERT INTO content (rowid, path, body) VALUES (?, ?, ?)", (file_id, rel_file, content))
+        self.files[rel_file] = (file_id, digest, module, tokens)
+        self.changed += 1
+
+    def set_edges(self, rel_file, targets):
+        # Цели импортов зависят и от других файлов (появился модуль - импорт разрешился),
+        # поэтому сравниваются при каждой сборке, а не только при смене хэша файла
+        targets = set(targets)
+        if self.edges.get(rel_file, set()) == targets:
+            return
+        self.conn.execute("DELETE FROM edges WHERE source = ?", (rel_file,))
+        self.conn.executemany("INSERT INTO edges (source, target) VALUES (?, ?)",
+                              [(rel_file, target) for target in sorted(targets)])
+        self.edges[rel_file] = targets
+
+    def finish(self, project_name, date):
+        """Удаляет исчезнувшие файлы, фиксирует транзакцию и закрывает базу."""
+        cur = self.conn.cursor()
+        for rel_file in [p for p in self.files if p not in self._seen]:
+            file_id = self.files.pop(rel_file)[0]
+            cur.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+            cur.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+            cur.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            self.changed += 1
+        for rel_file in [p for p in self.edges if p not in self._seen]:
+            cur.execute("DELETE FROM edges WHERE source = ?", (rel_file,))
+            del self.edges[rel_file]
+        cur.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                        [("project", project_name), ("date", date)])
+        self.conn.commit()
+        self.conn.close()
+
+    def abort(self):
+        self.conn.rollback()
+        self.conn.close()
+
+
+def search(db_path, query, limit=20):
+    """Полнотекстовый поиск: [(path, фрагмент)] по релевантности (синтаксис запроса - FTS5)."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        return conn.execute("SELECT path, snippet(content, 1, '[', ']', '...', 12) FROM content "
+                            "WHERE content MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+
+
+def find_symbol(db_path, name):
+    """
+    Где определено имя: [(qualname, kind, path, line, end_line, signature)];
+    name - короткое или полное имя.
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        return conn.execute("SELECT s.qualname, s.kind, f.path, s.line, s.end_line, s.signature FROM symbols s "
+                            "JOIN files f ON f.id = s.file_id WHERE s.name = ? OR s.qualname = ? "
+                            "ORDER BY f.path, s.line", (name, name)).fetchall()
@@ -0,0 +1,111 @@
+import heapq
+import json
+import os
+import pstats
+
+STATS_NAME = "stats.json"
+PROFILE_NAME = "profile.pstats"
+MAX_ERRORS = 1000
+
+
+class CollectStats:
+    """
+    Статистика одной сборки: длительность этапов, стоимость каждого файла
+    (байты, токены, чтение / токены / разбор / запись в мс) и ошибки.
+    Пишется в stats.json рядом с architecture.json.
+    Время чтения и разбора при workers > 1 - процессорное время воркеров,
+    а длительность этапов - по часам основного процесса.
+    """
+
+    def __init__(self, top=20):
+        self.top = top
+        self.files = []  # (total_ms, path, module, bytes, tokens, read, tokenize, parse, write, cached)
+        self.errors = []
+        self.error_kinds = {}  # kind -> число ошибок: scan (обход), read (чтение), parse (разбор)
+        self.error_count = 0
+        self.skipped = []  # файлы, отсеянные sniffer-ом: бинарные, минифицированные, сгенерированные
+        self.cached_files = 0
+        self.skipped_modules = 0
+        # Копии файлов (одинаковое содержимое): анализ взят у оригинала
+        self.duplicate_files = 0
+        self.duplicate_tokens = 0
+        self.tokens_saved = 0
+
+    def add_file(self, path, module, size, tokens, cost=None, write_ms=0.0, cached=False):
+        # cost - [read_ms, tokenize_ms, parse_ms] из load_files, None - файл не читался
+        read_ms, tokenize_ms, parse_ms = cost or (0.0, 0.0, 0.0)
+        if cached:
+            self.cached_files += 1
+        total = read_ms + tokenize_ms + parse_ms + write_ms
+        self.files.append((total, path, module, size, tokens, read_ms, tokenize_ms, parse_ms, write_ms, cached))
+
+    def add_skipped(self, path, kind):
+        self.skipped.append((path, kind))
+
+    def add_duplicate(self, tokens, saved):
+        # saved - на сколько токенов меньше стал экспорт (копия записана ссылкой)
+        self.duplicate_files += 1
+        self.duplicate_tokens += tokens
+        self.tokens_saved += saved
+
+    def dedup(self):
+        return {"duplicate_files": self.duplicate_files, "duplicate_tokens": self.duplicate_tokens,
+                "tokens_saved": self.tokens_saved}
+
+    def add_error(self, path, message, kind="read"):
+        self.error_count += 1
+        self.error_kinds[kind] = self.error_kinds.get(kind, 0) + 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"file": path, "kind": kind, "message": message})
+
+    def to_dict(self, timings, **meta):
+        totals = {"files": len(self.files), "bytes": 0, "tokens": 0,
+                  "read_ms": 0.0, "tokenize_ms": 0.0, "parse_ms": 0.0, "write_ms": 0.0}
+        for _, _, _, size, tokens, read_ms, tokenize_ms, parse_ms, write_ms, _ in self.files:
+            totals["bytes"] += size
+            totals["tokens"] += tokens
+            totals["read_ms"] += read_ms
+            totals["tokenize_ms"] += tokenize_ms
+            totals["parse_ms"] += parse_ms
+            totals["write_ms"] += write_ms
+        for key in ("read_ms", "tokenize_ms", "parse_ms", "write_ms"):
+            totals[key] = round(totals[key], 2)
+        totals["cached_files"] = self.cached_files
+        totals["skipped_modules"] = self.skipped_modules
+        sniffed = {}
+        for _, kind in self.skipped:
+            sniffed[kind] = sniffed.get(kind, 0) + 1
+        totals["sniffed"] = sniffed
+        totals["dedup"] = self.dedup()
+
+        slowest = []
+        for total, path, module, size, tokens, read_ms, tokenize_ms, parse_ms, write_ms, cached in \
+                heapq.nlargest(self.top, self.files, key=lambda f: f[0]):
+            slowest.append({"path": path, "module": module, "bytes": size, "tokens": tokens,
+                            "total_ms": round(total, 3), "read_ms": round(read_ms, 3),
+                            "tokenize_ms": round(tokenize_ms, 3), "parse_ms": round(parse_ms, 3),
+                            "write_ms": round(write_ms, 3), "cached": cached})
+        return {**meta, "phases": timings, "totals": totals, "slowest_files": slowest,
+                "sniffed_files": [{"path": path, "kind": kind} for path, kind in self.skipped[:MAX_ERRORS]],
+                "errors": {"count": self.error_count, "kinds": self.error_kinds, "items": self.errors}}
+
+    def write(self, out_dir, timings, **meta):
+        with open(os.path.join(out_dir, STATS_NAME), "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(timings, **meta), f, indent=2, ensure_ascii=False)
+
+
+def dump_profile(profiler, out_dir, top=30):
+    """
+    Сохраняет cProfile в profile.pstats (смотреть: python -m pstats, snakeviz)
+    и возвращает top функций по собственному времени для stats.json.
+    """
+    profiler.disable()
+    path = os.path.join(out_dir, PROFILE_NAME)
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({func})", "calls": calls,
+                     "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    rows.sort(key=lambda r: r["tottime"], reverse=True)
+    return {"file": PROFILE_NAME, "top": rows[:top]}
@@ -0,0 +1,56 @@
+import json
+
+SYMBOLS_NAME = "symbols.json"
+
+
+class SymbolIndex:
+    """
+    Индекс определений проекта для точечной выборки: полное имя
+    (модуль.Класс.метод) -> файл, строки, вид, сигнатура и стоимость в токенах,
+    плюс ссылки из импортов (from pkg.core import Runner -> pkg.core.Runner).
+    Копится по ходу сборки, пишется в symbols.json в конце.
+    """
+
+    def __init__(self, module_names):
+        # файл -> точечное имя модуля (ImportIndex.module_names); файлы без имени
+        # получают ключи вида "path/to/file.py:Qual.name"
+        self.module_names = module_names
+        self.symbols = {}
+        self._by_file = {}  # файл -> {qualname: ключ в symbols}
+        self._imports = []  # (файл, строка, файлы-цели, импортируемые имена)
+
+    def add_file(self, rel_file, module, symbols):
+        prefix = self.module_names.get(rel_file)
+        local = self._by_file[rel_file] = {}
+        for qualname, kind, line, end_line, signature, tokens in symbols:
+            key = f"{prefix}.{qualname}" if prefix else f"{rel_file}:{qualname}"
+            local[qualname] = key
+            self.symbols[key] = {"file": rel_file, "module": module, "kind": kind, "lines": [line, end_line],
+                                 "signature": signature, "tokens": tokens, "references": []}
+
+    def add_import(self, rel_file, line, targets, names):
+        if names and targets:
+            self._imports.append((rel_file, line, targets, names))
+
+    def link(self):
+        """
+        Заполняет references символов: [{"file", "line"}] импортов, которые на них
+        ссылаются. Цель импорта может идти в порядке сборки позже импортирующего
+        файла, поэтому связываем один раз, когда собраны все файлы.
+        """
+        for rel_file, line, targets, names in self._imports:
+            for name in names:
+                for target in targets:
+                    key = self._by_file.get(target, {}).get(name)
+                    if key is not None:
+                        self.symbols[key]["references"].append({"file": rel_file, "line": line})
+                        break
+        self._imports = []
+
+    def write(self, path, project_name):
+        self.link()
+        # Без отступов и одной записью (json.dumps в разы быстрее json.dump по кусочкам):
+        # индекс большого проекта - это мегабайты
+        text = json.dumps({"project": project_name, "symbols": self.symbols}, ensure_ascii=False, separators=(",", ":"))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
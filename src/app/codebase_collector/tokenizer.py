@@ -0,0 +1,136 @@
+import os
+import sys
+from collections import defaultdict
+
+ENCODING_NAME = "cl100k_base"  # кодировщик GPT-4 и GPT-3.5
+
+# Эвристика на случай, если tiktoken недоступен (~4 символа на токен)
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Потоков кодировщика на пачку в одном процессе (в воркерах пула - 1)
+TOKEN_THREADS = 8
+
+_encoder = None
+_encoder_error = None
+
+
+def get_encoder():
+    """
+    Общий экземпляр кодировщика на процесс. Загружается один раз;
+    если tiktoken недоступен - возвращает None (см. get_encoder_error).
+    """
+    global _encoder, _encoder_error
+    if _encoder is None and _encoder_error is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            _encoder_error = str(e)
+            print(f"tiktoken unavailable, using len/{DEFAULT_CHARS_PER_TOKEN:g} heuristic: {e}", file=sys.stderr)
+    return _encoder
+
+
+def get_encoder_error():
+    get_encoder()
+    return _encoder_error
+
+
+def tokenizer_name():
+    return ENCODING_NAME if get_encoder() is not None else "heuristic"
+
+
+def count_tokens(text):
+    """
+    Точный подсчет токенов (tiktoken). Спецтокены вроде <|endoftext|>
+    в исходниках считаются обычным текстом.
+    """
+    enc = get_encoder()
+    if enc is None:
+        return int(len(text) / DEFAULT_CHARS_PER_TOKEN)
+    return len(enc.encode_ordinary(text))
+
+
+def count_tokens_batch(texts, num_threads=TOKEN_THREADS):
+    """
+    Пакетный подсчет: tiktoken кодирует пачку текстов в потоках без GIL.
+    """
+    enc = get_encoder()
+    if enc is None:
+        return [int(len(t) / DEFAULT_CHARS_PER_TOKEN) for t in texts]
+    if len(texts) < 2:
+        return [len(enc.encode_ordinary(t)) for t in texts]
+    return [len(tokens) for tokens in enc.encode_ordinary_batch(texts, num_threads=num_threads)]
+
+
+class TokenEstimator:
+    """
+    Быстрая оценка без BPE: число символов / коэффициент для расширения файла.
+    Коэффициенты калибруются точным подсчетом на выборке файлов проекта,
+    для каждого расширения сохраняется погрешность (90-й перцентиль
+    относительной ошибки по файлам выборки).
+    """
+
+    def __init__(self, ratios=None):
+        # ext -> {"chars_per_token": float, "error_pct": float, "samples": int}
+        self.ratios = ratios or {}
+
+    @classmethod
+    def calibrate(cls, samples):
+        """
+        samples - список (ext, text). Возвращает откалиброванный TokenEstimator.
+        """
+        if get_encoder() is None:
+            # Калибровать не по чему: эвристика без заявленной погрешности
+            return cls()
+        texts = [text for _, text in samples]
+        exact = count_tokens_batch(texts)
+
+        by_ext = defaultdict(list)
+        for (ext, text), tokens in zip(samples, exact):
+            if text:
+                by_ext[ext].append((len(text), tokens))
+
+        # "*" - общий коэффициент для расширений, не попавших в выборку
+        by_ext["*"] = [item for items in list(by_ext.values()) for item in items]
+
+        ratios = {}
+        for ext, items in by_ext.items():
+            chars = sum(c for c, _ in items)
+            tokens = sum(t for _, t in items)
+            if not tokens:
+                continue
+            ratio = chars / tokens
+            errors = sorted(abs(c / ratio - t) / max(t, 1) for c, t in items)
+            p90 = errors[min(len(errors) - 1, int(len(errors) * 0.9))]
+            ratios[ext] = {"chars_per_token": round(ratio, 4), "error_pct": round(p90 * 100, 1), "samples": len(items)}
+        return cls(ratios)
+
+    def _ratio(self, ext):
+        return self.ratios.get(ext) or self.ratios.get("*") or {
+            "chars_per_token": DEFAULT_CHARS_PER_TOKEN, "error_pct": None, "samples": 0}
+
+    def estimate(self, text, ext):
+        return int(round(len(text) / self._ratio(ext)["chars_per_token"]))
+
+    def error_pct(self, ext):
+        """Погрешность оценки для расширения, % (None - не калибровалось)."""
+        return self._ratio(ext)["error_pct"]
+
+    def report(self):
+        return {"tokenizer": tokenizer_name(), "ratios": self.ratios}
+
+
+def pick_calibration_sample(paths, per_ext=32):
+    """
+    Детерминированная выборка для калибровки: до per_ext файлов на расширение,
+    равномерно по отсортированному списку путей.
+    """
+    by_ext = defaultdict(list)
+    for path in sorted(paths):
+        by_ext[os.path.splitext(path)[1].lower()].append(path)
+
+    picked = []
+    for ext, items in by_ext.items():
+        step = max(1, len(items) // per_ext)
+        picked.extend(items[::step][:per_ext])
+    return picked
@@ -1,7 +1,124 @@
-def update_project(project_path, output_dir):
+import json
+import os
+
+from .collector import collect_codebase
+from .project_manager import ProjectManager
+
+
+class AnalysisCache:
     """
-    Функция для обновления данных проекта. Можно добавить логику для инкрементальных обновлений.
+    Персистентный кэш анализа файлов для инкрементальной сборки.
+    Ключ - относительный путь + размер + mtime, запасной ключ - хэш содержимого.
+    Значение - то, что дорого считать: токены, структура скелета (и токены
+    его уровней) и список импортов.
     """
-    # Здесь будет логика обновления проекта, например:
-    print(f"Проект {project_path} обновляется в {output_dir}")
-    # Можно добавить функционал для проверки изменений или перезаписи данных
\ No newline at end of file
+    VERSION = 7
+    # Параметры сборки, от которых зависит сам анализ файлов
+    ANALYSIS_KEYS = ("token_mode", "sniff")
+    # Параметры вида экспорта, которые не меняют состав модулей: при их смене
+    # модули не пересобираются, а только перерисовываются из кэша (rerender)
+    RENDER_KEYS = ("skeleton_level",)
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.modules = {}
+        self.config = None
+        self._seen = set()
+        self._new_modules = {}
+        self.rerender = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                if raw.get("version") == self.VERSION:
+                    self.files = raw.get("files", {})
+                    self.modules = raw.get("modules", {})
+                    self.config = raw.get("config")
+            except Exception as e:
+                # Битый кэш не должен ломать сборку - просто начинаем с нуля
+                print(f"Cache {path} ignored: {e}")
+
+    def begin(self, config):
+        """
+        Начало сборки. Сменились фильтры расширений или папка экспорта - состав
+        модулей другой (или их файлов там нет), но анализ файлов валиден. Сменился режим подсчета токенов или проверки
+        файлов (sniff) - устарел и анализ. Сменился уровень скелетов - модули
+        целы, но их signatures/ надо перерисовать (rerender).
+        """
+        self._seen = set()
+        self._new_modules = {}
+        old = self.config or {}
+        layout = lambda c: {k: v for k, v in c.items() if k not in self.RENDER_KEYS}
+        if layout(config) != layout(old):
+            self.modules = {}
+        self.rerender = any(config.get(key) != old.get(key) for key in self.RENDER_KEYS)
+        if any(config.get(key) != old.get(key) for key in self.ANALYSIS_KEYS):
+            self.files = {}
+        self.config = config
+
+    def lookup(self, rel_file, size, mtime):
+        entry = self.files.get(rel_file)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            self._seen.add(rel_file)
+            return entry["analysis"]
+        return None
+
+    def lookup_hash(self, rel_file, digest):
+        entry = self.files.get(rel_file)
+        if entry and entry["hash"] == digest:
+            return entry["analysis"]
+        return None
+
+    def lookup_digest(self, rel_file, size, mtime):
+        # Хэш содержимого без чтения файла, если он не менялся
+        entry = self.files.get(rel_file)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return entry["hash"]
+        return None
+
+    def known_hash(self, rel_file):
+        entry = self.files.get(rel_file)
+        return entry["hash"] if entry else None
+
+    def store(self, rel_file, size, mtime, digest, analysis):
+        self.files[rel_file] = {"size": size, "mtime": mtime, "hash": digest, "analysis": analysis}
+        self._seen.add(rel_file)
+
+    def module_unchanged(self, mod_name, fingerprint):
+        return self.modules.get(mod_name) == fingerprint
+
+    def set_module(self, mod_name, fingerprint):
+        self._new_modules[mod_name] = fingerprint
+
+    def finish(self):
+        """
+        Конец сборки: удаленные из проекта файлы и модули выбрасываются,
+        отпечатки модулей становятся текущими. Диск не трогается - см. save().
+        """
+        self.files = {k: v for k, v in self.files.items() if k in self._seen}
+        self.modules = self._new_modules
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        # Одной записью: json.dump пишет по кусочку на каждый токен JSON, а кэш
+        # большого проекта - мегабайты (структуры скелетов всех файлов)
+        text = json.dumps({"version": self.VERSION, "config": self.config,
+                           "modules": self.modules, "files": self.files}, separators=(",", ":"))
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+
+
+def update_project(project_name, base_export_dir, **kwargs):
+    """
+    Инкрементальное обновление базы знаний: пересчитываются только
+    изменившиеся файлы, перезаписываются только затронутые модули.
+    Остальные параметры (workers, chunk_size, token_mode) - как у collect_codebase.
+    """
+    cache = AnalysisCache(ProjectManager.get_cache_file(project_name))
+    result = collect_codebase(project_name, base_export_dir, cache=cache, **kwargs)
+    cache.save()
+    return result
@@ -0,0 +1,337 @@
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .collector import collect_codebase, load_gitignore, MAX_FILE_SIZE
+from .module_discovery import ScanCache, scan_project
+from .project_manager import ProjectManager
+from .updater import AnalysisCache
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len + имя
+
+
+class InotifySource:
+    """
+    Источник изменений на inotify (только Linux, без внешних зависимостей).
+    Следит за всеми папками проекта, кроме игнорируемых (skip_dir), и сам
+    подписывается на новые папки. wait() возвращает множество измененных
+    относительных путей; у папок путь заканчивается на "/".
+    """
+
+    def __init__(self, root_path, skip_dir):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._root_path = root_path
+        self._skip_dir = skip_dir
+        self._watches = {}  # wd -> (abs_dir, rel_dir)
+        self._add_tree(root_path, "")
+
+    def _add_tree(self, dir_abs, rel_dir):
+        stack = [(dir_abs, rel_dir)]
+        while stack:
+            dir_abs, rel_dir = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_abs), WATCH_MASK)
+            if wd < 0:
+                # ENOSPC - кончился fs.inotify.max_user_watches: дальше не подписываемся
+                err = ctypes.get_errno()
+                raise OSError(err, f"inotify_add_watch {dir_abs}: {os.strerror(err)}")
+            self._watches[wd] = (dir_abs, rel_dir)
+            try:
+                with os.scandir(dir_abs) as it:
+                    for entry in it:
+                        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        if entry.is_dir(follow_symlinks=False) and not self._skip_dir(rel, entry.name):
+                            stack.append((entry.path, rel))
+            except OSError:
+                continue
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changes = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+                offset += _EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Очередь переполнена - что именно поменялось, неизвестно
+                    changes.add("/")
+                    continue
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                watch = self._watches.get(wd)
+                if watch is None or not name:
+                    continue
+                dir_abs, rel_dir = watch
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                if mask & IN_ISDIR:
+                    if self._skip_dir(rel, name):
+                        continue
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self._add_tree(os.path.join(dir_abs, name), rel)
+                        except OSError as e:
+                            print(f"Watch {rel}: {e}")
+                    changes.add(rel + "/")
+                else:
+                    changes.add(rel)
+        return changes
+
+    def refresh(self):
+        # Правила игнорирования поменялись: подписываемся на папки, которые
+        # стали видимыми (повторная подписка на ту же папку вернет тот же wd)
+        try:
+            self._add_tree(self._root_path, "")
+        except OSError as e:
+            print(f"Watch refresh: {e}")
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingSource:
+    """
+    Запасной источник: раз в interval секунд сравнивает снимок
+    {путь: (размер, mtime)}, который возвращает snapshot().
+    """
+
+    def __init__(self, snapshot, interval=1.0):
+        self._snapshot = snapshot
+        self._interval = interval
+        self._state = snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def wait(self, timeout):
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(timeout, 0))
+            return set()
+        time.sleep(max(delay, 0))
+        self._next_poll = time.monotonic() + self._interval
+
+        state = self._snapshot()
+        old = self._state
+        self._state = state
+        changed = {path for path, sig in state.items() if old.get(path) != sig}
+        changed.update(path for path in old if path not in state)
+        return changed
+
+    def refresh(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ProjectWatcher:
+    """
+    Watch-режим: следит за папкой проекта и держит экспорт свежим.
+    Пачка изменений копится, пока файлы продолжают меняться (debounce,
+    но не дольше max_delay), затем запускается инкрементальная сборка с
+    кэшем в памяти - перезаписываются только затронутые модули и графы.
+    С inotify обход проекта тоже инкрементальный: заново читаются только
+    папки, где были события (ScanCache). События в папках и файлах под
+    .gitignore отбрасываются, на такие папки inotify не подписывается.
+    on_update(result, changes, seconds) вызывается из потока наблюдателя.
+    config - настройки проекта, если он не зарегистрирован в ProjectManager.
+    """
+
+    def __init__(self, project_name, base_export_dir, debounce=0.3, max_delay=1.0,
+                 poll_interval=1.0, use_inotify=True, on_update=None, config=None, **collect_kwargs):
+        self.project_name = project_name
+        self.config = config
+        self.base_export_dir = base_export_dir
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.on_update = on_update
+        self.collect_kwargs = collect_kwargs
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._gitignore = None
+        self._scan_cache = None
+        self._executor = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def run(self):
+        config = self.config or ProjectManager.get_project_config(self.project_name)
+        root_path = config.get("path")
+        target_exts = set(ext.lower() for ext in config.get("extensions", []))
+        ignore_patterns = config.get("ignore_patterns", [])
+
+        # Экспорт внутри проекта не должен будить сам себя
+        export_rel = os.path.relpath(os.path.join(self.base_export_dir, self.project_name), root_path).replace("\\", "/")
+        if export_rel.startswith(".."):
+            export_rel = None
+
+        self._gitignore = load_gitignore(root_path)
+
+        def relevant(rel):
+            if rel == "/":
+                return True
+            if rel.endswith("/"):
+                if export_rel and rel.startswith(export_rel + "/"):
+                    return False
+                return not self._gitignore.ignored(rel[:-1], is_dir=True)
+            if export_rel and rel.startswith(export_rel + "/"):
+                return False
+            name = rel.rsplit("/", 1)[-1]
+            if name == ".gitignore":
+                return True
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in target_exts and not name.lower().startswith("readme"):
+                return False
+            return not self._gitignore.ignored(rel)
+
+        def skip_dir(rel, name):
+            return name.startswith('.') or name in ignore_patterns or rel == export_rel or \
+                self._gitignore.ignored(rel, is_dir=True)
+
+        cache = AnalysisCache(ProjectManager.get_cache_file(self.project_name))
+        source = self._make_source(root_path, target_exts, ignore_patterns, skip_dir)
+        # Опрос и так обходит проект целиком - кэш папок нужен только с inotify
+        self._scan_cache = ScanCache() if self.mode == "inotify" else None
+
+        def wait(timeout):
+            changes = source.wait(timeout)
+            if any(rel == "/" or rel.rsplit("/", 1)[-1] == ".gitignore" for rel in changes):
+                self._gitignore = load_gitignore(root_path)
+                source.refresh()
+            if self._scan_cache is not None:
+                # Все события, в т.ч. по файлам не из экспорта: они тоже в списках папок
+                self._scan_cache.invalidate(changes)
+            return {c for c in changes if relevant(c)}
+
+        workers = self.collect_kwargs.get("workers", 1)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        # Один пул процессов на всю сессию: пересборка пары файлов не ждет
+        # запуска процессов и загрузки кодировщика в каждом из них
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            self._rebuild(cache, None)
+            cache.save()
+            while not self._stop.is_set():
+                changes = wait(0.5)
+                if not changes:
+                    continue
+                first = time.monotonic()
+                quiet_until = first + self.debounce
+                while not self._stop.is_set():
+                    now = time.monotonic()
+                    deadline = min(quiet_until, first + self.max_delay)
+                    if now >= deadline:
+                        break
+                    more = wait(deadline - now)
+                    if more:
+                        changes |= more
+                        quiet_until = time.monotonic() + self.debounce
+                self._rebuild(cache, changes)
+        finally:
+            source.close()
+            cache.save()
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def _make_source(self, root_path, target_exts, ignore_patterns, skip_dir):
+        if self.use_inotify:
+            try:
+                source = InotifySource(root_path, skip_dir)
+                self.mode = "inotify"
+                return source
+            except OSError as e:
+                print(f"inotify unavailable, polling every {self.poll_interval:g}s: {e}")
+
+        def snapshot():
+            scan = scan_project(root_path, target_exts, ignore_patterns, load_gitignore(root_path), MAX_FILE_SIZE)
+            return {rel: (size, mtime) for files in scan.modules_files.values()
+                    for _, _, rel, size, mtime in files}
+
+        self.mode = "polling"
+        return PollingSource(snapshot, self.poll_interval)
+
+    def _rebuild(self, cache, changes):
+        start = time.perf_counter()
+        try:
+            result = collect_codebase(self.project_name, self.base_export_dir, cache=cache,
+                                      config=self.config, scan_cache=self._scan_cache, executor=self._executor,
+                                      **self.collect_kwargs)
+        except Exception as e:
+            print(f"Watch rebuild failed: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        if self.on_update is not None:
+            self.on_update(result, changes, elapsed)
+        else:
+            errors = f", errors: {result['errors']} (see stats.json)" if result["errors"] else ""
+            print(f"[{elapsed:.2f}s] updated: {', '.join(result['updated_modules']) or '-'}{errors}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch-режим: пересборка базы знаний при изменении файлов проекта")
+    parser.add_argument("project", help="имя проекта из ProjectManager")
+    parser.add_argument("--export-dir", help="папка экспорта (по умолчанию - из глобальных настроек)")
+    parser.add_argument("--debounce", type=float, default=0.3)
+    parser.add_argument("--poll", action="store_true", help="не использовать inotify, только опрос")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    export_dir = args.export_dir or ProjectManager.load_global_settings().get("default_export_dir")
+    if not export_dir:
+        parser.error("--export-dir is required (no default_export_dir in global settings)")
+
+    watcher = ProjectWatcher(args.project, export_dir, debounce=args.debounce,
+                             use_inotify=not args.poll, workers=args.workers)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
+import queue
 import threading
+import time
 import subprocess
 import platform
 from datetime import datetime
 
-from app.codebase_collector.collector import collect_codebase
+from app.codebase_collector.code_parser import DEFAULT_SKELETON_LEVEL, SKELETON_LEVELS
+from app.codebase_collector.collector import CollectCancelled
+from app.codebase_collector.slicer import make_slice
+from app.codebase_collector.updater import update_project
+from app.codebase_collector.watcher import ProjectWatcher
 from app.codebase_collector.project_manager import ProjectManager
 from app.ui.extension_dialog import ExtensionDialog
 from app.utils.paths import get_path
@@ -83,7 +89,14 @@ class MainWindow(ctk.CTk):
         self._setup_content_area()
         
         self.current_project_name = None
+        self.watcher = None
+        # Рабочий поток сборки кладет события сюда, окно забирает их по таймеру
+        self.events = queue.Queue()
+        self.cancel_event = None
+        self._progress_start = None
         self.refresh_project_list()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(100, self._drain_events)
 
     def _setup_sidebar(self):
         self.sidebar = ctk.CTkFrame(self, width=250, corner_radius=0)
@@ -111,7 +124,7 @@ class MainWindow(ctk.CTk):
     def _setup_content_area(self):
         self.content = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
         self.content.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
-        self.content.grid_rowconfigure(3, weight=1) # Терминал растягивается
+        self.content.grid_rowconfigure(5, weight=1) # Терминал растягивается
         self.content.grid_columnconfigure(0, weight=1)
 
         # 1. Header (Имя + Путь экспорта)
@@ -144,11 +157,40 @@ class MainWindow(ctk.CTk):
                                         font=("Segoe UI", 14, "bold"), height=40, state="disabled")
         self.btn_update.pack(side="right", padx=20, pady=20)
 
-        # 3. Terminal
-        ctk.CTkLabel(self.content, text="TERMINAL OUTPUT:", font=("Consolas", 12, "bold")).grid(row=3, column=0, sticky="w", pady=(10, 5))
+        self.btn_watch = ctk.CTkButton(self.controls, text="👁 Watch", command=self.toggle_watch, width=90,
+                                       fg_color="#444444", height=40, state="disabled")
+        self.btn_watch.pack(side="right", pady=20)
+
+        self.btn_slice = ctk.CTkButton(self.controls, text="✂ Срез", command=self.run_slice, width=90,
+                                       fg_color="#444444", height=40, state="disabled")
+        self.btn_slice.pack(side="right", padx=(0, 10), pady=20)
+
+        # Уровень скелетов: переключение перерисовывает signatures/ из кэша, без разбора файлов
+        self.opt_skeleton = ctk.CTkOptionMenu(self.controls, values=list(SKELETON_LEVELS), width=120,
+                                              command=self._set_skeleton_level)
+        self.opt_skeleton.set(ProjectManager.load_global_settings().get("skeleton_level", DEFAULT_SKELETON_LEVEL))
+        self.opt_skeleton.pack(side="right", padx=(0, 10), pady=20)
+
+        # 3. Progress (прогресс сборки + отмена)
+        self.progress_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        self.progress_frame.grid(row=3, column=0, sticky="ew", pady=(0, 10))
+
+        self.progress_bar = ctk.CTkProgressBar(self.progress_frame)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", fill="x", expand=True, padx=(0, 10))
+
+        self.lbl_progress = ctk.CTkLabel(self.progress_frame, text="", font=("Consolas", 12), width=280, anchor="w")
+        self.lbl_progress.pack(side="left")
+
+        self.btn_cancel = ctk.CTkButton(self.progress_frame, text="✖ Отмена", command=self.cancel_update, width=90,
+                                        fg_color="#aa3333", hover_color="#772222", state="disabled")
+        self.btn_cancel.pack(side="right", padx=(10, 0))
+
+        # 4. Terminal
+        ctk.CTkLabel(self.content, text="TERMINAL OUTPUT:", font=("Consolas", 12, "bold")).grid(row=4, column=0, sticky="w", pady=(10, 5))
         
         self.log_box = ctk.CTkTextbox(self.content, font=("Consolas", 12), text_color="#00ff00", fg_color="#111111")
-        self.log_box.grid(row=4, column=0, sticky="nsew")
+        self.log_box.grid(row=5, column=0, sticky="nsew")
         self.log_box.configure(state="disabled")
 
     # --- Logic ---
@@ -175,6 +217,7 @@ class MainWindow(ctk.CTk):
             btn.pack(fill="x", pady=2)
 
     def _select_project(self, name):
+        self._stop_watch()
         self.current_project_name = name
         self.lbl_project_name.configure(text=name)
         
@@ -183,6 +226,8 @@ class MainWindow(ctk.CTk):
         self.lbl_filter_info.configure(text=f"Выбрано типов: {len(exts)}")
         
         self.btn_update.configure(state="normal")
+        self.btn_watch.configure(state="normal")
+        self.btn_slice.configure(state="normal")
         self._update_export_label()
         
         # Визуальное выделение (можно доработать, меняя цвета кнопок в цикле)
@@ -204,17 +249,22 @@ class MainWindow(ctk.CTk):
     def delete_project(self):
         if not self.current_project_name: return
         if messagebox.askyesno("Удаление", f"Удалить '{self.current_project_name}' из списка?"):
+            self._stop_watch()
             ProjectManager.delete_project(self.current_project_name)
             self.current_project_name = None
             self.lbl_project_name.configure(text="Выберите проект")
             self.btn_update.configure(state="disabled")
+            self.btn_watch.configure(state="disabled")
+            self.btn_slice.configure(state="disabled")
             self.refresh_project_list()
 
     def open_global_settings(self):
         curr = ProjectManager.load_global_settings().get("default_export_dir", "")
         new_dir = filedialog.askdirectory(initialdir=curr)
         if new_dir:
-            ProjectManager.save_global_settings({"default_export_dir": new_dir})
+            settings = ProjectManager.load_global_settings()
+            settings["default_export_dir"] = new_dir
+            ProjectManager.save_global_settings(settings)
             self.log(f"Global export dir: {new_dir}")
             self._update_export_label()
 
@@ -258,21 +308,188 @@ class MainWindow(ctk.CTk):
             out_dir = os.path.join(temp, self.current_project_name)
 
         self.btn_update.configure(state="disabled", text="РАБОТАЮ...")
-        
-        threading.Thread(target=self._worker, args=(self.current_project_name, os.path.dirname(out_dir)), daemon=True).start()
+        self.btn_watch.configure(state="disabled")
+        self.btn_cancel.configure(state="normal", text="✖ Отмена")
+        self.progress_bar.set(0)
+        self.lbl_progress.configure(text="Поиск файлов...")
+        self._progress_start = None
+        self.cancel_event = threading.Event()
+
+        threading.Thread(target=self._worker, args=(self.current_project_name, os.path.dirname(out_dir), self.cancel_event),
+                         daemon=True).start()
+
+    def run_slice(self):
+        # Срез читает уже собранный экспорт и укладывается в десятки миллисекунд,
+        # поэтому строится прямо в UI-потоке
+        if not self.current_project_name: return
+        out_dir = self._get_export_path()
+        if not out_dir:
+            self.log("Для среза нужна глобальная папка экспорта (⚙ Global).")
+            return
+        entry = ctk.CTkInputDialog(text="Файл (src/pkg/core.py) или символ (Runner.run):", title="Срез контекста").get_input()
+        if not entry: return
+        budget = ProjectManager.load_global_settings().get("slice_budget", 100_000)
+        try:
+            res = make_slice(out_dir, entry.strip(), budget=budget)
+        except (ValueError, FileNotFoundError) as e:
+            self.log(f"Срез: {e}")
+            return
+        full = sum(1 for f in res["files"] if f["mode"] != "signatures")
+        self.log(f"Срез {entry.strip()}: {len(res['files'])} файлов ({full} целиком), "
+                 f"{res['tokens']}/{res['budget']} токенов -> {res['path']}")
+        if res["skipped"]:
+            self.log(f"Не влезли в бюджет: {len(res['skipped'])} файлов")
+        with open(res["path"], "r", encoding="utf-8") as f:
+            self.clipboard_clear()
+            self.clipboard_append(f.read())
+        self.log("Срез скопирован в буфер обмена.")
+
+    def _set_skeleton_level(self, level):
+        settings = ProjectManager.load_global_settings()
+        settings["skeleton_level"] = level
+        ProjectManager.save_global_settings(settings)
+        self.log(f"Уровень скелетов: {level}")
+        # Уже собранный проект сразу пересобираем: модули не менялись, поэтому
+        # файлы не читаются, а только перерисовываются signatures/
+        out_dir = self._get_export_path()
+        if self.current_project_name and self.cancel_event is None and self.watcher is None \
+                and out_dir and os.path.exists(out_dir):
+            self.run_update()
+
+    def cancel_update(self):
+        if self.cancel_event is None: return
+        # Сборка остановится на следующем файле; недописанный модуль будет удален
+        self.cancel_event.set()
+        self.btn_cancel.configure(state="disabled", text="Останавливаю...")
+
+    def toggle_watch(self):
+        if self.watcher is not None:
+            self._stop_watch()
+            return
+        if not self.current_project_name: return
 
-    def _worker(self, name, base_path):
+        out_dir = self._get_export_path()
+        if not out_dir:
+            self.log("Для watch-режима нужна глобальная папка экспорта (⚙ Global).")
+            return
+
+        settings = ProjectManager.load_global_settings()
+        self.watcher = ProjectWatcher(self.current_project_name, os.path.dirname(out_dir),
+                                      on_update=self._on_watch_update,
+                                      workers=settings.get("workers") or os.cpu_count(),
+                                      token_mode=settings.get("token_mode", "exact"),
+                                      bundle_budget=settings.get("bundle_budget"),
+                                      dedup=settings.get("dedup", False), archive=settings.get("archive", False),
+                                      sqlite=settings.get("sqlite", False),
+                                      skeleton_level=settings.get("skeleton_level", DEFAULT_SKELETON_LEVEL))
+        self.watcher.start()
+        self.btn_watch.configure(text="⏹ Stop", fg_color="#aa5500")
+        self.btn_update.configure(state="disabled")
+        self.log(f"Watch: слежу за {self.current_project_name}")
+
+    def _on_watch_update(self, res, changes, seconds):
+        # Вызывается из потока наблюдателя
+        mods = ", ".join(res["updated_modules"]) or "-"
+        what = f"изменений: {len(changes)}" if changes else "начальная сборка"
+        self.after(0, lambda: self.log(f"Watch ({what}, {seconds:.2f}s): обновлены модули: {mods}"))
+
+    def _stop_watch(self):
+        if self.watcher is None: return
+        # Не ждем завершения: поток сам выйдет после текущей пересборки
+        self.watcher.stop(wait=False)
+        self.watcher = None
+        self.btn_watch.configure(text="👁 Watch", fg_color="#444444")
+        if self.current_project_name:
+            self.btn_update.configure(state="normal")
+        self.log("Watch остановлен.")
+
+    def _on_close(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        if self.watcher is not None:
+            self.watcher.stop(wait=True)
+        self.destroy()
+
+    def _worker(self, name, base_path, cancel):
+        # Рабочий поток: виджеты не трогаем, все сообщения - через очередь событий
         try:
-            self.after(0, lambda: self.log("Начинаю сборку..."))
-            res = collect_codebase(name, base_path)
-            self.after(0, lambda: self.log(f"ГОТОВО! Файлов: {res['count']}"))
-            self.after(0, lambda: self.log(f"Путь: {res['path']}"))
-            self.after(0, lambda: messagebox.showinfo("Success", "Сборка завершена!"))
+            self.events.put({"event": "log", "message": "Начинаю сборку..."})
+            settings = ProjectManager.load_global_settings()
+            workers = settings.get("workers") or os.cpu_count()
+            res = update_project(name, base_path, workers=workers, token_mode=settings.get("token_mode", "exact"),
+                                 bundle_budget=settings.get("bundle_budget"), dedup=settings.get("dedup", False),
+                                 archive=settings.get("archive", False), sqlite=settings.get("sqlite", False),
+                                 skeleton_level=settings.get("skeleton_level", DEFAULT_SKELETON_LEVEL),
+                                 progress=self.events.put, cancel=cancel)
+            self.events.put({"event": "finished", "result": res, "budget": settings.get("bundle_budget")})
+        except CollectCancelled:
+            self.events.put({"event": "cancelled"})
         except Exception as e:
-            self.after(0, lambda: self.log(f"ERROR: {e}"))
+            self.events.put({"event": "failed", "message": str(e)})
             print(e)
-        finally:
-             self.after(0, lambda: self.btn_update.configure(state="normal", text="🚀 ОБНОВИТЬ БАЗУ ЗНАНИЙ"))
+
+    def _drain_events(self):
+        try:
+            while True:
+                self._handle_event(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        self.after(100, self._drain_events)
+
+    def _handle_event(self, ev):
+        kind = ev["event"]
+        if kind == "log":
+            self.log(ev["message"])
+        elif kind == "phase":
+            self.log(f"Этап {ev['phase']}: {ev['seconds']:.2f}s")
+        elif kind == "error":
+            self.log(f"Ошибка {ev['file']}: {ev['message']}")
+        elif kind == "progress":
+            self._show_progress(ev["done"], ev["total"])
+        elif kind == "finished":
+            res = ev["result"]
+            self.log(f"ГОТОВО! Файлов: {res['count']}, обновлено модулей: {len(res['updated_modules'])}")
+            self.log(f"Токены: {res['tokens']['tokenizer']} ({res['tokens']['mode']})")
+            self.log(f"Скелеты ({res['skeletons']['level']}): {res['skeletons']['tokens']} токенов")
+            if res["dedup"]["duplicate_files"]:
+                self.log(f"Копий файлов: {res['dedup']['duplicate_files']}, сэкономлено токенов: "
+                         f"{res['dedup']['tokens_saved']}")
+            if res["bundles"]:
+                self.log(f"Бандлов: {res['bundles']} (по {ev['budget']} токенов)")
+            self.log(f"Путь: {res['path']}")
+            if res["archive"]:
+                self.log(f"Архив: {res['archive']}")
+            self._finish_run()
+            messagebox.showinfo("Success", "Сборка завершена!")
+        elif kind == "cancelled":
+            self.log("Сборка отменена. Уже записанные модули целые, остальные остались от прошлой сборки.")
+            self._finish_run()
+        elif kind == "failed":
+            self.log(f"ERROR: {ev['message']}")
+            self._finish_run()
+
+    def _show_progress(self, done, total):
+        now = time.monotonic()
+        if self._progress_start is None:
+            self._progress_start = (now, done)
+        start, start_done = self._progress_start
+        self.progress_bar.set(done / total if total else 1)
+        text = f"{done}/{total}"
+        elapsed = now - start
+        if elapsed > 0.5 and done > start_done:
+            rate = (done - start_done) / elapsed
+            eta = (total - done) / rate
+            text += f"  {rate:.0f} файлов/с  ETA {int(eta // 60)}:{int(eta % 60):02d}"
+        self.lbl_progress.configure(text=text)
+
+    def _finish_run(self):
+        self.cancel_event = None
+        self.btn_cancel.configure(state="disabled", text="✖ Отмена")
+        self.lbl_progress.configure(text="")
+        self.btn_update.configure(text="🚀 ОБНОВИТЬ БАЗУ ЗНАНИЙ")
+        if self.current_project_name:
+            self.btn_update.configure(state="normal")
+            self.btn_watch.configure(state="normal")
 
 if __name__ == "__main__":
     app = MainWindow()
@@ -0,0 +1,10 @@
+import pytest
+
+from app.codebase_collector import tokenizer
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokens(monkeypatch):
+    # Без загрузки кодировщика tiktoken из сети: токены - len/4, тесты детерминированы
+    monkeypatch.setattr(tokenizer, "_encoder", None)
+    monkeypatch.setattr(tokenizer, "_encoder_error", "disabled in tests")
@@ -0,0 +1,48 @@
+import os
+
+from app.codebase_collector import archive
+from app.codebase_collector.archive import read_index, read_module
+from app.codebase_collector.collector import collect_codebase
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def build(project, out):
+    return collect_codebase("proj", str(out), config={"path": str(project), "extensions": [".py"]}, archive=True)
+
+
+def test_unchanged_export_is_not_reread_or_repacked(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    write(project, "pkg/__init__.py", "")
+    write(project, "pkg/core.py", "def run():\n    return 1\n")
+    path = build(project, tmp_path / "out")["archive"]
+    fingerprint = read_index(path)["fingerprint"]
+    packed = os.stat(path).st_mtime_ns
+
+    # Отпечаток - из того, что посчитал коллектор: файлы экспорта не читаются
+    def no_read(*args, **kwargs):
+        raise AssertionError("export file read for the fingerprint")
+
+    monkeypatch.setattr(archive, "open", no_read, raising=False)
+    build(project, tmp_path / "out")
+    monkeypatch.undo()
+    assert read_index(path)["fingerprint"] == fingerprint
+    assert os.stat(path).st_mtime_ns == packed
+
+
+def test_changed_file_repacks_archive(tmp_path):
+    project = tmp_path / "project"
+    write(project, "pkg/__init__.py", "")
+    write(project, "pkg/core.py", "def run():\n    return 1\n")
+    path = build(project, tmp_path / "out")["archive"]
+    fingerprint = read_index(path)["fingerprint"]
+
+    write(project, "pkg/core.py", "def run():\n    return 2\n")
+    os.utime(project / "pkg" / "core.py", ns=(1, 1))
+    build(project, tmp_path / "out")
+    assert read_index(path)["fingerprint"] != fingerprint
+    assert "return 2" in read_module(path, "root")
@@ -0,0 +1,139 @@
+import os
+
+from app.codebase_collector.collector import collect_codebase
+from app.codebase_collector.dedup import DEDUP_MIN_SIZE, DuplicateIndex, plan_references, rebase_analysis
+from app.codebase_collector.updater import AnalysisCache
+
+HELPER = "def helper(a, b):\n    return a + b\n" + "# vendored helper, padding line\n" * 12
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_duplicate_index_first_file_is_origin():
+    index = DuplicateIndex()
+    assert index.add("a/x.py", "h1") is None
+    assert index.add("b/x.py", "h1") == "a/x.py"
+    assert index.add("c/x.py", "h2") is None
+    assert index.add("c/y.py", "h1") == "a/x.py"
+
+
+def test_duplicate_index_separates_extensions():
+    index = DuplicateIndex()
+    assert index.add("a/LICENSE.txt", "h") is None
+    assert index.add("b/LICENSE.md", "h") is None
+
+
+def test_plan_references():
+    entries = [("a/x.py", 10, "h1"), ("b/x.py", 10, "h1"), ("c/new.py", 20, None),
+               ("d/x.py", 20, "h2"), ("e/x.py", 20, "h2"), ("f/x.py", 10, "h1")]
+    references, unsettled = plan_references(entries)
+    assert references == {"b/x.py": "a/x.py", "e/x.py": "d/x.py", "f/x.py": "a/x.py"}
+    # Перед d и e - непрочитанный файл того же размера: он может оказаться их оригиналом
+    assert unsettled == {"d/x.py", "e/x.py"}
+
+
+def test_rebase_analysis_keeps_analysis_but_not_skeleton_tokens():
+    analysis = {"tokens": 7, "outline": [], "skel_tokens": {"returns": 3}, "imports": [], "symbols": []}
+    rebased = rebase_analysis(analysis)
+    assert rebased["tokens"] == 7 and rebased["skel_tokens"] == {}
+    assert analysis["skel_tokens"] == {"returns": 3}
+
+
+def rewrite(path, text):
+    # mtime меняется с точностью ФС - сдвигаем явно, чтобы правка была видна кэшу
+    st = os.stat(path)
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def make_project(root):
+    for name in ("a", "b"):
+        write(root, f"{name}/__init__.py", "")
+        write(root, f"{name}/README.md", f"# {name}\n")
+        write(root, f"{name}/helper.py", HELPER)
+    assert len(HELPER) >= DEDUP_MIN_SIZE
+    return {"path": str(root), "extensions": [".py"]}
+
+
+def exported(out, module):
+    return (out / "proj" / "code" / f"{module}.txt").read_text()
+
+
+def copy_module(out):
+    # Порядок обхода папок - порядок os.scandir: оригиналом может оказаться любой из двух
+    return "b" if "# DUPLICATE OF: a/helper.py" in exported(out, "b") else "a"
+
+
+def test_copy_is_written_as_reference(tmp_path):
+    config = make_project(tmp_path / "src")
+    out = tmp_path / "out"
+    result = collect_codebase("proj", str(out), config=config, dedup=True)
+    copy = copy_module(out)
+    origin = "a" if copy == "b" else "b"
+    code = exported(out, copy)
+    assert f"# DUPLICATE OF: {origin}/helper.py" in code
+    assert "vendored helper" not in code
+    assert "vendored helper" in exported(out, origin)
+    assert f"same as {origin}/helper.py" in (out / "proj" / "signatures" / f"{copy}_API.txt").read_text()
+    # Копии: helper.py и пустой __init__.py (он короче DEDUP_MIN_SIZE и пишется как есть)
+    assert result["dedup"]["duplicate_files"] == 2
+    assert result["dedup"]["tokens_saved"] > 0
+
+
+def test_without_dedup_copy_is_written_in_full(tmp_path):
+    config = make_project(tmp_path / "src")
+    out = tmp_path / "out"
+    result = collect_codebase("proj", str(out), config=config)
+    assert "vendored helper" in exported(out, "a") and "vendored helper" in exported(out, "b")
+    assert result["dedup"]["duplicate_files"] == 2
+    assert result["dedup"]["tokens_saved"] == 0
+
+
+def test_changed_origin_rewrites_copy_module(tmp_path):
+    config = make_project(tmp_path / "src")
+    cache_path = str(tmp_path / "cache.json")
+    out = tmp_path / "out"
+    for _ in range(2):
+        cache = AnalysisCache(cache_path)
+        result = collect_codebase("proj", str(out), cache=cache, config=config, dedup=True)
+        cache.save()
+    assert "a" not in result["updated_modules"] and "b" not in result["updated_modules"]
+    copy = copy_module(out)
+    origin = "a" if copy == "b" else "b"
+
+    # Оригинал изменился (размер тот же) - копия больше не копия, её модуль пишется заново
+    path = tmp_path / "src" / origin / "helper.py"
+    rewrite(path, HELPER.replace("a + b", "a - b"))
+    cache = AnalysisCache(cache_path)
+    result = collect_codebase("proj", str(out), cache=cache, config=config, dedup=True)
+    assert copy in result["updated_modules"]
+    assert "a + b" in exported(out, copy) and "a - b" in exported(out, origin)
+
+
+def test_file_becoming_a_copy_rewrites_its_module(tmp_path):
+    config = make_project(tmp_path / "src")
+    cache_path = str(tmp_path / "cache.json")
+    out = tmp_path / "out"
+    cache = AnalysisCache(cache_path)
+    collect_codebase("proj", str(out), cache=cache, config=config, dedup=True)
+    cache.save()
+    copy = copy_module(out)
+    origin = "a" if copy == "b" else "b"
+    # Оригинал перестал совпадать с копией (размер тот же): копия пишется целиком
+    path = tmp_path / "src" / origin / "helper.py"
+    rewrite(path, HELPER.replace("a + b", "a - b"))
+    cache = AnalysisCache(cache_path)
+    collect_codebase("proj", str(out), cache=cache, config=config, dedup=True)
+    cache.save()
+    assert "# DUPLICATE OF" not in exported(out, copy)
+
+    # Снова совпадает: бывшая копия не менялась, но её модуль должен стать ссылкой
+    rewrite(path, HELPER)
+    cache = AnalysisCache(cache_path)
+    result = collect_codebase("proj", str(out), cache=cache, config=config, dedup=True)
+    assert copy in result["updated_modules"]
+    assert f"# DUPLICATE OF: {origin}/helper.py" in exported(out, copy)
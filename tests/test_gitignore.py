@@ -0,0 +1,100 @@
+import pytest
+
+from app.codebase_collector.gitignore import GitIgnore
+from app.codebase_collector.module_discovery import scan_project
+
+
+def write(root, rel, text=""):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def exported(project):
+    scan = scan_project(str(project), {".py"}, [], GitIgnore(str(project)))
+    return sorted(rel for files in scan.modules_files.values() for _, _, rel, _, _ in files)
+
+
+@pytest.fixture(autouse=True)
+def isolated_git_config(tmp_path, monkeypatch):
+    # Глобальный excludes-файл пользователя не должен влиять на тесты
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "xdg"))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    (root / ".git" / "info").mkdir(parents=True)
+    return root
+
+
+def test_negation_reincludes_file(repo):
+    write(repo, ".gitignore", "*.py\n!keep.py\n")
+    write(repo, "keep.py")
+    write(repo, "drop.py")
+    assert exported(repo) == ["keep.py"]
+
+
+def test_negation_cannot_reinclude_file_in_ignored_dir(repo):
+    write(repo, ".gitignore", "build/\n!build/keep.py\n")
+    write(repo, "build/keep.py")
+    write(repo, "main.py")
+    assert exported(repo) == ["main.py"]
+
+
+def test_deeper_gitignore_wins(repo):
+    write(repo, ".gitignore", "gen_*.py\n")
+    write(repo, "pkg/.gitignore", "!gen_api.py\n")
+    write(repo, "gen_root.py")
+    write(repo, "pkg/gen_api.py")
+    write(repo, "pkg/gen_other.py")
+    assert exported(repo) == ["pkg/gen_api.py"]
+
+
+def test_anchored_patterns(repo):
+    write(repo, ".gitignore", "/config.py\ndocs/*.py\n")
+    write(repo, "config.py")
+    write(repo, "pkg/config.py")
+    write(repo, "docs/conf.py")
+    write(repo, "pkg/docs/conf.py")
+    assert exported(repo) == ["pkg/config.py", "pkg/docs/conf.py"]
+
+
+def test_info_exclude_and_global_excludes(repo, tmp_path):
+    write(repo, ".git/info/exclude", "local.py\n")
+    write(tmp_path, "xdg/git/ignore", "*_scratch.py\n")
+    write(repo, "local.py")
+    write(repo, "pkg/tmp_scratch.py")
+    write(repo, "main.py")
+    assert exported(repo) == ["main.py"]
+
+
+def test_gitignore_overrides_info_exclude(repo):
+    write(repo, ".git/info/exclude", "*.py\n")
+    write(repo, ".gitignore", "!main.py\n")
+    write(repo, "main.py")
+    write(repo, "other.py")
+    assert exported(repo) == ["main.py"]
+
+
+def test_project_nested_below_repo_root(repo):
+    write(repo, ".gitignore", "/top.py\nproj/gen/\n*_pb2.py\n")
+    write(repo, "apps/.gitignore", "proj/secret.py\n")
+    write(repo, ".git/info/exclude", "apps/proj/local.py\n")
+    project = repo / "apps" / "proj"
+    for rel in ("top.py", "gen/out.py", "api_pb2.py", "secret.py", "local.py", "main.py"):
+        write(project, rel)
+    # /top.py и proj/gen/ привязаны к корню репозитория, а не к папке проекта
+    assert exported(project) == ["gen/out.py", "main.py", "top.py"]
+
+
+def test_ignored_checks_parent_dirs(repo):
+    write(repo, ".gitignore", "build/\n*.log\n")
+    write(repo, "src/.gitignore", "!debug.log\n")
+    gitignore = GitIgnore(str(repo))
+    assert gitignore.ignored("build", is_dir=True)
+    assert gitignore.ignored("build/deep/out.py")
+    assert gitignore.ignored("app.log")
+    assert not gitignore.ignored("src/debug.log")
+    assert not gitignore.ignored("src/main.py")
@@ -0,0 +1,45 @@
+from app.codebase_collector.graph import ModuleGraph
+
+
+def make_graph():
+    # a <-> b - цикл, b -> c, d ни от кого не зависит
+    file_module = {"a/x.py": "a", "a/y.py": "a", "b/x.py": "b", "c/x.py": "c", "d/x.py": "d"}
+    file_edges = [("a/x.py", "b/x.py"), ("a/y.py", "b/x.py"), ("b/x.py", "a/x.py"),
+                  ("b/x.py", "c/x.py"), ("a/x.py", "a/y.py")]
+    return ModuleGraph(file_edges, file_module)
+
+
+def test_edges_are_weighted_and_skip_intra_module_imports():
+    graph = make_graph()
+    assert dict(graph.edges["a"]) == {"b": 2}
+    assert dict(graph.edges["b"]) == {"a": 1, "c": 1}
+    assert graph.fan_in == {"a": 1, "b": 1, "c": 1, "d": 0}
+    assert graph.fan_out == {"a": 1, "b": 2, "c": 0, "d": 0}
+
+
+def test_cycles():
+    graph = make_graph()
+    assert graph.cycles() == [["a", "b"]]
+    # Компоненты в обратном топологическом порядке: зависимость раньше зависящего
+    order = graph.components
+    assert order.index(["c"]) < order.index(["a", "b"])
+
+
+def test_layers():
+    graph = make_graph()
+    assert graph.layers() == [["c", "d"], ["a", "b"]]
+
+
+def test_layers_of_a_chain():
+    file_module = {"a.py": "a", "b.py": "b", "c.py": "c"}
+    graph = ModuleGraph([("a.py", "b.py"), ("b.py", "c.py")], file_module)
+    assert graph.cycles() == []
+    assert graph.layers() == [["c"], ["b"], ["a"]]
+
+
+def test_to_dict():
+    data = make_graph().to_dict("proj")
+    assert data["cycles"] == [["a", "b"]]
+    assert data["modules"]["a"]["cycle"] == 0
+    assert data["modules"]["c"] == {"imports": {}, "imported_by": ["b"], "fan_in": 1, "fan_out": 0,
+                                    "layer": 0, "cycle": None}
@@ -0,0 +1,41 @@
+from app.codebase_collector.import_index import ImportIndex
+
+
+def test_from_dot_import_submodule():
+    index = ImportIndex(["pkg/__init__.py", "pkg/a.py", "pkg/x.py"])
+    assert index.resolve("pkg/a.py", "", level=1, names=("x",)) == ["pkg/x.py"]
+
+
+def test_from_dot_import_name_from_package_init():
+    index = ImportIndex(["pkg/__init__.py", "pkg/a.py"])
+    assert index.resolve("pkg/a.py", "", level=1, names=("helper",)) == ["pkg/__init__.py"]
+
+
+def test_relative_import_from_parent_package():
+    index = ImportIndex(["pkg/__init__.py", "pkg/core.py", "pkg/sub/__init__.py", "pkg/sub/thing.py"])
+    assert index.resolve("pkg/sub/thing.py", "core", level=2, names=("Runner",)) == ["pkg/core.py"]
+
+
+def test_src_layout():
+    index = ImportIndex(["main.py", "src/pkg/__init__.py", "src/pkg/core.py", "src/pkg/util.py"])
+    assert index.resolve("main.py", "pkg.core") == ["src/pkg/core.py"]
+    assert index.resolve("main.py", "src.pkg.core") == ["src/pkg/core.py"]
+    assert index.resolve("main.py", "pkg", names=("core", "util")) == \
+        ["src/pkg/__init__.py", "src/pkg/core.py", "src/pkg/util.py"]
+
+
+def test_namespace_package():
+    index = ImportIndex(["app.py", "ns/sub/mod.py"])
+    assert index.resolve("app.py", "ns.sub.mod") == ["ns/sub/mod.py"]
+    assert index.resolve("app.py", "ns.sub", names=("mod",)) == ["ns/sub/mod.py"]
+
+
+def test_external_module_is_not_resolved():
+    index = ImportIndex(["pkg/__init__.py", "pkg/os.py"])
+    assert index.resolve("main.py", "os") == []
+
+
+def test_shallower_root_wins_and_short_names():
+    index = ImportIndex(["util.py", "src/util.py", "src/pkg/__init__.py", "src/pkg/core.py"])
+    assert index.resolve("main.py", "util") == ["util.py"]
+    assert index.module_names()["src/pkg/core.py"] == "pkg.core"
@@ -0,0 +1,78 @@
+import os
+
+from app.codebase_collector.collector import collect_codebase
+from app.codebase_collector.updater import AnalysisCache
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def bump_mtime(root, rel):
+    # mtime меняется с точностью ФС - сдвигаем явно, чтобы правка была видна кэшу
+    path = root / rel
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def make_project(root):
+    write(root, "main.py", "from pkg1 import core\n")
+    write(root, "pkg1/__init__.py", "")
+    write(root, "pkg1/README.md", "# pkg1\n")
+    write(root, "pkg1/core.py", "def run():\n    return 1\n")
+    write(root, "pkg2/__init__.py", "")
+    write(root, "pkg2/README.md", "# pkg2\n")
+    write(root, "pkg2/util.py", "def helper():\n    return 2\n")
+    return {"path": str(root), "extensions": [".py", ".md"]}
+
+
+def collect(config, out, cache_path):
+    cache = AnalysisCache(str(cache_path))
+    result = collect_codebase("proj", str(out), cache=cache, config=config)
+    cache.save()
+    return result
+
+
+def test_edit_rebuilds_only_changed_module(tmp_path):
+    config = make_project(tmp_path / "src")
+    cache_path = tmp_path / "cache.json"
+    out = tmp_path / "out"
+    assert sorted(collect(config, out, cache_path)["updated_modules"]) == ["pkg1", "pkg2", "root"]
+    assert collect(config, out, cache_path)["updated_modules"] == []
+
+    write(tmp_path / "src", "pkg1/core.py", "def run():\n    return 42\n")
+    bump_mtime(tmp_path / "src", "pkg1/core.py")
+    assert collect(config, out, cache_path)["updated_modules"] == ["pkg1"]
+    assert "return 42" in (out / "proj" / "code" / "pkg1.txt").read_text()
+
+
+def test_switching_export_dirs(tmp_path):
+    config = make_project(tmp_path / "src")
+    cache_path = tmp_path / "cache.json"
+    out_a, out_b = tmp_path / "a", tmp_path / "b"
+    collect(config, out_b, cache_path)
+
+    write(tmp_path / "src", "pkg1/core.py", "def run():\n    return 42\n")
+    bump_mtime(tmp_path / "src", "pkg1/core.py")
+    collect(config, out_a, cache_path)
+    assert "return 42" in (out_a / "proj" / "code" / "pkg1.txt").read_text()
+
+    # Кэш помнит сборку в A - в B модули нужно переписать, а не пропустить
+    result = collect(config, out_b, cache_path)
+    assert "pkg1" in result["updated_modules"]
+    assert "return 42" in (out_b / "proj" / "code" / "pkg1.txt").read_text()
+
+
+def test_removed_module_files_are_deleted(tmp_path):
+    config = make_project(tmp_path / "src")
+    cache_path = tmp_path / "cache.json"
+    out = tmp_path / "out"
+    collect(config, out, cache_path)
+    for name in ("__init__.py", "README.md", "util.py"):
+        os.remove(tmp_path / "src" / "pkg2" / name)
+    os.rmdir(tmp_path / "src" / "pkg2")
+    collect(config, out, cache_path)
+    assert sorted(os.listdir(out / "proj" / "code")) == ["pkg1.txt", "root.txt"]
+    assert not (out / "proj" / "signatures" / "pkg2_API.txt").exists()
@@ -0,0 +1,182 @@
+from app.codebase_collector.lang_parser import extract_outline
+
+# В каждом фикстуре строки, шаблоны, регулярки и сырые строки содержат
+# непарные скобки и кавычки: если сканер на них собьется, объявления после
+# них пропадут или уедут внутрь чужого тела
+
+TS_SOURCE = r'''import { x } from "./x";
+
+/** Greets. */
+export function greet(name: string): string {
+  const s = `hi ${name} } {`;
+  const re = /[}{]+\/}/g;
+  return s.replace(re, "}");
+}
+
+export class Box<T> extends Base implements I {
+  private value: T;
+  constructor(v: T) { this.value = v; }
+  get(): T { return "}" + '{' as any; }
+}
+
+const tpl = `a ${`nested ${1}`} }`;
+export const answer = 42;
+'''
+
+TS_OUTLINE = [
+    ("decl", "function", "greet", "export function greet(name: string): string { ... }", "Greets.", None),
+    ("decl", "class", "Box", "export class Box<T> extends Base implements I", "", [
+        ("decl", "", "value", "private value: T", "", None),
+        ("decl", "", "constructor", "constructor(v: T) { ... }", "", None),
+        ("decl", "", "get", "get(): T { ... }", "", None),
+    ]),
+    ("decl", "const", "tpl", "const tpl = `a ${`nested ${1}`} }`", "", None),
+    ("decl", "const", "answer", "export const answer = 42", "", None),
+]
+
+CPP_SOURCE = r'''#include <string>
+#define OPEN {
+#define CLOSE(x) } \
+    x
+
+namespace app {
+
+// Parses input.
+class Parser : public Base {
+public:
+    Parser();
+    int parse(const std::string& s) const;
+private:
+    const char* raw_ = R"x(text with } and " inside)x";
+    char brace_ = '}';
+};
+
+int helper(int a) {
+    const char* s = "}{";
+    return a;
+}
+
+}  // namespace app
+
+struct Point { int x; int y; };
+'''
+
+CPP_OUTLINE = [
+    ("decl", "namespace", "app", "namespace app", "", [
+        ("decl", "class", "Parser", "class Parser : public Base", "Parses input.", [
+            ("decl", "", "Parser", "Parser()", "", None),
+            ("decl", "", "parse", "int parse(const std::string& s) const", "", None),
+            ("decl", "", "raw_", 'const char* raw_ = R"x(text with } and " inside)x"', "", None),
+            ("decl", "", "brace_", "char brace_ = '}'", "", None),
+        ]),
+        ("decl", "", "helper", "int helper(int a) { ... }", "", None),
+    ]),
+    ("decl", "struct", "Point", "struct Point", "", [
+        ("decl", "", "x", "int x", "", None),
+        ("decl", "", "y", "int y", "", None),
+    ]),
+]
+
+GO_SOURCE = r'''package main
+
+import "fmt"
+
+// Server serves.
+type Server struct {
+	Addr string
+	port int
+}
+
+const raw = `}{
+`
+
+func (s *Server) Start() error {
+	fmt.Println("}")
+	r := '}'
+	_ = r
+	return nil
+}
+
+func main() {}
+'''
+
+GO_OUTLINE = [
+    ("decl", "type", "Server", "type Server struct", "Server serves.", [
+        ("decl", "", "Addr", "Addr string", "", None),
+        ("decl", "", "port", "port int", "", None),
+    ]),
+    ("decl", "const", "raw", "const raw = `}{ `", "", None),
+    ("decl", "func", "Server.Start", "func (s *Server) Start() error { ... }", "", None),
+    ("decl", "func", "main", "func main() { ... }", "", None),
+]
+
+RUST_SOURCE = r'''use std::fmt;
+
+/// A point.
+#[derive(Debug)]
+pub struct Point {
+    pub x: i32,
+    y: i32,
+}
+
+const RAW: &str = r#"}" {"#;
+
+impl Point {
+    pub fn new(x: i32) -> Self {
+        let c = '}';
+        let s = "{";
+        Point { x, y: 0 }
+    }
+}
+
+pub fn life<'a>(s: &'a str) -> &'a str { s }
+
+pub trait Shape {
+    fn area(&self) -> f64;
+}
+'''
+
+RUST_OUTLINE = [
+    ("decl", "struct", "Point", "pub struct Point", "A point.", [
+        ("decl", "", "x", "pub x: i32", "", None),
+        ("decl", "", "y", "y: i32", "", None),
+    ]),
+    ("decl", "const", "RAW", 'const RAW: &str = r#"}" {"#', "", None),
+    ("decl", "impl", "Point", "impl Point", "", [
+        ("decl", "fn", "new", "pub fn new(x: i32) -> Self { ... }", "", None),
+    ]),
+    ("decl", "fn", "life", "pub fn life<'a>(s: &'a str) -> &'a str { ... }", "", None),
+    ("decl", "trait", "Shape", "pub trait Shape", "", [
+        ("decl", "fn", "area", "fn area(&self) -> f64", "", None),
+    ]),
+]
+
+
+def test_typescript():
+    assert extract_outline(TS_SOURCE, ".ts") == TS_OUTLINE
+
+
+def test_cpp():
+    assert extract_outline(CPP_SOURCE, ".cpp") == CPP_OUTLINE
+
+
+def test_go():
+    assert extract_outline(GO_SOURCE, ".go") == GO_OUTLINE
+
+
+def test_rust():
+    assert extract_outline(RUST_SOURCE, ".rs") == RUST_OUTLINE
+
+
+def test_crlf_gives_same_outline():
+    assert extract_outline(RUST_SOURCE.replace("\n", "\r\n"), ".rs") == RUST_OUTLINE
+
+
+def test_js_division_is_not_a_regex():
+    # "/" после имени или скобки - деление: регулярка до следующего "/" съела бы "{"
+    source = "const half = total / 2, rest = (a) / b;\nfunction after() { return x / y; }\nconst last = 1;\n"
+    assert [item[2] for item in extract_outline(source, ".js")] == ["half", "after", "last"]
+
+
+def test_unknown_extension():
+    assert extract_outline("anything", ".py") is None
@@ -0,0 +1,32 @@
+from app.codebase_collector.packer import BUNDLE_HEADER_TOKENS, FILE_HEADER_TOKENS, pack_files, parse_budget
+
+
+def bundle_cost(items, bundle):
+    return BUNDLE_HEADER_TOKENS + sum(items[i][2] + FILE_HEADER_TOKENS for i in bundle)
+
+
+def test_parse_budget():
+    assert parse_budget("128k") == 128_000
+    assert parse_budget("1.5M") == 1_500_000
+    assert parse_budget(" 50000 ") == 50_000
+
+
+def test_every_file_once_in_export_order():
+    items = [("m", f"m/f{i}.py", 100 + i * 10) for i in range(20)]
+    bundles = pack_files(items, 1000)
+    assert [i for bundle in bundles for i in bundle] == list(range(20))
+    assert all(bundle_cost(items, bundle) <= 1000 for bundle in bundles)
+
+
+def test_folder_kept_together():
+    items = [("m", "m/a/1.py", 300), ("m", "m/b/1.py", 200), ("m", "m/b/2.py", 200), ("m", "m/b/3.py", 200)]
+    # Все вместе не влезают, папка b целиком влезает в пустой бандл - не делится
+    budget = BUNDLE_HEADER_TOKENS + 3 * (200 + FILE_HEADER_TOKENS)
+    assert pack_files(items, budget) == [[0], [1, 2, 3]]
+
+
+def test_oversized_file_gets_own_bundle():
+    items = [("m", "m/a.py", 50), ("m", "m/big.py", 5000), ("m", "m/c.py", 50)]
+    bundles = pack_files(items, 1000)
+    assert [1] in bundles
+    assert [i for bundle in bundles for i in bundle] == [0, 1, 2]
@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.codebase_collector import collector
+from app.codebase_collector.collector import _pipeline
+
+
+def loader(chunk):
+    if "bad" in chunk:
+        raise ValueError("worker failed")
+    return [item.upper() for item in chunk]
+
+
+def test_results_in_chunk_order():
+    slots = threading.BoundedSemaphore(2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(_pipeline(executor, [["a", "b"], ["c"], ["d"]], loader, 2, slots)) == ["A", "B", "C", "D"]
+    # Все слоты вернулись: BoundedSemaphore не дает отпустить лишний
+    for _ in range(2):
+        assert slots.acquire(blocking=False)
+
+
+def test_failed_chunk_releases_its_slot():
+    slots = threading.BoundedSemaphore(2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError):
+            list(_pipeline(executor, [["bad"], ["c"], ["d"]], loader, 2, slots))
+    for _ in range(2):
+        assert slots.acquire(blocking=False)
+
+
+def test_pool_workers_encode_in_one_thread(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(collector, "count_tokens_batch",
+                        lambda texts, num_threads=8: calls.append(num_threads) or [0] * len(texts))
+    tasks = []
+    for i in range(4):
+        path = tmp_path / f"m{i}.py"
+        path.write_text(f"x = {i}\n", encoding="utf-8")
+        tasks.append((str(path), path.name, ".py", True, None))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert len(list(collector.run_file_tasks(tasks, workers=2, chunk_size=1, executor=executor))) == 4
+    assert calls and set(calls) == {1}
@@ -0,0 +1,230 @@
+from app.codebase_collector.code_parser import (DEFAULT_SKELETON_LEVEL, SKELETON_LEVELS, analyze_python,
+                                                generate_skeleton_for_file, render_skeleton)
+
+SOURCE = '''import os
+from typing import List
+
+LIMIT: int = 10
+
+
+@dataclass
+class Point(Base, metaclass=Meta):
+    """A point.
+
+    Second line."""
+    x: int = 0
+    y: int
+
+    def norm(self, p: float = 2.0) -> float:
+        """Norm of the point."""
+        if p == 2:
+            return (self.x ** 2 + self.y ** 2) ** 0.5
+        return 0.0
+
+    @property
+    def pair(self):
+        return self.x, self.y
+
+    class Meta:
+        ordering = ["x"]
+
+
+async def fetch(url, *args, timeout=None, **kwargs):
+    """Fetch a URL."""
+    def inner():
+        return "inner-value"
+    if not url:
+        return None
+    return await client.get(url)
+'''
+
+# Скелет до разделения на уровни (один проход по AST, без outline) - уровень returns его повторяет
+RETURNS = '''# SKELETON: pkg/fixture.py
+LIMIT: int = 10
+@dataclass
+class Point(Base):
+    """A point.
+
+Second line."""
+    x: int = 0
+    y: int
+    def norm(self, p: float=2.0) -> float:
+        """Norm of the point."""
+        ...; return 0.0 | (self.x ** 2 + self.y ** 2) ** 0.5
+
+    @property
+    def pair(self):
+        ...; return (self.x, self.y)
+
+    class Meta:
+        pass
+async def fetch(url, *args, timeout=None, **kwargs):
+    """Fetch a URL."""
+    ...; return await client.get(url) | None
+
+'''
+
+
+def render(source, level):
+    return render_skeleton(analyze_python(source, "pkg/fixture.py").outline, "pkg/fixture.py", level)
+
+
+def test_returns_level_matches_single_pass_skeleton():
+    assert DEFAULT_SKELETON_LEVEL == "returns"
+    assert render(SOURCE, "returns") == RETURNS
+    assert generate_skeleton_for_file(SOURCE, "pkg/fixture.py") == RETURNS
+
+
+def test_every_level_renders():
+    sizes = []
+    for level in SKELETON_LEVELS:
+        skeleton = render(SOURCE, level)
+        assert skeleton.startswith("# SKELETON: pkg/fixture.py\n")
+        assert "class Point" in skeleton and "fetch" in skeleton
+        sizes.append(len(skeleton))
+    # Каждый следующий уровень подробнее предыдущего
+    assert sizes == sorted(sizes) and len(set(sizes)) == len(sizes)
+
+
+def test_syntax_error_renders_error_line():
+    for level in SKELETON_LEVELS:
+        assert render("def broken(:\n", level).startswith("# SYNTAX ERROR in pkg/fixture.py: ")
+
+
+# Формат скелета по уровням. Return-ы вложенных функций не попадают в return-ы
+# внешней (fetch), выражения берутся из исходника как есть
+GOLDEN = {
+    "names": '''# SKELETON: pkg/fixture.py
+LIMIT
+class Point
+    x
+    y
+    def norm
+    def pair
+    class Meta
+async def fetch
+''',
+    "signatures": '''# SKELETON: pkg/fixture.py
+LIMIT: int = 10
+@dataclass
+class Point(Base):
+    x: int = 0
+    y: int
+    def norm(self, p: float=2.0) -> float:
+        ...
+
+    @property
+    def pair(self):
+        ...
+
+    class Meta:
+        pass
+async def fetch(url, *args, timeout=None, **kwargs):
+    ...
+
+''',
+    "docstrings": '''# SKELETON: pkg/fixture.py
+LIMIT: int = 10
+@dataclass
+class Point(Base):
+    """A point.
+
+Second line."""
+    x: int = 0
+    y: int
+    def norm(self, p: float=2.0) -> float:
+        """Norm of the point."""
+        ...
+
+    @property
+    def pair(self):
+        ...
+
+    class Meta:
+        pass
+async def fetch(url, *args, timeout=None, **kwargs):
+    """Fetch a URL."""
+    ...
+
+''',
+    "returns": RETURNS,
+}
+
+LIMITS_SOURCE = '''def many(x):
+    if x == 1:
+        return 1
+    if x == 2:
+        return 2
+    if x == 3:
+        return 3
+    if x == 4:
+        return 4
+    if x == 5:
+        return 5
+    return 6
+
+
+def long_return():
+    return {"key": "a very long value that goes well beyond fifty characters"}
+
+
+class Documented:
+    """Line 1
+''' + "".join(f"    line {i}\n" for i in range(2, 26)) + '''    """
+
+    def method(self):
+        pass
+'''
+
+# Не больше MAX_RETURNS return-ов, RETURN_MAX_CHARS символов на return и
+# CLASS_DOC_MAX_LINES строк докстринга класса
+LIMITS_DOC = '    """Line 1\n' + "".join(f"line {i}\n" for i in range(2, 21)) + '..."""\n'
+LIMITS_GOLDEN = {
+    "names": "# SKELETON: pkg/fixture.py\ndef many\ndef long_return\nclass Documented\n    def method\n",
+    "signatures": '''# SKELETON: pkg/fixture.py
+def many(x):
+    ...
+
+def long_return():
+    ...
+
+class Documented:
+    def method(self):
+        ...
+
+''',
+    "docstrings": '''# SKELETON: pkg/fixture.py
+def many(x):
+    ...
+
+def long_return():
+    ...
+
+class Documented:
+''' + LIMITS_DOC + '''    def method(self):
+        ...
+
+''',
+    "returns": '''# SKELETON: pkg/fixture.py
+def many(x):
+    ...; return 6 | 1 | 2 | 3 | 4 | ...
+
+def long_return():
+    ...; return {"key": "a very long value that goes well beyon...
+
+class Documented:
+''' + LIMITS_DOC + '''    def method(self):
+        ...
+
+''',
+}
+
+
+def test_golden_levels():
+    for level in SKELETON_LEVELS:
+        assert render(SOURCE, level) == GOLDEN[level], level
+
+
+def test_golden_limits():
+    for level in SKELETON_LEVELS:
+        assert render(LIMITS_SOURCE, level) == LIMITS_GOLDEN[level], level
@@ -0,0 +1,119 @@
+import codecs
+
+import pytest
+
+from app.codebase_collector.collector import read_file
+from app.codebase_collector.sniffer import HEAD_SIZE, sniff
+
+
+def sniff_bytes(name, data):
+    return sniff(name, data[:HEAD_SIZE], len(data))
+
+
+def test_plain_text():
+    assert sniff_bytes("main.py", b"import os\n\nprint(os.getcwd())\n") == (None, "utf-8")
+
+
+def test_empty_file():
+    assert sniff_bytes("empty.py", b"") == (None, "utf-8")
+
+
+def test_binary_with_nul():
+    assert sniff_bytes("data.py", b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR") == ("binary", None)
+
+
+def test_binary_control_characters():
+    assert sniff_bytes("blob.js", bytes(range(1, 9)) * 50) == ("binary", None)
+
+
+def test_minified_by_content():
+    data = b"var a=1;" * 2000
+    assert sniff_bytes("bundle.js", data)[0] == "minified"
+
+
+def test_minified_by_name():
+    assert sniff_bytes("app.min.js", b"var a = 1;\n")[0] == "minified"
+
+
+def test_long_line_in_normal_file_is_not_minified():
+    # Одна длинная строка (таблица, base64) среди обычных - еще не минификация
+    data = b"x = 1\n" * 400 + b"DATA = '" + b"A" * 1500 + b"'\n"
+    assert sniff_bytes("table.py", data)[0] is None
+
+
+@pytest.mark.parametrize("name", ["package-lock.json", "yarn.lock", "Cargo.lock", "poetry.lock", "go.sum"])
+def test_lock_files(name):
+    assert sniff_bytes(name, b"{}\n")[0] == "generated"
+
+
+@pytest.mark.parametrize("header", [
+    "// Code generated by protoc-gen-go. DO NOT EDIT.",
+    "# @generated by some-tool",
+    "/* This file is automatically generated */",
+    "// This file was generated from schema.json",
+    "# Generated by Django 4.2. Do not edit.",
+])
+def test_generated_headers(header):
+    data = f"{header}\n\nclass Model:\n    pass\n".encode()
+    assert sniff_bytes("models.py", data)[0] == "generated"
+
+
+def test_generated_header_after_blank_lines_and_comments():
+    data = b"\n#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n# @generated\nx = 1\n"
+    assert sniff_bytes("gen.py", data)[0] == "generated"
+
+
+def test_marker_after_code_is_ignored():
+    data = b"import os\n# This file is generated\n"
+    assert sniff_bytes("mod.py", data)[0] is None
+
+
+def test_docstring_saying_do_not_edit_is_normal():
+    data = b'"""Generated by hand. Do not edit without review."""\n\nVALUE = 1\n'
+    assert sniff_bytes("settings.py", data)[0] is None
+
+
+def test_go_header_needs_exact_form():
+    data = b"// Code generated for tests, edit freely.\npackage main\n"
+    assert sniff_bytes("main.go", data)[0] is None
+
+
+def test_utf8_bom(tmp_path):
+    path = tmp_path / "bom.py"
+    path.write_bytes(codecs.BOM_UTF8 + "x = 'привет'\n".encode("utf-8"))
+    assert sniff_bytes(path.name, path.read_bytes()) == (None, "utf-8-sig")
+    assert read_file(str(path)) == ("x = 'привет'\n", None)
+
+
+def test_utf16_bom(tmp_path):
+    path = tmp_path / "wide.py"
+    path.write_bytes("x = 'привет'\r\n".encode("utf-16"))
+    assert read_file(str(path)) == ("x = 'привет'\n", None)
+
+
+def test_cp1251(tmp_path):
+    path = tmp_path / "legacy.py"
+    path.write_bytes("# Модуль расчета\ntext = 'строка'\n".encode("cp1251"))
+    assert sniff_bytes(path.name, path.read_bytes()) == (None, "cp1251")
+    assert read_file(str(path)) == ("# Модуль расчета\ntext = 'строка'\n", None)
+
+
+def test_latin1(tmp_path):
+    path = tmp_path / "legacy.c"
+    path.write_bytes("/* café, naïve, Größe */\nint x;\n".encode("latin-1"))
+    assert sniff_bytes(path.name, path.read_bytes()) == (None, "latin-1")
+    assert read_file(str(path)) == ("/* café, naïve, Größe */\nint x;\n", None)
+
+
+def test_utf8_char_cut_at_head_boundary():
+    # Многобайтовый символ разрезан границей HEAD_SIZE - это все еще UTF-8
+    data = b"x" * (HEAD_SIZE - 1) + "я".encode("utf-8") + b"\n"
+    assert sniff_bytes("long.py", data)[1] == "utf-8"
+
+
+def test_skipped_file_is_summarized(tmp_path):
+    path = tmp_path / "yarn.lock"
+    path.write_text("# yarn lockfile v1\n", encoding="utf-8")
+    content, kind = read_file(str(path))
+    assert kind == "generated"
+    assert content.startswith("# [GENERATED FILE SKIPPED: 19 bytes, preview:]\n# yarn lockfile v1")
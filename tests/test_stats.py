@@ -0,0 +1,57 @@
+import json
+import os
+
+from app.codebase_collector.collector import collect_codebase
+from app.codebase_collector.module_discovery import scan_project
+from app.codebase_collector.stats import STATS_NAME
+
+
+def write(root, rel, text):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def build(project, out, **kwargs):
+    events = []
+    result = collect_codebase("proj", str(out), config={"path": str(project), "extensions": [".py"]},
+                              progress=events.append, **kwargs)
+    with open(os.path.join(result["path"], STATS_NAME), encoding="utf-8") as f:
+        return result, json.load(f), [e for e in events if e["event"] == "error"]
+
+
+def test_scan_errors_are_returned_not_printed(tmp_path, capsys):
+    write(tmp_path, "pkg/__init__.py", "")
+    os.symlink(tmp_path / "missing.py", tmp_path / "pkg" / "broken.py")
+    scan = scan_project(str(tmp_path), {".py"}, [])
+    assert [path for path, _ in scan.errors] == ["pkg/broken.py"]
+    assert capsys.readouterr().out == ""
+
+
+def test_scan_and_parse_errors_go_to_stats(tmp_path, capsys):
+    project = tmp_path / "project"
+    write(project, "pkg/__init__.py", "")
+    write(project, "pkg/bad.py", "def broken(:\n")
+    os.symlink(project / "missing.py", project / "pkg" / "broken.py")
+
+    result, stats, events = build(project, tmp_path / "out")
+    items = {(item["file"], item["kind"]) for item in stats["errors"]["items"]}
+    assert items == {("pkg/broken.py", "scan"), ("pkg/bad.py", "parse")}
+    assert stats["errors"]["kinds"] == {"scan": 1, "parse": 1}
+    assert result["errors"] == 2
+    # Файл с синтаксической ошибкой экспортирован - событием error сообщается только о потерянных
+    assert [(e["file"], e["kind"]) for e in events] == [("pkg/broken.py", "scan")]
+    assert capsys.readouterr().out == ""
+
+
+def test_duplicates_are_not_counted_as_cached(tmp_path):
+    project = tmp_path / "project"
+    body = "def helper(a, b):\n    return a + b\n" + "# vendored helper, padding line\n" * 12
+    for name in ("a", "b", "c"):
+        write(project, f"{name}/__init__.py", "")
+        write(project, f"{name}/helper.py", body)
+
+    _, stats, _ = build(project, tmp_path / "out", dedup=True)
+    assert stats["totals"]["cached_files"] == 0
+    # Копии: два пустых __init__.py и два helper.py
+    assert stats["totals"]["dedup"]["duplicate_files"] == 4